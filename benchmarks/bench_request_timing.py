@@ -0,0 +1,128 @@
+"""
+Benchmark the per-request overhead of the request timing middleware.
+
+Compares the previous `@app.middleware("http")` timing function (Starlette's
+BaseHTTPMiddleware) with the pure ASGI TimingMiddleware, on a GET and on a
+POST whose body is read by the endpoint, without and with request logging
+(DEV mode; the log records themselves are discarded). Requests are sent
+straight to the ASGI app, so the numbers exclude the server and the network.
+
+Usage:
+    python benchmarks/bench_request_timing.py [--requests 20000] [--body 2000]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+os.environ.setdefault("WEBHOOK_VERIFICATION_TOKEN", "benchmark")
+os.environ.setdefault("MODE", "PROD")
+
+from fastapi import FastAPI, Request
+
+from utils.logger import logger
+from utils.timing_middleware import TimingMiddleware
+
+def make_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/health")
+    async def health():
+        return {"status": "healthy"}
+
+    @app.post("/receive")
+    async def receive(request: Request):
+        return {"size": len(await request.body())}
+
+    return app
+
+def with_previous_middleware(log_requests: bool) -> FastAPI:
+    """The timing middleware as it was, registered with @app.middleware("http")."""
+    app = make_app()
+
+    @app.middleware("http")
+    async def add_process_time_header(request: Request, call_next):
+        start_time = time.time()
+        if log_requests:
+            query_params = str(request.query_params) if request.query_params else "None"
+            logger.info(f"Request: {request.method} {request.url.path} | Params: {query_params}")
+            if request.method != "GET":
+                try:
+                    body = await request.body()
+                    if body:
+                        body_str = body.decode('utf-8')
+                        if len(body_str) > 1000:
+                            body_str = body_str[:1000] + "... [truncated]"
+                        logger.info(f"Request Body: {body_str}")
+                except Exception:
+                    pass
+        response = await call_next(request)
+        process_time = time.time() - start_time
+        response.headers["X-Process-Time"] = str(process_time)
+        if log_requests:
+            logger.info(f"Request to {request.url.path} processed in {process_time:.4f} seconds")
+        return response
+
+    return app
+
+def with_timing_middleware(log_requests: bool) -> FastAPI:
+    app = make_app()
+    app.add_middleware(TimingMiddleware, log_requests=log_requests)
+    return app
+
+async def _next(messages):
+    return next(messages, {"type": "http.disconnect"})
+
+async def measure(app, method: str, path: str, body: bytes, requests: int) -> float:
+    """Mean microseconds per request, sending the body in 1 KiB chunks."""
+    chunks = [body[start:start + 1024] for start in range(0, len(body), 1024)] or [b""]
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": method,
+        "scheme": "http", "path": path, "raw_path": path.encode(), "root_path": "", "query_string": b"",
+        "headers": [(b"host", b"benchmark"), (b"content-type", b"application/json")],
+        "client": ("127.0.0.1", 50000), "server": ("benchmark", 80),
+    }
+
+    async def send(message):
+        pass
+
+    # Warm up routing and middleware stack construction
+    for _ in range(100):
+        messages = iter([{"type": "http.request", "body": chunk, "more_body": index < len(chunks) - 1} for index, chunk in enumerate(chunks)])
+        await app(dict(scope), lambda: _next(messages), send)
+
+    start = time.perf_counter()
+    for _ in range(requests):
+        messages = iter([{"type": "http.request", "body": chunk, "more_body": index < len(chunks) - 1} for index, chunk in enumerate(chunks)])
+        await app(dict(scope), lambda: _next(messages), send)
+    return (time.perf_counter() - start) / requests * 1e6
+
+async def run(requests: int, body_size: int) -> None:
+    body = b'{"event_type":"message.received","data":{"content":"' + b"x" * max(body_size - 55, 0) + b'"}}'
+    for method, path, payload in (("GET", "/health", b""), ("POST", "/receive", body)):
+        baseline = await measure(make_app(), method, path, payload, requests)
+        print(f"{method} {path} ({len(payload)} byte body), no middleware: {baseline:8.1f} us/request")
+        for log_requests in (False, True):
+            mode = "DEV logging" if log_requests else "no logging "
+            previous = await measure(with_previous_middleware(log_requests), method, path, payload, requests)
+            current = await measure(with_timing_middleware(log_requests), method, path, payload, requests)
+            print(
+                f"  {mode}  @app.middleware: +{previous - baseline:6.1f} us   "
+                f"TimingMiddleware: +{current - baseline:6.1f} us"
+            )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20_000)
+    parser.add_argument("--body", type=int, default=2000)
+    args = parser.parse_args()
+
+    # Discard log records but keep building them, as DEV mode does
+    logging.getLogger().handlers.clear()
+    logger.addHandler(logging.NullHandler())
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    asyncio.run(run(args.requests, args.body))
@@ -0,0 +1,107 @@
+"""
+Benchmark the memory used per template by the in-memory table.
+
+Compares the previous representation (one dict per template, with a UUID
+string, two datetimes and a fresh tag list) with the compact TemplateRecord,
+counting the table itself and the ordered index keys it needs, and then with
+content values interned, as the template service does. Every template gets
+its own copy of a shared header and footer and one of 100 bodies.
+
+Usage:
+    python benchmarks/bench_template_memory.py [--templates 200000]
+"""
+import argparse
+import gc
+import os
+import sys
+import tracemalloc
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+os.environ.setdefault("WEBHOOK_VERIFICATION_TOKEN", "benchmark")
+os.environ.setdefault("MODE", "PROD")
+
+from services import template_content
+from services.template_record import TemplateRecord, intern_tags, to_timestamp
+
+def template_data(i: int) -> dict:
+    # Built fresh for every template, as request bodies are
+    return {
+        "name": f"Template {i}",
+        "description": "Benchmark template",
+        "content": {
+            "header": {"type": "text", "text": "Welcome to our service!"},
+            "body": f"Hello {{{{1}}}}, this is message {i % 100}.",
+            "footer": {"text": "The Team", "buttons": [{"type": "url", "text": "Open", "url": "https://example.com"}]},
+        },
+        "tags": [f"group-{i % 100}", "benchmark"],
+    }
+
+def build_dicts(count: int, start: datetime) -> tuple:
+    table = {}
+    index = []
+    for i in range(count):
+        data = template_data(i)
+        now = start + timedelta(microseconds=i)
+        template = {
+            "id": str(uuid.uuid4()),
+            "name": data["name"],
+            "description": data["description"],
+            "content": data["content"],
+            "tags": data["tags"],
+            "created_at": now,
+            "updated_at": now,
+        }
+        table[template["id"]] = template
+        index.append((template["created_at"], template["id"]))
+    return table, index
+
+def build_records(count: int, start: datetime, intern_content: bool = False) -> tuple:
+    table = {}
+    index = []
+    for i in range(count):
+        data = template_data(i)
+        now = to_timestamp(start + timedelta(microseconds=i))
+        template = TemplateRecord(
+            id=uuid.uuid4().bytes,
+            name=data["name"],
+            description=data["description"],
+            content=data["content"],
+            tags=intern_tags(data["tags"]),
+            created_at=now,
+            updated_at=now,
+        )
+        if intern_content:
+            template.content_key, template.content = template_content.acquire(template.content)
+        table[template.id] = template
+        index.append((template.created_at, template.id))
+    return table, index
+
+def build_interned_records(count: int, start: datetime) -> tuple:
+    return build_records(count, start, intern_content=True)
+
+def measure(build, count: int) -> float:
+    start = datetime.now()
+    gc.collect()
+    tracemalloc.start()
+    built = build(count, start)
+    gc.collect()
+    used, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del built
+    template_content.clear()
+    return used / count
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--templates", type=int, default=200_000)
+    args = parser.parse_args()
+
+    before = measure(build_dicts, args.templates)
+    after = measure(build_records, args.templates)
+    interned = measure(build_interned_records, args.templates)
+    print(f"Memory per template ({args.templates:,} templates, table + ordered index):")
+    print(f"  dict per template:                 {before:8.0f} bytes")
+    print(f"  TemplateRecord:                    {after:8.0f} bytes ({(before - after) / before:.0%} less)")
+    print(f"  TemplateRecord, interned content:  {interned:8.0f} bytes ({(before - interned) / before:.0%} less)")
@@ -0,0 +1,98 @@
+"""
+Benchmark full-text search over the template catalogue.
+
+Builds an in-memory catalogue through the template service and reports
+indexing throughput and query latency percentiles.
+
+Usage:
+    python benchmarks/bench_template_search.py [--templates 100000] [--queries 2000]
+"""
+import argparse
+import asyncio
+import itertools
+import logging
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+os.environ.setdefault("WEBHOOK_VERIFICATION_TOKEN", "benchmark")
+os.environ.setdefault("MODE", "PROD")
+
+from schemas.template_schemas import TemplateCreate
+from services import template_service
+from utils.logger import logger
+
+SYLLABLES = ["ka", "lo", "mi", "ne", "ru", "ta", "shi", "po", "ven", "dar", "el", "qu", "or", "is", "an", "ber"]
+
+def make_vocabulary(rng: random.Random, size: int) -> list:
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+    return sorted(words)
+
+class TextGenerator:
+    """Draws words with a Zipf-like distribution, like natural language text."""
+
+    def __init__(self, rng: random.Random, vocabulary_size: int = 20_000):
+        self.rng = rng
+        self.words = make_vocabulary(rng, vocabulary_size)
+        rng.shuffle(self.words)
+        self.cum_weights = list(itertools.accumulate(1 / rank for rank in range(1, len(self.words) + 1)))
+
+    def words_sample(self, count: int) -> list:
+        return self.rng.choices(self.words, cum_weights=self.cum_weights, k=count)
+
+    def text(self, count: int) -> str:
+        return " ".join(self.words_sample(count))
+
+async def build_catalogue(count: int, text: TextGenerator) -> float:
+    start = time.perf_counter()
+    for _ in range(count):
+        await template_service.create_template(TemplateCreate(
+            name=text.text(3),
+            description=text.text(6),
+            content={
+                "header": text.text(4),
+                "body": "Hello {{1}}, " + text.text(20),
+                "footer": text.text(3),
+            },
+            tags=text.words_sample(1),
+        ))
+    return time.perf_counter() - start
+
+async def run(templates: int, queries: int) -> None:
+    rng = random.Random(42)
+    text = TextGenerator(rng)
+    elapsed = await build_catalogue(templates, text)
+    print(f"Indexed {templates} templates in {elapsed:.2f}s ({templates / elapsed:,.0f} templates/s)")
+
+    query_sets = {
+        "single word": lambda: text.text(1),
+        "prefix": lambda: text.text(1)[:4],
+        "two words": lambda: text.text(2),
+        "word + prefix": lambda: f"{text.text(1)} {text.text(1)[:3]}",
+        "uncommon word": lambda: rng.choice(text.words),
+    }
+    for label, make_query in query_sets.items():
+        latencies = []
+        for _ in range(queries):
+            query = make_query()
+            start = time.perf_counter()
+            await template_service.search_templates(query, 10)
+            latencies.append((time.perf_counter() - start) * 1000)
+        latencies.sort()
+        p50 = statistics.median(latencies)
+        p99 = latencies[int(len(latencies) * 0.99) - 1]
+        print(f"{label:>22}: p50 {p50:.3f} ms | p99 {p99:.3f} ms | max {latencies[-1]:.3f} ms")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--templates", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=2000)
+    args = parser.parse_args()
+
+    logger.setLevel(logging.WARNING)
+    asyncio.run(run(args.templates, args.queries))
@@ -0,0 +1,102 @@
+"""
+Benchmark template response serialization.
+
+Compares the previous response path (returning dicts through
+response_model=TemplateResponse, so FastAPI validates and encodes them) with
+the pre-serialized fast path, both in isolation and through the ASGI app.
+
+Usage:
+    python benchmarks/bench_template_serialization.py [--templates 1000] [--page 100] [--requests 300]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+from typing import List
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+os.environ.setdefault("WEBHOOK_VERIFICATION_TOKEN", "benchmark")
+os.environ.setdefault("MODE", "PROD")
+
+import httpx
+from fastapi import APIRouter
+from pydantic import TypeAdapter
+
+from main import app
+from schemas.template_schemas import TemplateCreate, TemplateResponse
+from services import template_serializer, template_service
+from utils.logger import logger
+
+# The previous behaviour: return dicts and let the response model validate and encode them
+legacy_router = APIRouter()
+
+@legacy_router.get("/legacy/templates", response_model=List[TemplateResponse])
+async def legacy_list(skip: int = 0, limit: int = 10):
+    return [template.to_dict() for template in await template_service.get_templates(skip, limit)]
+
+@legacy_router.get("/legacy/templates/{template_id}", response_model=TemplateResponse)
+async def legacy_get(template_id: str):
+    return (await template_service.get_template_by_id(template_id)).to_dict()
+
+app.include_router(legacy_router)
+
+def large_content(i: int) -> dict:
+    return {
+        "header": f"Welcome to our service, edition {i}!",
+        "body": "Hello {{1}}, " + "we are glad to have you on board. " * 20,
+        "footer": "The Team",
+        "buttons": [{"type": "url", "text": f"Open {n}", "url": f"https://example.com/{i}/{n}"} for n in range(5)],
+        "locales": {locale: f"Translated body {i} for {locale}" for locale in ("en", "es", "fr", "de", "pt")},
+    }
+
+def time_call(function, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - start) / repeat * 1000
+
+async def time_requests(client: httpx.AsyncClient, url: str, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        response = await client.get(url)
+        response.raise_for_status()
+    return (time.perf_counter() - start) / repeat * 1000
+
+async def run(templates: int, page: int, requests: int) -> None:
+    await template_service.create_templates([
+        TemplateCreate(name=f"Template {i}", description="Benchmark template", content=large_content(i), tags=["benchmark"])
+        for i in range(templates)
+    ])
+    page_templates = await template_service.get_templates(0, page)
+    adapter = TypeAdapter(List[TemplateResponse])
+
+    legacy = lambda: adapter.dump_json(adapter.validate_python([template.to_dict() for template in page_templates]))
+    fast = lambda: template_serializer.serialize_templates(page_templates)
+    print(f"Serialize a page of {page} templates:")
+    print(f"  response_model validate + dump: {time_call(legacy, 50):7.3f} ms")
+    template_serializer.clear()
+    print(f"  fast path (cold cache):        {time_call(lambda: (template_serializer.clear(), fast()), 50):8.3f} ms")
+    print(f"  fast path (warm cache):        {time_call(fast, 50):8.3f} ms")
+
+    template_id = page_templates[0].template_id
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+        print(f"Request latency through the app ({requests} requests each):")
+        print(f"  GET list page, response_model: {await time_requests(client, f'/legacy/templates?limit={page}', requests):8.3f} ms")
+        # Bypass the list page cache so only serialization is compared
+        print(f"  GET list page, fast path:      {await time_requests(client, f'/api/template/?limit={page}&tags=benchmark', requests):8.3f} ms")
+        print(f"  GET template, response_model:  {await time_requests(client, f'/legacy/templates/{template_id}', requests):8.3f} ms")
+        print(f"  GET template, fast path:       {await time_requests(client, f'/api/template/{template_id}', requests):8.3f} ms")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--templates", type=int, default=1000)
+    parser.add_argument("--page", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=300)
+    args = parser.parse_args()
+
+    logger.setLevel(logging.WARNING)
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    asyncio.run(run(args.templates, args.page, args.requests))
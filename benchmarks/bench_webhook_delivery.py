@@ -0,0 +1,127 @@
+"""
+Benchmark outbound webhook delivery against a local stub server.
+
+Compares a new client per delivery (one connection per call) with the
+shared pooled client, measures batched deliveries, and checks retries and
+the circuit breaker against a flaky and a dead destination.
+
+Usage:
+    python benchmarks/bench_webhook_delivery.py [--deliveries 2000] [--concurrency 50]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import socket
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+os.environ.setdefault("WEBHOOK_VERIFICATION_TOKEN", "benchmark")
+os.environ.setdefault("MODE", "PROD")
+# Short backoffs so that the retry scenarios finish quickly
+os.environ.setdefault("DELIVERY_BACKOFF_BASE_MS", "10")
+os.environ.setdefault("DELIVERY_BACKOFF_MAX_MS", "200")
+os.environ.setdefault("DELIVERY_BREAKER_RESET_SECONDS", "60")
+
+import httpx
+import uvicorn
+
+from services import webhook_delivery
+from utils.json_codec import dumps
+from utils.logger import logger
+
+async def stub_app(scope, receive, send):
+    """
+    Stub destination: /ok answers 200, /flaky answers 503 to 30% of requests.
+    """
+    if scope["type"] != "http":
+        return
+    more_body = True
+    while more_body:
+        message = await receive()
+        more_body = message.get("more_body", False)
+    status = 503 if scope["path"] == "/flaky" and random.random() < 0.3 else 200
+    await send({"type": "http.response.start", "status": status, "headers": [(b"content-length", b"2")]})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+def start_stub_server() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(stub_app, host="127.0.0.1", port=port, log_level="error", access_log=False))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return port
+
+def make_payload(i: int) -> dict:
+    return {"callback_id": f"cb_{i}", "status": "success", "data": {"result": "processed", "details": "Message delivered successfully"}}
+
+async def run_concurrently(deliveries: int, concurrency: int, deliver) -> float:
+    queue = iter(range(deliveries))
+
+    async def sender():
+        for i in queue:
+            await deliver(i)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[sender() for _ in range(concurrency)])
+    return deliveries / (time.perf_counter() - start)
+
+async def run(deliveries: int, concurrency: int) -> None:
+    port = start_stub_server()
+    base = f"http://127.0.0.1:{port}"
+
+    async def client_per_call(i: int) -> None:
+        async with httpx.AsyncClient() as client:
+            response = await client.post(f"{base}/ok", content=dumps(make_payload(i)), headers={"Content-Type": "application/json"})
+            response.raise_for_status()
+
+    async def pooled(i: int) -> None:
+        result = await webhook_delivery.deliver(f"{base}/ok", make_payload(i))
+        assert result["status"] == "delivered"
+
+    rate = await run_concurrently(deliveries, concurrency, client_per_call)
+    print(f"New client per delivery ({concurrency} concurrent):  {rate:>8,.0f} deliveries/s")
+    rate = await run_concurrently(deliveries, concurrency, pooled)
+    print(f"Shared pooled client ({concurrency} concurrent):     {rate:>8,.0f} deliveries/s")
+
+    payloads = [make_payload(i) for i in range(deliveries * 10)]
+    start = time.perf_counter()
+    results = await webhook_delivery.deliver_batch(f"{base}/ok", payloads)
+    elapsed = time.perf_counter() - start
+    assert all(result["status"] == "delivered" for result in results)
+    print(f"Batched, {webhook_delivery.DELIVERY_BATCH_SIZE} per request:              {len(payloads) / elapsed:>8,.0f} payloads/s")
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(webhook_delivery.deliver(f"{base}/flaky", make_payload(i)) for i in range(deliveries)))
+    elapsed = time.perf_counter() - start
+    delivered = sum(1 for result in results if result["status"] == "delivered")
+    retries = sum(result["attempts"] - 1 for result in results)
+    print(f"Flaky destination (30% 503): {delivered}/{deliveries} delivered with {retries} retries in {elapsed:.2f}s")
+
+    # Nothing listens on the dead port: the breaker opens and the rest fail fast
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        dead_port = s.getsockname()[1]
+    start = time.perf_counter()
+    results = []
+    for i in range(deliveries):
+        results.append(await webhook_delivery.deliver(f"http://127.0.0.1:{dead_port}/", make_payload(i)))
+    elapsed = time.perf_counter() - start
+    rejected = sum(1 for result in results if result["status"] == "circuit_open")
+    print(f"Dead destination: {rejected}/{deliveries} rejected by the open circuit, {elapsed:.2f}s in total")
+
+    await webhook_delivery.close_delivery()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--deliveries", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+
+    logger.setLevel(logging.ERROR)
+    asyncio.run(run(args.deliveries, args.concurrency))
@@ -16,12 +16,86 @@ else:
 
 # GENERAL CONFIGURATION
 PORT = int(os.getenv("PORT", 5000))
+WORKERS = int(os.getenv("WORKERS", 1))
 
 # LOGGING CONFIGURATION
 LOG_LEVEL = os.getenv("LOG_LEVEL", "DEBUG")  
 
 # WEBHOOK CONFIGURATION
 WEBHOOK_VERIFY_TOKEN = os.getenv("WEBHOOK_VERIFICATION_TOKEN")
+# Received webhooks are queued and processed in the background by a pool of workers;
+# receive answers 429 while WEBHOOK_QUEUE_SIZE events are waiting
+WEBHOOK_QUEUE_SIZE = int(os.getenv("WEBHOOK_QUEUE_SIZE", 10000))
+WEBHOOK_QUEUE_WORKERS = int(os.getenv("WEBHOOK_QUEUE_WORKERS", 16))
+# Seconds to keep processing queued webhooks on shutdown
+WEBHOOK_DRAIN_TIMEOUT = float(os.getenv("WEBHOOK_DRAIN_TIMEOUT", 30))
+# Queued webhooks of a type sharing an ordering key (the first of these data fields present) are processed
+# one at a time in arrival order; keys are hashed onto WEBHOOK_LANES lanes per type. Empty disables ordering
+WEBHOOK_ORDERING_KEYS = [field.strip() for field in os.getenv("WEBHOOK_ORDERING_KEYS", "entity_id,user_id,from").split(",") if field.strip()]
+WEBHOOK_LANES = int(os.getenv("WEBHOOK_LANES", 256))
+# Webhooks of these types (e.g. "status.update") are held for WEBHOOK_COALESCE_WINDOW_MS per value of the
+# WEBHOOK_COALESCE_KEY data field, and only the latest is processed. Empty disables coalescing
+WEBHOOK_COALESCE_TYPES = [event_type.strip() for event_type in os.getenv("WEBHOOK_COALESCE_TYPES", "").split(",") if event_type.strip()]
+WEBHOOK_COALESCE_KEY = os.getenv("WEBHOOK_COALESCE_KEY", "entity_id")
+WEBHOOK_COALESCE_WINDOW_MS = int(os.getenv("WEBHOOK_COALESCE_WINDOW_MS", 50))
+# Directory of the write-ahead spool keeping accepted webhooks until processed, replayed on startup;
+# empty keeps queued webhooks in memory only. Owned by a single process, so only usable with WORKERS=1
+WEBHOOK_SPOOL_PATH = os.getenv("WEBHOOK_SPOOL_PATH", "")
+WEBHOOK_SPOOL_SEGMENT_MB = int(os.getenv("WEBHOOK_SPOOL_SEGMENT_MB", 64))
+# Extra wait before each spool fsync to batch more webhooks; 0 batches whatever arrives during the previous fsync
+WEBHOOK_SPOOL_COMMIT_INTERVAL_MS = int(os.getenv("WEBHOOK_SPOOL_COMMIT_INTERVAL_MS", 0))
+# Duplicate deliveries are answered from a cache of recent webhooks instead of being processed again.
+# The key is "auto" (delivery header, then message_id), "header", "message_id", "entity_status"
+# (entity_id + status, which drops a return to an earlier status within the TTL) or "none" to disable de-duplication
+WEBHOOK_IDEMPOTENCY_KEY = os.getenv("WEBHOOK_IDEMPOTENCY_KEY", "auto")
+WEBHOOK_DELIVERY_HEADER = os.getenv("WEBHOOK_DELIVERY_HEADER", "X-Delivery-Id")
+WEBHOOK_IDEMPOTENCY_TTL = float(os.getenv("WEBHOOK_IDEMPOTENCY_TTL", 86400))
+WEBHOOK_IDEMPOTENCY_MAX_ENTRIES = int(os.getenv("WEBHOOK_IDEMPOTENCY_MAX_ENTRIES", 100000))
+# File keeping processed webhooks across restarts; empty keeps them in memory only. Owned by a single
+# process, so only usable with WORKERS=1
+WEBHOOK_IDEMPOTENCY_PATH = os.getenv("WEBHOOK_IDEMPOTENCY_PATH", "")
+# Maximum size of a webhook body, or of one event of an NDJSON batch; larger ones are rejected with 413
+WEBHOOK_MAX_BODY_BYTES = int(os.getenv("WEBHOOK_MAX_BODY_BYTES", 1024 * 1024))
+# Batches are processed while the request waits: at most WEBHOOK_BATCH_MAX_EVENTS events and
+# WEBHOOK_BATCH_MAX_BODY_BYTES per request, WEBHOOK_BATCH_CONCURRENCY of them at a time
+WEBHOOK_BATCH_MAX_EVENTS = int(os.getenv("WEBHOOK_BATCH_MAX_EVENTS", 1000))
+WEBHOOK_BATCH_MAX_BODY_BYTES = int(os.getenv("WEBHOOK_BATCH_MAX_BODY_BYTES", 16 * 1024 * 1024))
+WEBHOOK_BATCH_CONCURRENCY = int(os.getenv("WEBHOOK_BATCH_CONCURRENCY", 32))
+# Admission control: each sender gets a token bucket of WEBHOOK_RATE_BURST requests refilled at WEBHOOK_RATE_LIMIT
+# per second, and receive answers 429 once it is empty. Senders are told apart by WEBHOOK_SENDER_HEADER (only set
+# it behind a proxy that sets or checks that header), or by client IP. WEBHOOK_RATE_LIMIT = 0 disables admission control
+WEBHOOK_RATE_LIMIT = float(os.getenv("WEBHOOK_RATE_LIMIT", 100))
+WEBHOOK_RATE_BURST = float(os.getenv("WEBHOOK_RATE_BURST", 200))
+WEBHOOK_SENDER_HEADER = os.getenv("WEBHOOK_SENDER_HEADER", "")
+WEBHOOK_RATE_MAX_SENDERS = int(os.getenv("WEBHOOK_RATE_MAX_SENDERS", 100000))
+
+# OUTBOUND DELIVERY CONFIGURATION
+# Endpoint receiving webhook callbacks; empty only logs them
+WEBHOOK_CALLBACK_URL = os.getenv("WEBHOOK_CALLBACK_URL", "")
+# Shared client: connections in total and per destination host, and seconds per request
+DELIVERY_MAX_CONNECTIONS = int(os.getenv("DELIVERY_MAX_CONNECTIONS", 100))
+DELIVERY_MAX_CONNECTIONS_PER_HOST = int(os.getenv("DELIVERY_MAX_CONNECTIONS_PER_HOST", 20))
+DELIVERY_TIMEOUT = float(os.getenv("DELIVERY_TIMEOUT", 10))
+# Failed deliveries are retried with exponential backoff and full jitter
+DELIVERY_MAX_RETRIES = int(os.getenv("DELIVERY_MAX_RETRIES", 4))
+DELIVERY_BACKOFF_BASE_MS = int(os.getenv("DELIVERY_BACKOFF_BASE_MS", 200))
+DELIVERY_BACKOFF_MAX_MS = int(os.getenv("DELIVERY_BACKOFF_MAX_MS", 10000))
+# A destination failing DELIVERY_BREAKER_THRESHOLD times in a row is skipped for DELIVERY_BREAKER_RESET_SECONDS
+DELIVERY_BREAKER_THRESHOLD = int(os.getenv("DELIVERY_BREAKER_THRESHOLD", 5))
+DELIVERY_BREAKER_RESET_SECONDS = float(os.getenv("DELIVERY_BREAKER_RESET_SECONDS", 30))
+# Payloads per request for destinations accepting JSON arrays
+DELIVERY_BATCH_SIZE = int(os.getenv("DELIVERY_BATCH_SIZE", 100))
+
+# TEMPLATE STORAGE CONFIGURATION
+# "memory" keeps templates in process memory only, "log" persists them to TEMPLATE_STORE_PATH,
+# "sqlite" shares them between worker processes through a database in TEMPLATE_STORE_PATH
+TEMPLATE_STORE = os.getenv("TEMPLATE_STORE", "memory")
+TEMPLATE_STORE_PATH = os.getenv("TEMPLATE_STORE_PATH", "data/templates")
+# Extra wait before each fsync to batch more writes; 0 batches whatever arrives during the previous fsync
+TEMPLATE_COMMIT_INTERVAL_MS = int(os.getenv("TEMPLATE_COMMIT_INTERVAL_MS", 0))
+TEMPLATE_SNAPSHOT_EVERY = int(os.getenv("TEMPLATE_SNAPSHOT_EVERY", 10000))
+# How often the change feed picks up other workers' changes from a sqlite store while clients are subscribed
+TEMPLATE_FEED_POLL_MS = int(os.getenv("TEMPLATE_FEED_POLL_MS", 1000))
 
 # Validation
 REQUIRED_ENV_VARS = [
@@ -32,4 +106,35 @@ REQUIRED_ENV_VARS = [
 
 for var in REQUIRED_ENV_VARS:
     if not locals()[var]:
-        raise EnvironmentError(f"Missing required environment variable: {var}")
\ No newline at end of file
+        raise EnvironmentError(f"Missing required environment variable: {var}")
+
+if WORKERS > 1 and TEMPLATE_STORE != "sqlite":
+    raise EnvironmentError("TEMPLATE_STORE must be 'sqlite' to run more than one worker")
+
+# Every worker would replay the same spooled webhooks and delete the segments of the others
+if WORKERS > 1 and WEBHOOK_SPOOL_PATH:
+    raise EnvironmentError("WEBHOOK_SPOOL_PATH must be empty to run more than one worker")
+
+# Every worker would compact the file from its own cache, dropping the keys of the others
+if WORKERS > 1 and WEBHOOK_IDEMPOTENCY_PATH:
+    raise EnvironmentError("WEBHOOK_IDEMPOTENCY_PATH must be empty to run more than one worker")
+
+if TEMPLATE_FEED_POLL_MS < 1:
+    raise EnvironmentError("TEMPLATE_FEED_POLL_MS must be at least 1")
+
+if WEBHOOK_QUEUE_SIZE < 1 or WEBHOOK_QUEUE_WORKERS < 1 or WEBHOOK_LANES < 1:
+    raise EnvironmentError("WEBHOOK_QUEUE_SIZE, WEBHOOK_QUEUE_WORKERS and WEBHOOK_LANES must be at least 1")
+if WEBHOOK_IDEMPOTENCY_KEY not in ("auto", "header", "message_id", "entity_status", "none"):
+    raise EnvironmentError("WEBHOOK_IDEMPOTENCY_KEY must be one of auto, header, message_id, entity_status or none")
+
+if WEBHOOK_IDEMPOTENCY_TTL <= 0 or WEBHOOK_IDEMPOTENCY_MAX_ENTRIES < 1:
+    raise EnvironmentError("WEBHOOK_IDEMPOTENCY_TTL must be positive and WEBHOOK_IDEMPOTENCY_MAX_ENTRIES at least 1")
+
+if WEBHOOK_MAX_BODY_BYTES < 1 or WEBHOOK_BATCH_MAX_EVENTS < 1 or WEBHOOK_BATCH_MAX_BODY_BYTES < 1 or WEBHOOK_BATCH_CONCURRENCY < 1:
+    raise EnvironmentError("WEBHOOK_MAX_BODY_BYTES, WEBHOOK_BATCH_MAX_EVENTS, WEBHOOK_BATCH_MAX_BODY_BYTES and WEBHOOK_BATCH_CONCURRENCY must be at least 1")
+
+if WEBHOOK_RATE_LIMIT < 0 or WEBHOOK_RATE_BURST < 1 or WEBHOOK_RATE_MAX_SENDERS < 1:
+    raise EnvironmentError("WEBHOOK_RATE_LIMIT must not be negative, WEBHOOK_RATE_BURST and WEBHOOK_RATE_MAX_SENDERS must be at least 1")
+
+if DELIVERY_MAX_CONNECTIONS < 1 or DELIVERY_MAX_CONNECTIONS_PER_HOST < 1 or DELIVERY_BATCH_SIZE < 1 or DELIVERY_BREAKER_THRESHOLD < 1:
+    raise EnvironmentError("DELIVERY_MAX_CONNECTIONS, DELIVERY_MAX_CONNECTIONS_PER_HOST, DELIVERY_BATCH_SIZE and DELIVERY_BREAKER_THRESHOLD must be at least 1")
@@ -1,9 +1,29 @@
 from fastapi import HTTPException, Request, Query
-from typing import Dict, Any
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter, ValidationError
+from typing import Dict, Any, List, Optional, Tuple, Union
+import math
+import re
+import uuid
 
-from services.webhook_service import process_webhook
-from config.env import WEBHOOK_VERIFY_TOKEN
+from services.webhook_queue import enqueue, wait_durable, hold_lanes, QueueFullError, QueueClosedError
+from services.webhook_idempotency import webhook_key, lookup, begin, complete, forget
+from services.webhook_service import process_webhook_batch
+from services.webhook_delivery import deliver
+from services.webhook_admission import admit
+from schemas.webhook_schemas import WebhookEvent, WebhookPayload, payload_model
+from config.env import WEBHOOK_VERIFY_TOKEN, WEBHOOK_MAX_BODY_BYTES, WEBHOOK_BATCH_MAX_BODY_BYTES, WEBHOOK_BATCH_MAX_EVENTS, WEBHOOK_BATCH_CONCURRENCY, WEBHOOK_CALLBACK_URL, WEBHOOK_SENDER_HEADER
+from utils.body import BodyTooLargeError, limit_body, read_body
 from utils.logger import logger
+from utils.ndjson import LineTooLongError, iter_lines
+
+# First "event_type" string of a webhook, to pick its payload model without parsing it first
+_EVENT_TYPE = re.compile(rb'"event_type"\s*:\s*"([^"\\]*)"')
+
+# A JSON array batch, validated in one pass; the events of a batch that fails are parsed
+# as plain JSON and validated one by one, to report the errors of each
+_BATCH_EVENTS = TypeAdapter(List[WebhookEvent])
+_BATCH_ITEMS = TypeAdapter(List[Any])
 
 class WebhookController:
     """
@@ -38,49 +58,289 @@ class WebhookController:
         return {"message": "Webhook verification successful"}
     
     @staticmethod
-    async def receive_webhook(request: Request) -> Dict[str, Any]:
+    async def admit_webhook(request: Request) -> None:
         """
-        Receive and process a webhook request.
+        Admit a webhook request against its sender's rate limit, before the body is read.
+        
+        Args:
+            request: The FastAPI request object
+            
+        Raises:
+            HTTPException: If the sender is over its rate limit (429)
+        """
+        sender = request.headers.get(WEBHOOK_SENDER_HEADER) if WEBHOOK_SENDER_HEADER else None
+        if not sender:
+            sender = request.client.host if request.client else "unknown"
+        
+        retry_after = admit(sender)
+        if retry_after:
+            logger.debug(f"Webhook sender {sender} is over its rate limit")
+            raise HTTPException(
+                status_code=429,
+                detail="Too many webhooks from this sender",
+                headers={"Retry-After": str(math.ceil(retry_after))},
+            )
+    
+    @staticmethod
+    async def receive_webhook(request: Request) -> Union[Dict[str, Any], JSONResponse]:
+        """
+        Receive a webhook request and queue it for background processing.
+        
+        A redelivery of a webhook already accepted is not queued again: it
+        gets the cached result of the first delivery (200), or the ID of the
+        first delivery while that one is still being processed.
         
         Args:
             request: The FastAPI request object
             
         Returns:
-            A dictionary with the processing result
+            A dictionary with the ID of the queued webhook, or the first delivery's result
             
         Raises:
-            HTTPException: If there's an error processing the webhook
+            HTTPException: If the webhook is invalid (400), too large (413), the queue
+                is full (429) or processing is not running (503)
+        """
+        try:
+            raw = await read_body(request.stream(), WEBHOOK_MAX_BODY_BYTES, request.headers.get("content-length"))
+        except BodyTooLargeError as e:
+            raise HTTPException(status_code=413, detail=str(e))
+        
+        payload, error = WebhookController._parse(raw)
+        if payload is None:
+            logger.warning(f"Invalid webhook: {error}")
+            raise HTTPException(status_code=400, detail=error)
+        
+        logger.info(f"Received {payload.event_type} webhook ({len(raw)} bytes)")
+        
+        key = webhook_key(payload, request.headers)
+        if key is not None:
+            previous = lookup(key)
+            if previous is not None:
+                logger.info(f"Duplicate webhook {key} of {previous['id']}")
+                if previous["result"] is None:
+                    return {"message": "Webhook already accepted", "id": previous["id"], "duplicate": True}
+                return JSONResponse(
+                    status_code=200,
+                    content={"message": "Webhook already processed", "id": previous["id"], "duplicate": True, "result": previous["result"]},
+                )
+        
+        try:
+            webhook_id = enqueue(payload, key)
+        except QueueFullError as e:
+            logger.warning(str(e))
+            raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "1"})
+        except QueueClosedError as e:
+            raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+        
+        # Only acknowledge once the webhook survives a restart
+        try:
+            await wait_durable()
+        except OSError as e:
+            logger.error(f"Error spooling webhook {webhook_id}: {str(e)}", exc_info=True)
+            raise HTTPException(status_code=500, detail="Webhook could not be persisted")
+        
+        return {"message": "Webhook accepted", "id": webhook_id}
+    
+    @staticmethod
+    def _errors(error: ValidationError) -> str:
+        """
+        Format validation errors for a response.
+        """
+        if any(detail["type"] == "json_invalid" for detail in error.errors()):
+            return "Webhook is not valid JSON"
+        return "; ".join(f"{'.'.join(str(part) for part in detail['loc']) or 'event'}: {detail['msg']}" for detail in error.errors())
+    
+    @staticmethod
+    def _parse(raw: Union[bytes, str]) -> Tuple[Optional[WebhookPayload], Optional[str]]:
+        """
+        Parse and validate a webhook in one pass with the payload model of its event type.
+        
+        The event type is found with a scan of the raw JSON, so the webhook is
+        parsed once, straight into its model. The scan can pick the wrong
+        model (an escaped event type, or a nested "event_type" key first):
+        if the webhook fails that model or turns out to be of another type, it
+        is validated again with the model its own event_type picks.
+        
+        Returns:
+            The validated webhook and None, or None and the validation errors
+        """
+        if isinstance(raw, str):
+            raw = raw.encode("utf-8")
+        match = _EVENT_TYPE.search(raw)
+        model = payload_model(match.group(1).decode("utf-8", errors="replace") if match else None)
+        try:
+            payload = model.model_validate_json(raw)
+            event_type = payload.event_type
+        except ValidationError as e:
+            if model is WebhookPayload:
+                return None, WebhookController._errors(e)
+            payload, error = None, e
+            try:
+                event_type = WebhookPayload.model_validate_json(raw).event_type
+            except ValidationError as e:
+                return None, WebhookController._errors(e)
+        
+        if payload_model(event_type) is not model:
+            model = payload_model(event_type)
+            try:
+                payload = model.model_validate_json(raw)
+            except ValidationError as e:
+                return None, WebhookController._errors(e)
+        elif payload is None:
+            return None, WebhookController._errors(error)
+        return payload, None
+    
+    @staticmethod
+    async def _read_batch(request: Request) -> List[Tuple[Optional[WebhookPayload], Optional[str]]]:
         """
+        Read and validate the events of a batch from a JSON array or an NDJSON body.
+        
+        Invalid events are kept with their errors, to be reported at their index.
+        Either body is limited to WEBHOOK_BATCH_MAX_BODY_BYTES.
+        """
+        too_many = HTTPException(status_code=413, detail=f"A batch holds at most {WEBHOOK_BATCH_MAX_EVENTS} events")
+        chunks = limit_body(request.stream(), WEBHOOK_BATCH_MAX_BODY_BYTES, request.headers.get("content-length"))
+        
+        if request.headers.get("content-type", "").split(";")[0].strip() == "application/x-ndjson":
+            events = []
+            try:
+                async for _, line in iter_lines(chunks, WEBHOOK_MAX_BODY_BYTES):
+                    if len(events) >= WEBHOOK_BATCH_MAX_EVENTS:
+                        raise too_many
+                    events.append(WebhookController._parse(line))
+            except (LineTooLongError, BodyTooLargeError) as e:
+                raise HTTPException(status_code=413, detail=str(e))
+            return events
+        
+        try:
+            body = bytearray()
+            async for chunk in chunks:
+                body += chunk
+        except BodyTooLargeError as e:
+            raise HTTPException(status_code=413, detail=str(e))
         try:
-            body = await request.json()
-            logger.info(f"Received webhook: {body}")
+            events = [(event, None) for event in _BATCH_EVENTS.validate_json(body)]
+        except ValidationError:
+            try:
+                items = _BATCH_ITEMS.validate_json(body)
+            except ValidationError as e:
+                if any(detail["type"] == "json_invalid" for detail in e.errors()):
+                    raise HTTPException(status_code=400, detail="Webhook batch body is not valid JSON")
+                raise HTTPException(status_code=400, detail="A webhook batch must be a JSON array or NDJSON")
+            if len(items) > WEBHOOK_BATCH_MAX_EVENTS:
+                raise too_many
+            events = []
+            for item in items:
+                try:
+                    events.append((payload_model(item.get("event_type") if isinstance(item, dict) else None).model_validate(item), None))
+                except ValidationError as e:
+                    events.append((None, WebhookController._errors(e)))
+        if len(events) > WEBHOOK_BATCH_MAX_EVENTS:
+            raise too_many
+        return events
+    
+    @staticmethod
+    async def receive_webhook_batch(request: Request) -> Dict[str, Any]:
+        """
+        Receive a batch of webhooks and process them before answering.
+        
+        Each event is validated with the payload model of its type and
+        de-duplicated like a single webhook; the remaining ones are
+        processed concurrently, except that events sharing an ordering key
+        with each other or with queued webhooks run one at a time, in order.
+        
+        Args:
+            request: The FastAPI request object
+            
+        Returns:
+            A dictionary with the result of each event and the counts of processed,
+            failed and duplicate events
+            
+        Raises:
+            HTTPException: If the body is not a JSON array or NDJSON (400) or the
+                batch or one of its events is too large (413)
+        """
+        events = await WebhookController._read_batch(request)
+        
+        results: List[Dict[str, Any]] = [{}] * len(events)
+        pending = []
+        duplicates = 0
+        for index, (event, message) in enumerate(events):
+            if event is None:
+                results[index] = {"index": index, "status": "error", "message": message}
+                continue
             
-            # Process the webhook
-            result = await process_webhook(body)
+            # The delivery header identifies the whole request, not its events
+            key = webhook_key(event)
+            if key is not None:
+                previous = lookup(key)
+                if previous is not None:
+                    duplicates += 1
+                    if previous["result"] is None:
+                        results[index] = {"index": index, "id": previous["id"], "duplicate": True, "status": "processing", "message": "Webhook already accepted"}
+                    else:
+                        results[index] = {"index": index, "id": previous["id"], "duplicate": True, **previous["result"]}
+                    continue
             
-            return {"message": "Webhook received successfully", "result": result}
-        except Exception as e:
-            logger.error(f"Error processing webhook: {str(e)}", exc_info=True)
-            raise HTTPException(status_code=500, detail=f"Error processing webhook: {str(e)}")
+            webhook_id = uuid.uuid4().hex
+            if key is not None:
+                begin(key, webhook_id)
+            pending.append((index, webhook_id, key, event))
+        
+        logger.info(f"Received webhook batch of {len(events)} events, processing {len(pending)}")
+        
+        settled = 0
+        try:
+            processed = await process_webhook_batch([event for _, _, _, event in pending], WEBHOOK_BATCH_CONCURRENCY, hold_lanes)
+            for (index, webhook_id, key, _), result in zip(pending, processed):
+                results[index] = {"index": index, "id": webhook_id, **result}
+                # complete() records the result before it awaits anything
+                settled += 1
+                if key is not None:
+                    if result.get("status") == "error":
+                        forget(key)
+                    else:
+                        await complete(key, webhook_id, result)
+        except BaseException:
+            # Cancelled (e.g. the client disconnected) or failed: let redeliveries of the rest through
+            for _, _, key, _ in pending[settled:]:
+                if key is not None:
+                    forget(key)
+            raise
+        
+        failed = sum(1 for result in results if result.get("status") == "error")
+        return {
+            "results": results,
+            "processed": len(results) - failed - duplicates,
+            "failed": failed,
+            "duplicates": duplicates,
+        }
     
     @staticmethod
     async def handle_webhook_callback(callback_data: Dict[str, Any]) -> Dict[str, Any]:
         """
-        Handle a webhook callback.
+        Handle a webhook callback by forwarding it to WEBHOOK_CALLBACK_URL.
         
         Args:
             callback_data: The callback data
             
         Returns:
-            A dictionary with the callback processing result
-        """
-        try:
-            logger.info(f"Received webhook callback: {callback_data}")
-            
-            # Process the callback
-            # This is a placeholder for your actual callback processing logic
+            A dictionary with the callback processing result and, when forwarded,
+            the delivery result
             
+        Raises:
+            HTTPException: If the callback could not be delivered (502) or the
+                destination's circuit is open (503)
+        """
+        logger.info(f"Received webhook callback {callback_data.get('callback_id')}: {callback_data.get('status')}")
+        
+        if not WEBHOOK_CALLBACK_URL:
             return {"message": "Webhook callback processed successfully"}
-        except Exception as e:
-            logger.error(f"Error processing webhook callback: {str(e)}", exc_info=True)
-            raise HTTPException(status_code=500, detail=f"Error processing webhook callback: {str(e)}") 
\ No newline at end of file
+        
+        delivery = await deliver(WEBHOOK_CALLBACK_URL, callback_data)
+        if delivery["status"] == "circuit_open":
+            raise HTTPException(status_code=503, detail="Callback destination is unavailable", headers={"Retry-After": "30"})
+        if delivery["status"] != "delivered":
+            raise HTTPException(status_code=502, detail=f"Callback delivery failed: {delivery['error']}")
+        
+        return {"message": "Webhook callback processed successfully", "delivery": delivery}
@@ -1,22 +1,43 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
-import time
 import uvicorn
 
 # Import config and utils
-from config.env import PORT, CORS_ALLOW_ALL, ALLOWED_ORIGINS, MODE
+from config.env import PORT, WORKERS, CORS_ALLOW_ALL, ALLOWED_ORIGINS, MODE
 from utils.logger import logger
+from utils.timing_middleware import TimingMiddleware
 
 # Import routes
 from routes.webhook_routes import router as webhook_router
 from routes.template_routes import router as template_router
 
+# Import services with startup/shutdown hooks
+from services.template_service import init_template_store, close_template_store
+from services.webhook_queue import start_webhook_workers, stop_webhook_workers
+from services.webhook_idempotency import init_idempotency, close_idempotency
+from services.webhook_delivery import close_delivery
+
+# Application lifespan: open storage, replay the webhook spool and start webhook workers
+# on startup, drain the webhook queue, close outbound connections and flush storage on shutdown
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await init_template_store()
+    await init_idempotency()
+    await start_webhook_workers()
+    yield
+    await stop_webhook_workers()
+    await close_delivery()
+    await close_idempotency()
+    await close_template_store()
+
 # Create FastAPI app
 app = FastAPI(
     title="FastAPI Template",
     description="A template for FastAPI applications",
     version="0.1.0",
+    lifespan=lifespan,
 )
 
 # ============
@@ -46,46 +67,8 @@ else:
     )
     logger.info(f"CORS configured for production mode with origins: {origins}")
 
-# Add request timing middleware
-@app.middleware("http")
-async def add_process_time_header(request: Request, call_next):
-    start_time = time.time()
-    
-    # Log request info in DEV mode
-    if MODE == "DEV":
-        # Get request path and method
-        path = request.url.path
-        method = request.method
-        
-        # Get query params as string
-        query_params = str(request.query_params) if request.query_params else "None"
-        
-        # Log before processing
-        logger.info(f"Request: {method} {path} | Params: {query_params}")
-        
-        # Attempt to log body for non-GET requests (could be empty for some requests)
-        if method != "GET":
-            try:
-                body = await request.body()
-                if body:
-                    # Limit body size in logs to avoid huge outputs
-                    body_str = body.decode('utf-8')
-                    if len(body_str) > 1000:
-                        body_str = body_str[:1000] + "... [truncated]"
-                    logger.info(f"Request Body: {body_str}")
-            except Exception:
-                # Some bodies can't be read twice, so we'll just ignore errors
-                pass
-    
-    response = await call_next(request)
-    process_time = time.time() - start_time
-    response.headers["X-Process-Time"] = str(process_time)
-    
-    # Log completion time in DEV mode
-    if MODE == "DEV":
-        logger.info(f"Request to {request.url.path} processed in {process_time:.4f} seconds")
-    
-    return response
+# Add request timing middleware, logging every request in DEV mode
+app.add_middleware(TimingMiddleware, log_requests=MODE == "DEV")
 
 # Error handler
 @app.exception_handler(Exception)
@@ -121,10 +104,11 @@ async def health_check():
 
 # Start the server when executed directly
 if __name__ == "__main__":
-    logger.info(f"Starting server on port {PORT}")
+    logger.info(f"Starting server on port {PORT} with {WORKERS} worker(s)")
     uvicorn.run(
         "main:app",
         host="0.0.0.0",
         port=PORT,
+        workers=WORKERS,
         reload=False  # Watchdog handles reloading
     )
\ No newline at end of file
@@ -1,34 +1,279 @@
-from fastapi import APIRouter, HTTPException, Query, Path, Body
-from typing import Dict, Any, List, Optional
+from fastapi import APIRouter, HTTPException, Query, Path, Body, Header, Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from typing import Dict, Any, List, Optional, Tuple, Union
 
-from schemas.template_schemas import TemplateCreate, TemplateResponse, TemplateUpdate
-from services.template_service import get_templates, get_template_by_id, create_template, update_template, delete_template
+from schemas.template_schemas import (
+    TemplateCreate, TemplatePage, TemplateResponse, TemplateUpdate,
+    TemplateRenderRequest, TemplateRenderResponse, TemplateBatchRenderRequest, TemplateBatchRenderResponse,
+    TemplateBulkUpdateItem, TemplateBulkDelete, TemplateBulkResponse,
+    TemplateImportItem, TemplateImportResponse
+)
+from services.template_feed import subscribe
+from services.template_patch import PatchError, PatchTestFailed
+from services.template_render import RenderError
+from services.template_serializer import serialize_template, serialize_templates, serialize_page
+from services.template_store import WriteConflictError
+from services.template_service import (
+    get_templates, get_templates_page, search_templates, get_template_by_id, create_template, update_template, delete_template,
+    render_template, render_template_batch, create_templates, update_templates, delete_templates,
+    iter_templates, import_templates, patch_template, PreconditionFailedError, get_collection_version, current_collection_version, template_etag
+)
+from utils.json_codec import FastJSONResponse, loads
 from utils.logger import logger
+from utils.ndjson import LineTooLongError, iter_lines
 
-router = APIRouter()
+router = APIRouter(default_response_class=FastJSONResponse)
 
-@router.get("/", response_model=List[TemplateResponse])
+# Maximum number of templates in a page of cursor pagination
+MAX_PAGE_SIZE = 100
+
+# Maximum number of serialized list pages kept between two writes. Only pages of up to
+# MAX_PAGE_SIZE templates are cached, so large legacy pages cannot fill it with the whole catalogue
+MAX_CACHED_PAGES = 1024
+
+# Serialized list pages by query, valid for a single collection version
+_page_cache: Dict[Tuple, bytes] = {}
+_page_cache_version: Optional[str] = None
+
+# Templates read (export) or written (import) per batch when streaming NDJSON
+EXPORT_BATCH_SIZE = 1000
+IMPORT_BATCH_SIZE = 1000
+
+# Maximum size of a single NDJSON import line, and number of line errors reported back
+MAX_IMPORT_LINE_BYTES = 1024 * 1024
+MAX_IMPORT_ERRORS = 100
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Check an If-None-Match header against an ETag, using weak comparison.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (candidate.strip() for candidate in if_none_match.split(","))
+    return any(candidate.removeprefix("W/") == etag for candidate in candidates)
+
+def _not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag})
+
+def _json(body: bytes, status_code: int = 200, etag: Optional[str] = None) -> Response:
+    """
+    Wrap pre-serialized JSON in a response, bypassing response model validation.
+    
+    The routes keep their response_model so the OpenAPI schema is unchanged.
+    """
+    headers = {"ETag": etag} if etag else None
+    return Response(content=body, status_code=status_code, media_type="application/json", headers=headers)
+
+@router.get("/", response_model=Union[List[TemplateResponse], TemplatePage])
 async def list_templates(
     skip: int = Query(0, description="Number of templates to skip"),
-    limit: int = Query(10, description="Maximum number of templates to return")
+    limit: int = Query(10, description=f"Maximum number of templates to return, 1 to {MAX_PAGE_SIZE} with cursor pagination"),
+    paginate: Optional[str] = Query(None, pattern="^cursor$", description="Set to cursor to get the first page of cursor pagination"),
+    cursor: Optional[str] = Query(None, description="Cursor returned by the previous page (an empty value starts cursor pagination, like paginate=cursor)"),
+    tags: Optional[str] = Query(None, description="Comma separated tags to filter by"),
+    match: str = Query("any", pattern="^(any|all)$", description="Match templates with any or all of the tags"),
+    if_none_match: Optional[str] = Header(None, description="ETag of a previously fetched list")
 ):
     """
     Get a list of templates with pagination.
+    
+    Without `paginate` or `cursor` the legacy skip/limit list is returned.
+    With `paginate=cursor` (or an empty `cursor`, kept for existing clients)
+    the response is the first page with `items` and a `next_cursor`; pass
+    that cursor to get the next page. Pages hold at most MAX_PAGE_SIZE
+    templates.
+    
+    The ETag of a list changes on every write; serialized pages of up to
+    MAX_PAGE_SIZE templates are cached until then.
     """
-    templates = await get_templates(skip, limit)
-    return templates
+    global _page_cache_version
+    
+    paginated = paginate == "cursor" or cursor is not None
+    if paginated and not 1 <= limit <= MAX_PAGE_SIZE:
+        raise HTTPException(status_code=422, detail=f"limit must be between 1 and {MAX_PAGE_SIZE} with cursor pagination")
+    
+    etag = f'"{await get_collection_version()}"'
+    if _etag_matches(if_none_match, etag):
+        return _not_modified(etag)
+    
+    cache_key = (skip, limit, paginated, cursor, tags, match)
+    if _page_cache_version == etag:
+        body = _page_cache.get(cache_key)
+        if body is not None:
+            return _json(body, etag=etag)
+    
+    tag_list = [tag.strip() for tag in tags.split(",") if tag.strip()] if tags else None
+    match_all = match == "all"
+    
+    if not paginated:
+        body = serialize_templates(await get_templates(skip, limit, tag_list, match_all))
+    else:
+        try:
+            templates, next_cursor = await get_templates_page(cursor or None, limit, tag_list, match_all)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        body = serialize_page(templates, next_cursor)
+    
+    # Tag the page with the version it was read at, which may be newer than the one checked above
+    etag = f'"{current_collection_version()}"'
+    if _page_cache_version != etag:
+        _page_cache.clear()
+        _page_cache_version = etag
+    if limit <= MAX_PAGE_SIZE:
+        if len(_page_cache) >= MAX_CACHED_PAGES:
+            _page_cache.pop(next(iter(_page_cache)))
+        _page_cache[cache_key] = body
+    
+    return _json(body, etag=etag)
+
+@router.get("/search", response_model=List[TemplateResponse])
+async def search_templates_by_text(
+    q: str = Query(..., min_length=1, description="Words to search for in name, description and content"),
+    limit: int = Query(10, ge=1, le=100, description="Maximum number of templates to return")
+):
+    """
+    Search templates by text, best match first.
+    
+    Every word of the query must match the start of a word in the template.
+    """
+    return _json(serialize_templates(await search_templates(q, limit)))
+
+@router.post("/bulk", response_model=TemplateBulkResponse, status_code=201)
+async def create_templates_in_bulk(
+    templates: List[TemplateCreate] = Body(..., max_length=10000, description="Templates to create")
+):
+    """
+    Create several templates in one request.
+    """
+    created = await create_templates(templates)
+    return {"results": [{"id": template.template_id, "status": "created"} for template in created]}
+
+@router.put("/bulk", response_model=TemplateBulkResponse)
+async def update_templates_in_bulk(
+    templates: List[TemplateBulkUpdateItem] = Body(..., max_length=10000, description="Templates to update, each with its ID")
+):
+    """
+    Update several templates in one request.
+    """
+    try:
+        updated = await update_templates([(template.id, template) for template in templates])
+    except WriteConflictError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return {"results": [
+        {"id": template.id, "status": "updated" if result else "not_found"}
+        for template, result in zip(templates, updated)
+    ]}
+
+@router.post("/bulk/delete", response_model=TemplateBulkResponse)
+async def delete_templates_in_bulk(
+    request: TemplateBulkDelete = Body(..., description="IDs of the templates to delete")
+):
+    """
+    Delete several templates in one request.
+    """
+    deleted = await delete_templates(request.ids)
+    return {"results": [
+        {"id": template_id, "status": "deleted" if found else "not_found"}
+        for template_id, found in zip(request.ids, deleted)
+    ]}
+
+@router.get("/export", responses={200: {"description": "One template per line, in the TemplateResponse shape", "content": {"application/x-ndjson": {}}}})
+async def export_templates():
+    """
+    Export every template as NDJSON, streamed in creation order.
+    
+    Templates are read and written out one batch at a time, so memory use
+    does not grow with the size of the catalogue.
+    """
+    async def lines():
+        async for templates in iter_templates(EXPORT_BATCH_SIZE):
+            yield b"".join([serialize_template(template, cache=False) + b"\n" for template in templates])
+    
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+@router.get("/changes", responses={200: {"description": "Server-Sent Events stream of template changes", "content": {"text/event-stream": {}}}})
+async def stream_template_changes(
+    last_event_id: Optional[str] = Header(None, description="ID of the last event received, to resume after it"),
+    since: Optional[str] = Query(None, description="Same as Last-Event-ID, for clients that cannot set headers")
+):
+    """
+    Stream template changes as Server-Sent Events.
+    
+    Each `created`, `updated` or `deleted` event carries the template ID
+    and, except for deletions, the template. Reconnect with Last-Event-ID
+    to resume; when events were missed (or the ID comes from another
+    worker), a `reset` event tells the client to refetch the templates.
+    """
+    return StreamingResponse(
+        subscribe(last_event_id or since),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.post(
+    "/import",
+    response_model=TemplateImportResponse,
+    openapi_extra={"requestBody": {"required": True, "content": {"application/x-ndjson": {"schema": {"type": "string"}}}}}
+)
+async def import_templates_ndjson(request: Request):
+    """
+    Import templates from an NDJSON body, one template per line.
+    
+    The body is parsed as it arrives and imported in batches, so memory use
+    does not grow with its size. The output of the export endpoint can be
+    imported as it is: IDs and timestamps are kept when provided, and a
+    template replaces the existing one with the same ID. Invalid lines are
+    skipped and reported.
+    """
+    imported = 0
+    failed = 0
+    errors = []
+    batch = []
+    try:
+        async for line_number, line in iter_lines(request.stream(), MAX_IMPORT_LINE_BYTES):
+            try:
+                batch.append(TemplateImportItem.model_validate_json(line))
+            except ValidationError as e:
+                failed += 1
+                if len(errors) < MAX_IMPORT_ERRORS:
+                    message = "; ".join(f"{'.'.join(str(part) for part in error['loc']) or 'line'}: {error['msg']}" for error in e.errors())
+                    errors.append({"line": line_number, "error": message})
+                continue
+            
+            if len(batch) >= IMPORT_BATCH_SIZE:
+                imported += await import_templates(batch)
+                batch = []
+    except LineTooLongError as e:
+        raise HTTPException(status_code=413, detail=f"{e}; {imported} templates were imported before it")
+    
+    if batch:
+        imported += await import_templates(batch)
+    
+    logger.info(f"Import finished: {imported} templates imported, {failed} lines rejected")
+    return {"imported": imported, "failed": failed, "errors": errors}
 
 @router.get("/{template_id}", response_model=TemplateResponse)
 async def get_template(
-    template_id: str = Path(..., description="The ID of the template to get")
+    template_id: str = Path(..., description="The ID of the template to get"),
+    if_none_match: Optional[str] = Header(None, description="ETag of a previously fetched version of the template")
 ):
     """
     Get a template by ID.
+    
+    Returns 304 without a body when If-None-Match holds the current ETag.
     """
     template = await get_template_by_id(template_id)
     if not template:
         raise HTTPException(status_code=404, detail="Template not found")
-    return template
+    
+    etag = template_etag(template)
+    if _etag_matches(if_none_match, etag):
+        return _not_modified(etag)
+    
+    return _json(serialize_template(template), etag=etag)
 
 @router.post("/", response_model=TemplateResponse, status_code=201)
 async def create_new_template(
@@ -38,7 +283,7 @@ async def create_new_template(
     Create a new template.
     """
     created_template = await create_template(template)
-    return created_template
+    return _json(serialize_template(created_template), status_code=201, etag=template_etag(created_template))
 
 @router.put("/{template_id}", response_model=TemplateResponse)
 async def update_existing_template(
@@ -48,10 +293,59 @@ async def update_existing_template(
     """
     Update an existing template.
     """
-    updated_template = await update_template(template_id, template)
+    try:
+        updated_template = await update_template(template_id, template)
+    except WriteConflictError as e:
+        raise HTTPException(status_code=409, detail=str(e))
     if not updated_template:
         raise HTTPException(status_code=404, detail="Template not found")
-    return updated_template
+    return _json(serialize_template(updated_template), etag=template_etag(updated_template))
+
+@router.patch(
+    "/{template_id}",
+    response_model=TemplateResponse,
+    openapi_extra={"requestBody": {"required": True, "content": {
+        "application/json-patch+json": {"schema": {"type": "array", "items": {"type": "object"}}},
+        "application/merge-patch+json": {"schema": {"type": "object"}},
+    }}}
+)
+async def patch_existing_template(
+    request: Request,
+    template_id: str = Path(..., description="The ID of the template to patch"),
+    if_match: Optional[str] = Header(None, description="ETag the template must still have for the patch to apply")
+):
+    """
+    Partially update a template.
+    
+    Send RFC 6902 operations as `application/json-patch+json`, or an RFC 7396
+    merge patch as `application/merge-patch+json` (or `application/json`).
+    Paths are relative to the template, e.g. `/content/footer`. With
+    If-Match, the patch is only applied if the template still has that ETag.
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if content_type == "application/json-patch+json":
+        merge = False
+    elif content_type in ("application/merge-patch+json", "application/json"):
+        merge = True
+    else:
+        raise HTTPException(status_code=415, detail="Use application/json-patch+json or application/merge-patch+json")
+    
+    try:
+        patch = loads(await request.body())
+    except ValueError:
+        raise HTTPException(status_code=400, detail="The patch is not valid JSON")
+    
+    try:
+        patched_template = await patch_template(template_id, patch, merge, if_match)
+    except PreconditionFailedError as e:
+        raise HTTPException(status_code=412, detail=str(e))
+    except (PatchTestFailed, WriteConflictError) as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except PatchError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    if not patched_template:
+        raise HTTPException(status_code=404, detail="Template not found")
+    return _json(serialize_template(patched_template), etag=template_etag(patched_template))
 
 @router.delete("/{template_id}")
 async def delete_existing_template(
@@ -63,4 +357,33 @@ async def delete_existing_template(
     success = await delete_template(template_id)
     if not success:
         raise HTTPException(status_code=404, detail="Template not found")
-    return {"message": "Template deleted successfully"} 
\ No newline at end of file
+    return {"message": "Template deleted successfully"} 
+
+@router.post("/{template_id}/render", response_model=TemplateRenderResponse)
+async def render_existing_template(
+    template_id: str = Path(..., description="The ID of the template to render"),
+    request: TemplateRenderRequest = Body(..., description="Placeholder values")
+):
+    """
+    Render a template with a set of placeholder values.
+    """
+    try:
+        content = await render_template(template_id, request.parameters)
+    except RenderError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    if content is None:
+        raise HTTPException(status_code=404, detail="Template not found")
+    return {"template_id": template_id, "content": content}
+
+@router.post("/{template_id}/render/batch", response_model=TemplateBatchRenderResponse)
+async def render_existing_template_batch(
+    template_id: str = Path(..., description="The ID of the template to render"),
+    request: TemplateBatchRenderRequest = Body(..., description="Placeholder values for each render")
+):
+    """
+    Render a template once for each set of placeholder values.
+    """
+    results = await render_template_batch(template_id, request.parameters)
+    if results is None:
+        raise HTTPException(status_code=404, detail="Template not found")
+    return {"template_id": template_id, "results": results}
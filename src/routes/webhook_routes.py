@@ -2,7 +2,10 @@ from fastapi import APIRouter, Depends, Request, Query
 from typing import Dict, Any, Optional
 
 from controllers.webhook_controller import WebhookController
-from schemas.webhook_schemas import WebhookCallback
+from schemas.webhook_schemas import WebhookCallback, WebhookBatchResponse, WebhookPayload
+from services.webhook_queue import get_metrics
+from services.webhook_delivery import get_metrics as get_delivery_metrics
+from services.webhook_admission import get_stats as get_admission_stats
 
 router = APIRouter()
 
@@ -13,16 +16,56 @@ async def verify_webhook(token: str = Query(..., description="Verification token
     """
     return await WebhookController.verify_webhook(token)
 
-@router.post("/receive")
+@router.post(
+    "/receive",
+    status_code=202,
+    dependencies=[Depends(WebhookController.admit_webhook)],
+    openapi_extra={"requestBody": {"required": True, "content": {
+        "application/json": {"schema": WebhookPayload.model_json_schema()},
+    }}}
+)
 async def receive_webhook(request: Request):
     """
-    Receive and process a webhook.
+    Receive a webhook and queue it for processing.
+    
+    Answers 202 as soon as the webhook is queued, 400 when it is invalid,
+    413 when it is larger than WEBHOOK_MAX_BODY_BYTES, 429 when the queue
+    is full or the sender is over its rate limit, and 503 while processing
+    is not running.
+    A duplicate delivery is not processed again: it answers 200 with the
+    result of the first one once processed.
     """
     return await WebhookController.receive_webhook(request)
 
+@router.post(
+    "/receive/batch",
+    response_model=WebhookBatchResponse,
+    dependencies=[Depends(WebhookController.admit_webhook)],
+    openapi_extra={"requestBody": {"required": True, "content": {
+        "application/json": {"schema": {"type": "array", "items": WebhookPayload.model_json_schema()}},
+        "application/x-ndjson": {"schema": {"type": "string"}},
+    }}}
+)
+async def receive_webhook_batch(request: Request):
+    """
+    Receive a batch of webhooks, as a JSON array or NDJSON (one event per line).
+    
+    The events are processed before answering, concurrently, and the result
+    of each one is returned in the order of the batch. Invalid events are
+    reported at their index without failing the batch.
+    """
+    return await WebhookController.receive_webhook_batch(request)
+
+@router.get("/metrics")
+async def webhook_metrics():
+    """
+    Get the webhook queue depth, processing, admission and outbound delivery counters.
+    """
+    return {**get_metrics(), "admission": get_admission_stats(), "delivery": get_delivery_metrics()}
+
 @router.post("/callback")
 async def webhook_callback(callback_data: WebhookCallback):
     """
-    Handle a webhook callback.
+    Handle a webhook callback, forwarding it to WEBHOOK_CALLBACK_URL when configured.
     """
     return await WebhookController.handle_webhook_callback(callback_data.dict()) 
\ No newline at end of file
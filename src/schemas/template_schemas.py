@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, validator
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Union
 from datetime import datetime
 import uuid
 
@@ -82,4 +82,81 @@ class TemplateResponse(TemplateBase):
                 "created_at": "2023-11-01T12:00:00",
                 "updated_at": "2023-11-01T12:00:00"
             }
-        } 
\ No newline at end of file
+        } 
+
+
+class TemplatePage(BaseModel):
+    """Cursor-paginated template list model, returned with `paginate=cursor` or a `cursor` (an empty one starts at the first page)."""
+    items: List[TemplateResponse] = Field(default_factory=list, description="Templates in the page")
+    next_cursor: Optional[str] = Field(None, description="Cursor of the next page, null when there are no more templates")
+
+class TemplateRenderRequest(BaseModel):
+    """Template render request model."""
+    parameters: Union[Dict[str, Any], List[Any]] = Field(default_factory=dict, description="Values by placeholder name, or a list of values for {{1}}, {{2}}, ...")
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "parameters": {"1": "Alice"}
+            }
+        }
+
+class TemplateRenderResponse(BaseModel):
+    """Template render response model."""
+    template_id: str = Field(..., description="ID of the rendered template")
+    content: Dict[str, Any] = Field(..., description="Rendered content of the template")
+
+class TemplateBatchRenderRequest(BaseModel):
+    """Template batch render request model."""
+    parameters: List[Union[Dict[str, Any], List[Any]]] = Field(..., max_length=10000, description="One set of parameters per render")
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "parameters": [{"1": "Alice"}, {"1": "Bob"}, ["Carol"]]
+            }
+        }
+
+class TemplateRenderResult(BaseModel):
+    """Result of a single render of a batch."""
+    content: Optional[Dict[str, Any]] = Field(None, description="Rendered content, null when the render failed")
+    error: Optional[str] = Field(None, description="Error of the render, null when it succeeded")
+
+class TemplateBatchRenderResponse(BaseModel):
+    """Template batch render response model."""
+    template_id: str = Field(..., description="ID of the rendered template")
+    results: List[TemplateRenderResult] = Field(..., description="One result per set of parameters, in request order")
+
+class TemplateBulkUpdateItem(TemplateUpdate):
+    """Template update model for bulk updates."""
+    id: str = Field(..., description="ID of the template to update")
+
+class TemplateBulkDelete(BaseModel):
+    """Template bulk delete model."""
+    ids: List[str] = Field(..., max_length=10000, description="IDs of the templates to delete")
+
+class TemplateBulkResult(BaseModel):
+    """Result of a single item of a bulk operation."""
+    id: str = Field(..., description="ID of the template")
+    status: str = Field(..., description="created, updated, deleted or not_found")
+
+class TemplateBulkResponse(BaseModel):
+    """Template bulk operation response model."""
+    results: List[TemplateBulkResult] = Field(..., description="One result per item, in request order")
+
+class TemplateImportItem(TemplateCreate):
+    """Template import model, one per NDJSON line; exported templates can be imported as they are."""
+    id: Optional[uuid.UUID] = Field(None, description="ID to keep; a template with the same ID is replaced. A new ID is generated when missing")
+    created_at: Optional[datetime] = Field(None, description="Creation timestamp to keep, defaults to the import time")
+    updated_at: Optional[datetime] = Field(None, description="Last update timestamp to keep, defaults to the creation timestamp")
+
+class TemplateImportError(BaseModel):
+    """Error of a single line of an import."""
+    line: int = Field(..., description="Line number in the request body, starting at 1")
+    error: str = Field(..., description="Why the line was rejected")
+
+class TemplateImportResponse(BaseModel):
+    """Template import response model."""
+    imported: int = Field(..., description="Number of templates imported")
+    failed: int = Field(..., description="Number of lines rejected")
+    errors: List[TemplateImportError] = Field(default_factory=list, description="Errors of the first rejected lines")
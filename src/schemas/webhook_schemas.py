@@ -1,16 +1,30 @@
-from pydantic import BaseModel, Field
-from typing import Dict, Any, List, Optional
+from pydantic import BaseModel, Discriminator, Field, Tag
+from typing import Annotated, Dict, Any, List, Optional, Type, Union
 from datetime import datetime
 
 class WebhookBase(BaseModel):
     """Base webhook model with common fields."""
     event_type: str = Field(..., description="Type of the webhook event")
     timestamp: datetime = Field(default_factory=datetime.now, description="Timestamp of the event")
+    coalesced: int = Field(0, description="Number of earlier webhooks superseded by this one when coalescing is enabled")
+    
+    class Config:
+        extra = "allow"
 
 class WebhookPayload(WebhookBase):
     """Webhook payload model."""
     data: Dict[str, Any] = Field(..., description="Webhook payload data")
     
+    def data_field(self, name: str) -> Any:
+        """Get a data field by its name in the webhook JSON, or None if it is missing."""
+        data = self.data
+        if isinstance(data, dict):
+            return data.get(name)
+        for field_name, field in type(data).model_fields.items():
+            if (field.alias or field_name) == name:
+                return getattr(data, field_name)
+        return (data.model_extra or {}).get(name)
+    
     class Config:
         json_schema_extra = {
             "example": {
@@ -24,6 +38,117 @@ class WebhookPayload(WebhookBase):
             }
         }
 
+class MessageReceivedData(BaseModel):
+    """Data of a message.received webhook."""
+    message_id: Union[str, int] = Field(..., description="ID of the message")
+    sender: Optional[str] = Field(None, alias="from", description="Sender of the message")
+    content: Optional[str] = Field(None, description="Content of the message")
+    
+    class Config:
+        extra = "allow"
+        populate_by_name = True
+
+class MessageReceivedPayload(WebhookPayload):
+    """Payload of a message.received webhook."""
+    data: MessageReceivedData = Field(..., description="Message data")
+
+class UserCreatedData(BaseModel):
+    """Data of a user.created webhook."""
+    user_id: Union[str, int] = Field(..., description="ID of the user")
+    
+    class Config:
+        extra = "allow"
+
+class UserCreatedPayload(WebhookPayload):
+    """Payload of a user.created webhook."""
+    data: UserCreatedData = Field(..., description="User data")
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "event_type": "user.created",
+                "timestamp": "2023-11-01T12:00:00",
+                "data": {
+                    "user_id": "user123"
+                }
+            }
+        }
+
+class StatusUpdateData(BaseModel):
+    """Data of a status.update webhook."""
+    entity_id: Union[str, int] = Field(..., description="ID of the entity whose status changed")
+    status: str = Field(..., description="New status of the entity")
+    
+    class Config:
+        extra = "allow"
+
+class StatusUpdatePayload(WebhookPayload):
+    """Payload of a status.update webhook."""
+    data: StatusUpdateData = Field(..., description="Status data")
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "event_type": "status.update",
+                "timestamp": "2023-11-01T12:00:00",
+                "data": {
+                    "entity_id": "order_42",
+                    "status": "delivered"
+                }
+            }
+        }
+
+# Payload model of each event type with required data fields; other types are validated with WebhookPayload
+WEBHOOK_PAYLOAD_MODELS: Dict[str, Type[WebhookPayload]] = {
+    "message.received": MessageReceivedPayload,
+    "user.created": UserCreatedPayload,
+    "status.update": StatusUpdatePayload,
+}
+
+def payload_model(event_type: Any) -> Type[WebhookPayload]:
+    """Get the payload model of an event type."""
+    return WEBHOOK_PAYLOAD_MODELS.get(event_type, WebhookPayload) if isinstance(event_type, str) else WebhookPayload
+
+def _payload_tag(event: Any) -> str:
+    event_type = event.get("event_type") if isinstance(event, dict) else getattr(event, "event_type", None)
+    return event_type if isinstance(event_type, str) and event_type in WEBHOOK_PAYLOAD_MODELS else "*"
+
+# Any webhook, validated with the payload model of its event type (for TypeAdapter)
+WebhookEvent = Annotated[
+    Union[tuple(Annotated[model, Tag(event_type)] for event_type, model in WEBHOOK_PAYLOAD_MODELS.items()) + (Annotated[WebhookPayload, Tag("*")],)],
+    Discriminator(_payload_tag),
+]
+
+class WebhookBatchResponse(BaseModel):
+    """Results of a batch of webhooks, in the order of the batch."""
+    results: List[Dict[str, Any]] = Field(..., description="Result of each event, with its index in the batch")
+    processed: int = Field(..., description="Number of events processed successfully")
+    failed: int = Field(..., description="Number of invalid or failed events")
+    duplicates: int = Field(..., description="Number of events answered from an earlier delivery")
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "results": [
+                    {
+                        "index": 0,
+                        "id": "6aa0ddf11aae4b289b6f83fd26ce19ee",
+                        "status": "success",
+                        "message": "Message processed successfully",
+                        "data": {"message_id": "123456789", "processed": True}
+                    },
+                    {
+                        "index": 1,
+                        "status": "error",
+                        "message": "event_type: Field required"
+                    }
+                ],
+                "processed": 1,
+                "failed": 1,
+                "duplicates": 0
+            }
+        }
+
 class WebhookCallback(BaseModel):
     """Webhook callback model."""
     callback_id: str = Field(..., description="ID of the callback")
@@ -0,0 +1,114 @@
+from typing import Dict, Any, List, Optional, Tuple
+import hashlib
+import json
+
+# Interned content blobs by digest: [shared value, reference count, digests of the nested blobs]
+_blobs: Dict[bytes, List[Any]] = {}
+
+# Digests of the shared values by object id, so values that are already interned
+# (such as the untouched parts of a patched content) are not hashed again
+_digests_by_object: Dict[int, bytes] = {}
+
+def _scalar(value: Any) -> str:
+    """
+    Encode a scalar content value for hashing; `json.dumps` keeps 1, 1.0 and true apart.
+    """
+    return json.dumps(value, ensure_ascii=False)
+
+def _acquire(value: Any) -> Tuple[Optional[bytes], Any]:
+    """
+    Intern a content value and its nested dicts and lists, taking one reference on it.
+
+    Scalars are not interned and come back with None as their digest.
+    """
+    if isinstance(value, (dict, list)):
+        digest = _digests_by_object.get(id(value))
+        if digest is not None and _blobs[digest][0] is value:
+            _blobs[digest][1] += 1
+            return digest, value
+
+    if isinstance(value, dict):
+        children = [(key, _acquire(item)) for key, item in value.items()]
+        encoded = ",".join(
+            f"{_scalar(str(key))}:{'#' + digest.hex() if digest else _scalar(item)}"
+            for key, (digest, item) in children
+        )
+        encoded = "{" + encoded + "}"
+    elif isinstance(value, list):
+        children = [(None, _acquire(item)) for item in value]
+        encoded = "[" + ",".join('#' + digest.hex() if digest else _scalar(item) for _, (digest, item) in children) + "]"
+    else:
+        return None, value
+
+    digest = hashlib.blake2b(encoded.encode("utf-8"), digest_size=16).digest()
+    child_digests = tuple(child_digest for _, (child_digest, _) in children if child_digest is not None)
+
+    blob = _blobs.get(digest)
+    if blob is not None:
+        blob[1] += 1
+        # The shared value already holds its own references to the nested blobs
+        for child_digest in child_digests:
+            _release(child_digest)
+        return digest, blob[0]
+
+    if isinstance(value, dict):
+        shared = {key: item for key, (_, item) in children}
+    else:
+        shared = [item for _, (_, item) in children]
+    _blobs[digest] = [shared, 1, child_digests]
+    _digests_by_object[id(shared)] = digest
+    return digest, shared
+
+def _release(digest: bytes) -> None:
+    """
+    Drop one reference on an interned blob, freeing it and its nested blobs when unused.
+    """
+    blob = _blobs[digest]
+    blob[1] -= 1
+    if blob[1] == 0:
+        del _blobs[digest]
+        del _digests_by_object[id(blob[0])]
+        for child_digest in blob[2]:
+            _release(child_digest)
+
+def acquire(content: Dict[str, Any]) -> Tuple[bytes, Dict[str, Any]]:
+    """
+    Intern a template content, sharing it and its nested values with identical contents.
+
+    The returned value may be shared by several templates, so it must be
+    treated as read-only; changes are made on a copy which is acquired in
+    turn.
+
+    Args:
+        content: The template content
+
+    Returns:
+        A tuple with the content digest and the shared content value
+    """
+    return _acquire(content)
+
+def release(digest: Optional[bytes]) -> None:
+    """
+    Drop the reference a template held on its content.
+
+    Args:
+        digest: The content digest returned by acquire(), or None if the template never acquired one
+    """
+    if digest is not None:
+        _release(digest)
+
+def unique_blobs() -> int:
+    """
+    Get the number of distinct content values (including nested ones) held in memory.
+
+    Returns:
+        The number of interned blobs
+    """
+    return len(_blobs)
+
+def clear() -> None:
+    """
+    Drop every interned content value.
+    """
+    _blobs.clear()
+    _digests_by_object.clear()
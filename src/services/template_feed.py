@@ -0,0 +1,180 @@
+from typing import AsyncIterator, Awaitable, Callable, List, Optional
+import asyncio
+import uuid
+
+from services.template_record import TemplateRecord
+from services.template_serializer import serialize_template
+from utils.json_codec import dumps
+from utils.logger import logger
+
+# Number of recent events kept for subscribers to catch up and resume from
+FEED_BUFFER_SIZE = 10000
+
+# Seconds between keep-alive comments on an idle stream
+HEARTBEAT_SECONDS = 15.0
+
+# Event IDs are "<token>-<seq>"; the token tells apart the sequences of different
+# processes (and restarts), which cannot be resumed from one another
+_token = uuid.uuid4().hex[:8]
+
+# Ring buffer of encoded events: event `seq` lives at `seq % FEED_BUFFER_SIZE`
+_events: List[Optional[bytes]] = [None] * FEED_BUFFER_SIZE
+_next_seq = 1
+
+# Set and replaced on every publish, waking every waiting subscriber at once
+_published = asyncio.Event()
+
+_HEARTBEAT = b": keep-alive\n\n"
+
+# Pulls other processes' changes from a shared store into the feed, set by watch()
+_poll: Optional[Callable[[], Awaitable[None]]] = None
+_poll_interval = 1.0
+_poll_task: Optional[asyncio.Task] = None
+_subscribers = 0
+
+def _encode(seq: int, event_type: str, data: bytes) -> bytes:
+    return f"id: {_token}-{seq}\nevent: {event_type}\ndata: ".encode("utf-8") + data + b"\n\n"
+
+def _reset_event() -> bytes:
+    """
+    Build the event telling a subscriber that changes were missed and it must refetch.
+    """
+    return _encode(_next_seq - 1, "reset", b'{"type":"reset"}')
+
+def publish(event_type: str, template_id: str, template: Optional[TemplateRecord] = None) -> None:
+    """
+    Publish a template change to every subscriber.
+
+    The event is encoded once and the same bytes are sent to every
+    subscriber, so publishing costs the same whatever their number.
+
+    Args:
+        event_type: created, updated or deleted
+        template_id: The ID of the changed template
+        template: The template after the change, or None for deletions
+    """
+    data = b'{"type":' + dumps(event_type) + b',"id":' + dumps(template_id)
+    if template is not None:
+        data += b',"template":' + serialize_template(template)
+    _append(event_type, data + b"}")
+
+def reset() -> None:
+    """
+    Tell every subscriber to refetch, after the whole collection was reloaded.
+    """
+    _append("reset", b'{"type":"reset"}')
+
+def _append(event_type: str, data: bytes) -> None:
+    """
+    Add an event to the ring buffer and wake the subscribers.
+    """
+    global _next_seq, _published
+
+    seq = _next_seq
+    _events[seq % FEED_BUFFER_SIZE] = _encode(seq, event_type, data)
+    _next_seq = seq + 1
+
+    published, _published = _published, asyncio.Event()
+    published.set()
+
+def watch(poll: Callable[[], Awaitable[None]], interval: float) -> None:
+    """
+    Poll a shared store every `interval` seconds while anyone is subscribed.
+
+    Changes made by other processes only reach this feed when the store is
+    polled, which requests otherwise only do as they arrive. `poll` is
+    expected to publish the changes it finds.
+
+    Args:
+        poll: Coroutine function applying and publishing the store's new changes
+        interval: Seconds between polls
+    """
+    global _poll, _poll_interval
+
+    _poll = poll
+    _poll_interval = interval
+
+def stop_watching() -> None:
+    """
+    Stop polling the shared store, before it is closed.
+    """
+    global _poll
+
+    _poll = None
+    if _poll_task is not None:
+        _poll_task.cancel()
+
+async def _poll_loop() -> None:
+    """
+    Poll the watched store until the last subscriber leaves.
+    """
+    while _subscribers and _poll is not None:
+        await asyncio.sleep(_poll_interval)
+        try:
+            await _poll()
+        except Exception as e:
+            logger.error(f"Error polling template changes for the feed: {str(e)}", exc_info=True)
+
+def _resume_position(last_event_id: Optional[str]) -> Optional[int]:
+    """
+    Get the sequence number to resume after a Last-Event-ID, or None if it cannot be resumed.
+    """
+    if not last_event_id:
+        return _next_seq
+    token, _, seq = last_event_id.strip().rpartition("-")
+    if token != _token or not seq.isdigit():
+        return None
+    position = int(seq) + 1
+    if position > _next_seq or position < _next_seq - FEED_BUFFER_SIZE:
+        return None
+    return position
+
+async def subscribe(last_event_id: Optional[str] = None) -> AsyncIterator[bytes]:
+    """
+    Stream template changes as Server-Sent Events.
+
+    Subscribers share the ring buffer instead of holding a queue each: they
+    only keep their position in it and wait on a single event that every
+    publish sets. A subscriber that falls more than FEED_BUFFER_SIZE events
+    behind, or resumes from an unknown event ID, gets a `reset` event and
+    continues from the current position. While anyone is subscribed, the
+    watched store is polled so other processes' changes are streamed too.
+
+    Args:
+        last_event_id: ID of the last event the subscriber received, to resume after it
+
+    Yields:
+        Encoded SSE messages
+    """
+    global _subscribers, _poll_task
+
+    position = _resume_position(last_event_id)
+    if position is None:
+        logger.info(f"Change feed cannot resume after {last_event_id}, sending reset")
+        position = _next_seq
+        yield _reset_event()
+
+    # Tell the client how long to wait before reconnecting
+    yield b"retry: 3000\n\n"
+
+    _subscribers += 1
+    if _poll is not None and (_poll_task is None or _poll_task.done()):
+        _poll_task = asyncio.create_task(_poll_loop())
+    try:
+        while True:
+            while position < _next_seq:
+                if position < _next_seq - FEED_BUFFER_SIZE:
+                    # Overwritten while this subscriber was sending
+                    position = _next_seq
+                    yield _reset_event()
+                    continue
+                yield _events[position % FEED_BUFFER_SIZE]
+                position += 1
+
+            published = _published
+            try:
+                await asyncio.wait_for(published.wait(), HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield _HEARTBEAT
+    finally:
+        _subscribers -= 1
@@ -0,0 +1,215 @@
+from typing import Dict, Any, Callable, List
+
+class PatchError(ValueError):
+    """Raised when a patch is malformed or cannot be applied to a template."""
+
+class PatchTestFailed(PatchError):
+    """Raised when a JSON Patch `test` operation does not match the template."""
+
+def _parse_pointer(pointer: Any) -> List[str]:
+    """
+    Split an RFC 6901 JSON Pointer into its unescaped reference tokens.
+    """
+    if not isinstance(pointer, str) or (pointer and not pointer.startswith("/")):
+        raise PatchError(f"Invalid JSON Pointer: {pointer!r}")
+    if not pointer:
+        return []
+    return [token.replace("~1", "/").replace("~0", "~") for token in pointer[1:].split("/")]
+
+def _index(container: List[Any], token: str, allow_end: bool = False) -> int:
+    """
+    Resolve an array reference token to an index.
+    """
+    if allow_end and token == "-":
+        return len(container)
+    if not token.isdigit() or (token != "0" and token.startswith("0")):
+        raise PatchError(f"Invalid array index: {token!r}")
+    index = int(token)
+    if index > len(container) or (index == len(container) and not allow_end):
+        raise PatchError(f"Array index out of range: {token}")
+    return index
+
+def _get(document: Any, tokens: List[str]) -> Any:
+    """
+    Get the value a pointer refers to.
+    """
+    value = document
+    for token in tokens:
+        if isinstance(value, dict):
+            if token not in value:
+                raise PatchError(f"Path not found: /{'/'.join(tokens)}")
+            value = value[token]
+        elif isinstance(value, list):
+            value = value[_index(value, token)]
+        else:
+            raise PatchError(f"Path not found: /{'/'.join(tokens)}")
+    return value
+
+def _update(node: Any, tokens: List[str], change: Callable[[Any], Any]) -> Any:
+    """
+    Replace the value at a path with change(value), copying only the containers along the path.
+
+    Every value off the path is shared with the original document, which is never modified.
+    """
+    if not tokens:
+        return change(node)
+
+    token, rest = tokens[0], tokens[1:]
+    if isinstance(node, dict):
+        if token not in node:
+            raise PatchError(f"Path not found: {token!r}")
+        copy = dict(node)
+        copy[token] = _update(node[token], rest, change)
+        return copy
+    if isinstance(node, list):
+        index = _index(node, token)
+        copy = list(node)
+        copy[index] = _update(node[index], rest, change)
+        return copy
+    raise PatchError(f"Path not found: {token!r}")
+
+def _add(document: Any, tokens: List[str], value: Any) -> Any:
+    def add(parent: Any) -> Any:
+        token = tokens[-1]
+        if isinstance(parent, dict):
+            return {**parent, token: value}
+        if isinstance(parent, list):
+            index = _index(parent, token, allow_end=True)
+            return parent[:index] + [value] + parent[index:]
+        raise PatchError(f"Cannot add to a scalar value at /{'/'.join(tokens)}")
+    return _update(document, tokens[:-1], add)
+
+def _remove(document: Any, tokens: List[str]) -> Any:
+    def remove(parent: Any) -> Any:
+        token = tokens[-1]
+        if isinstance(parent, dict):
+            if token not in parent:
+                raise PatchError(f"Path not found: /{'/'.join(tokens)}")
+            return {key: item for key, item in parent.items() if key != token}
+        if isinstance(parent, list):
+            index = _index(parent, token)
+            return parent[:index] + parent[index + 1:]
+        raise PatchError(f"Path not found: /{'/'.join(tokens)}")
+    return _update(document, tokens[:-1], remove)
+
+def _json_equal(left: Any, right: Any) -> bool:
+    """
+    Compare JSON values, keeping booleans apart from numbers as RFC 6902 requires.
+    """
+    if isinstance(left, bool) or isinstance(right, bool):
+        return type(left) is type(right) and left == right
+    if isinstance(left, dict) and isinstance(right, dict):
+        return left.keys() == right.keys() and all(_json_equal(left[key], right[key]) for key in left)
+    if isinstance(left, list) and isinstance(right, list):
+        return len(left) == len(right) and all(_json_equal(a, b) for a, b in zip(left, right))
+    return left == right
+
+def apply_json_patch(document: Dict[str, Any], operations: Any) -> Dict[str, Any]:
+    """
+    Apply RFC 6902 JSON Patch operations to a document, copy-on-write.
+
+    The original document is left untouched and shares every value the
+    patch does not touch with the result, so the cost of a patch follows
+    the paths it changes rather than the size of the document.
+
+    Args:
+        document: The document to patch
+        operations: The list of patch operations
+
+    Returns:
+        The patched document
+
+    Raises:
+        PatchTestFailed: If a `test` operation does not match
+        PatchError: If the patch is malformed or a path cannot be resolved
+    """
+    if not isinstance(operations, list):
+        raise PatchError("A JSON Patch must be an array of operations")
+
+    for position, operation in enumerate(operations):
+        if not isinstance(operation, dict) or "op" not in operation or "path" not in operation:
+            raise PatchError(f"Operation {position} must be an object with 'op' and 'path'")
+        op = operation["op"]
+        tokens = _parse_pointer(operation["path"])
+        if not tokens:
+            raise PatchError(f"Operation {position} cannot target the whole template")
+        if op in ("add", "replace", "test") and "value" not in operation:
+            raise PatchError(f"Operation {position} ({op}) requires a 'value'")
+
+        if op == "add":
+            document = _add(document, tokens, operation["value"])
+        elif op == "remove":
+            document = _remove(document, tokens)
+        elif op == "replace":
+            _get(document, tokens)
+            document = _update(document, tokens, lambda _, value=operation["value"]: value)
+        elif op in ("move", "copy"):
+            from_tokens = _parse_pointer(operation.get("from"))
+            if not from_tokens:
+                raise PatchError(f"Operation {position} ({op}) requires a 'from' inside the template")
+            if op == "move" and tokens[:len(from_tokens)] == from_tokens and tokens != from_tokens:
+                raise PatchError(f"Operation {position} cannot move a value into itself")
+            value = _get(document, from_tokens)
+            if op == "move":
+                document = _remove(document, from_tokens)
+            document = _add(document, tokens, value)
+        elif op == "test":
+            if not _json_equal(_get(document, tokens), operation["value"]):
+                raise PatchTestFailed(f"Test failed at {operation['path']}")
+        else:
+            raise PatchError(f"Unknown operation {op!r}")
+
+    return document
+
+def apply_merge_patch(target: Any, patch: Any) -> Any:
+    """
+    Apply an RFC 7396 JSON Merge Patch, copy-on-write.
+
+    Objects are merged recursively, null removes a member and any other
+    value replaces it. Untouched values are shared with the target.
+
+    Args:
+        target: The document to patch
+        patch: The merge patch
+
+    Returns:
+        The patched document
+    """
+    if not isinstance(patch, dict):
+        return patch
+    result = dict(target) if isinstance(target, dict) else {}
+    for key, value in patch.items():
+        if value is None:
+            result.pop(key, None)
+        else:
+            result[key] = apply_merge_patch(result.get(key), value)
+    return result
+
+def validate_changes(changes: Dict[str, Any]) -> None:
+    """
+    Check the template fields changed by a patch, with the rules of TemplateUpdate.
+
+    Only changed fields are checked, and contents only at the top level, so
+    small edits to large templates stay cheap.
+
+    Args:
+        changes: The new values by field name
+
+    Raises:
+        PatchError: If a field is missing or has an invalid value
+    """
+    for field, value in changes.items():
+        if field == "name":
+            if not isinstance(value, str) or not value.strip():
+                raise PatchError("name must be a non-empty string")
+        elif field == "description":
+            if value is not None and not isinstance(value, str):
+                raise PatchError("description must be a string or null")
+        elif field == "content":
+            if not isinstance(value, dict):
+                raise PatchError("content must be an object")
+        elif field == "tags":
+            if not isinstance(value, list) or not all(isinstance(tag, str) for tag in value):
+                raise PatchError("tags must be an array of strings")
+        else:
+            raise PatchError(f"{field} cannot be patched")
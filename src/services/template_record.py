@@ -0,0 +1,156 @@
+from typing import Dict, Any, Iterable, Optional, Tuple
+from datetime import datetime, timedelta
+import sys
+import uuid
+
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+def to_timestamp(value: datetime) -> int:
+    """
+    Convert a (naive, local) datetime to integer microseconds since the epoch.
+
+    Timezone-aware datetimes are first converted to naive local time, which
+    is how the service records timestamps.
+
+    Args:
+        value: The datetime to convert
+
+    Returns:
+        The timestamp in microseconds
+    """
+    if value.tzinfo is not None:
+        value = value.astimezone().replace(tzinfo=None)
+    return (value - _EPOCH) // _MICROSECOND
+
+def from_timestamp(value: int) -> datetime:
+    """
+    Convert integer microseconds since the epoch back to a datetime.
+
+    Args:
+        value: The timestamp in microseconds
+
+    Returns:
+        The datetime
+    """
+    return _EPOCH + timedelta(microseconds=value)
+
+def parse_id(template_id: str) -> Optional[bytes]:
+    """
+    Convert a template ID to its 16-byte form.
+
+    Args:
+        template_id: The UUID string of the template
+
+    Returns:
+        The 16 bytes of the UUID, or None if the string is not a UUID
+    """
+    try:
+        return uuid.UUID(template_id).bytes
+    except (ValueError, AttributeError, TypeError):
+        return None
+
+def format_id(template_id: bytes) -> str:
+    """
+    Convert a 16-byte template ID to its UUID string.
+
+    Args:
+        template_id: The 16 bytes of the UUID
+
+    Returns:
+        The UUID string
+    """
+    return str(uuid.UUID(bytes=template_id))
+
+def intern_tags(tags: Optional[Iterable[str]]) -> Tuple[str, ...]:
+    """
+    Intern tag strings, so templates sharing a tag share a single string.
+
+    Args:
+        tags: The tags of a template
+
+    Returns:
+        The interned tags
+    """
+    return tuple(sys.intern(tag) for tag in tags) if tags else ()
+
+class TemplateRecord:
+    """
+    Compact in-memory representation of a template.
+
+    IDs are kept as 16 bytes, timestamps as integer microseconds and tags as
+    tuples of interned strings. Records are converted to the TemplateResponse
+    shape only when they leave the service. `content_key` is the digest of the
+    content once it has been interned by the template service.
+    """
+
+    __slots__ = ("id", "name", "description", "content", "tags", "created_at", "updated_at", "content_key")
+
+    def __init__(
+        self,
+        id: bytes,
+        name: str,
+        description: Optional[str],
+        content: Dict[str, Any],
+        tags: Tuple[str, ...],
+        created_at: int,
+        updated_at: int,
+        content_key: Optional[bytes] = None,
+    ):
+        self.id = id
+        self.name = name
+        self.description = description
+        self.content = content
+        self.tags = tags
+        self.created_at = created_at
+        self.updated_at = updated_at
+        self.content_key = content_key
+
+    @property
+    def template_id(self) -> str:
+        """The UUID string of the template."""
+        return format_id(self.id)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Convert the record to the TemplateResponse shape.
+
+        Returns:
+            The template as a dictionary
+        """
+        return {
+            "name": self.name,
+            "description": self.description,
+            "content": self.content,
+            "id": self.template_id,
+            "created_at": from_timestamp(self.created_at),
+            "updated_at": from_timestamp(self.updated_at),
+            "tags": list(self.tags),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "TemplateRecord":
+        """
+        Build a record from a template dictionary.
+
+        Args:
+            data: The template, with a UUID string ID and datetime (or ISO 8601) timestamps
+
+        Returns:
+            The record
+        """
+        created_at = data["created_at"]
+        updated_at = data["updated_at"]
+        if isinstance(created_at, str):
+            created_at = datetime.fromisoformat(created_at)
+        if isinstance(updated_at, str):
+            updated_at = datetime.fromisoformat(updated_at)
+        return cls(
+            id=uuid.UUID(data["id"]).bytes,
+            name=data["name"],
+            description=data.get("description"),
+            content=data["content"],
+            tags=intern_tags(data.get("tags")),
+            created_at=to_timestamp(created_at),
+            updated_at=to_timestamp(updated_at),
+        )
@@ -0,0 +1,159 @@
+from typing import Dict, Any, Callable, List, Tuple, Union
+from collections import OrderedDict
+import re
+
+from services.template_record import TemplateRecord
+from utils.logger import logger
+
+# Maximum number of compiled render plans kept in memory
+MAX_CACHED_PLANS = 10000
+
+# Placeholders look like {{1}} or {{first_name}}
+_PLACEHOLDER_PATTERN = re.compile(r"\{\{\s*([\w.-]+)\s*\}\}")
+
+# A compiled node renders one value of the content from the parameters
+RenderNode = Callable[[Dict[str, str]], Any]
+
+Parameters = Union[Dict[str, Any], List[Any]]
+
+class RenderError(ValueError):
+    """Raised when the parameters do not provide every placeholder of a template."""
+
+    def __init__(self, missing: List[str]):
+        self.missing = missing
+        super().__init__(f"Missing parameters: {', '.join(missing)}")
+
+class RenderPlan:
+    """
+    A template content compiled for rendering.
+
+    Strings with placeholders are turned into `str.format` patterns once, so
+    rendering only performs the substitutions.
+    """
+
+    __slots__ = ("render_content", "placeholders")
+
+    def __init__(self, content: Dict[str, Any]):
+        placeholders: Dict[str, None] = {}
+        self.render_content = _compile(content, placeholders)
+        self.placeholders: Tuple[str, ...] = tuple(placeholders)
+
+    def render(self, parameters: Parameters) -> Dict[str, Any]:
+        """
+        Render the content with the given parameters.
+
+        Args:
+            parameters: Values by placeholder name, or a list of values for the
+                positional placeholders {{1}}, {{2}}, ...
+
+        Returns:
+            The rendered content
+
+        Raises:
+            RenderError: If a placeholder has no value
+        """
+        values = normalize_parameters(parameters)
+        if len(values) < len(self.placeholders) or any(name not in values for name in self.placeholders):
+            raise RenderError([name for name in self.placeholders if name not in values])
+        return self.render_content(values)
+
+def normalize_parameters(parameters: Parameters) -> Dict[str, str]:
+    """
+    Convert render parameters to a mapping of placeholder name to string value.
+
+    Args:
+        parameters: Values by placeholder name, or a list of positional values
+
+    Returns:
+        The values by placeholder name
+    """
+    if isinstance(parameters, list):
+        return {str(position): str(value) for position, value in enumerate(parameters, start=1)}
+    return {str(name): str(value) for name, value in parameters.items()}
+
+def _compile_string(text: str, placeholders: Dict[str, None]) -> RenderNode:
+    """
+    Compile a string into a node substituting its placeholders.
+    """
+    names: List[str] = []
+    pattern_parts: List[str] = []
+    position = 0
+    for match in _PLACEHOLDER_PATTERN.finditer(text):
+        pattern_parts.append(text[position:match.start()].replace("{", "{{").replace("}", "}}"))
+        name = match.group(1)
+        if name not in names:
+            names.append(name)
+        pattern_parts.append(f"{{{names.index(name)}}}")
+        position = match.end()
+
+    if not names:
+        return lambda values: text
+
+    pattern_parts.append(text[position:].replace("{", "{{").replace("}", "}}"))
+    pattern = "".join(pattern_parts).format
+    placeholders.update(dict.fromkeys(names))
+
+    if len(names) == 1:
+        name = names[0]
+        return lambda values: pattern(values[name])
+    return lambda values: pattern(*[values[name] for name in names])
+
+def _compile(value: Any, placeholders: Dict[str, None]) -> RenderNode:
+    """
+    Compile a content value into a render node.
+    """
+    if isinstance(value, str):
+        return _compile_string(value, placeholders)
+
+    if isinstance(value, dict):
+        nodes = [(key, _compile(item, placeholders)) for key, item in value.items()]
+        return lambda values: {key: node(values) for key, node in nodes}
+
+    if isinstance(value, list):
+        nodes = [_compile(item, placeholders) for item in value]
+        return lambda values: [node(values) for node in nodes]
+
+    # Numbers, booleans and nulls are rendered as they are
+    return lambda values: value
+
+# Compiled plans by template ID, in least recently used order
+_plans: "OrderedDict[bytes, RenderPlan]" = OrderedDict()
+
+def get_plan(template: TemplateRecord) -> RenderPlan:
+    """
+    Get the compiled render plan of a template, compiling it on first use.
+
+    Args:
+        template: The template to render
+
+    Returns:
+        The render plan of the template content
+    """
+    template_id = template.id
+    plan = _plans.get(template_id)
+    if plan is not None:
+        _plans.move_to_end(template_id)
+        return plan
+
+    plan = RenderPlan(template.content)
+    _plans[template_id] = plan
+    if len(_plans) > MAX_CACHED_PLANS:
+        _plans.popitem(last=False)
+
+    logger.debug(f"Compiled render plan for template {template.template_id} with placeholders {plan.placeholders}")
+    return plan
+
+def invalidate(template_id: bytes) -> None:
+    """
+    Drop the compiled render plan of a template.
+
+    Args:
+        template_id: The ID of the template whose content changed
+    """
+    _plans.pop(template_id, None)
+
+def clear() -> None:
+    """
+    Drop every compiled render plan.
+    """
+    _plans.clear()
@@ -0,0 +1,210 @@
+from typing import Dict, Any, Iterator, List, Tuple
+import bisect
+import heapq
+import math
+import re
+
+from services.template_record import TemplateRecord
+from utils.logger import logger
+
+# Relative weight of a term depending on the field it was found in
+FIELD_WEIGHTS = {
+    "name": 3.0,
+    "description": 2.0,
+    "content": 1.0,
+}
+
+_TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+# Inverted index of term -> {template id: weighted term frequency}
+_postings: Dict[str, Dict[bytes, float]] = {}
+
+# Terms indexed for each template, so a template can be removed without scanning the index
+_template_terms: Dict[bytes, Tuple[str, ...]] = {}
+
+# Sorted vocabulary, used to expand prefixes with a binary search
+_vocabulary: List[str] = []
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split a text into lowercase search terms.
+
+    Args:
+        text: The text to tokenize
+
+    Returns:
+        The list of terms in the text
+    """
+    return _TOKEN_PATTERN.findall(text.lower())
+
+def _iter_strings(value: Any) -> Iterator[str]:
+    """
+    Yield every string nested inside a content value.
+    """
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from _iter_strings(item)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            yield from _iter_strings(item)
+
+def _weighted_terms(template: TemplateRecord) -> Dict[str, float]:
+    """
+    Compute the weighted term frequencies of a template.
+    """
+    weights: Dict[str, float] = {}
+
+    fields = (
+        ("name", [template.name or ""]),
+        ("description", [template.description or ""]),
+        ("content", _iter_strings(template.content)),
+    )
+    for field, texts in fields:
+        field_weight = FIELD_WEIGHTS[field]
+        for text in texts:
+            for term in tokenize(text):
+                weights[term] = weights.get(term, 0.0) + field_weight
+
+    return weights
+
+def index_template(template: TemplateRecord) -> None:
+    """
+    Add a template to the search index, replacing any previous version of it.
+
+    Args:
+        template: The template to index
+    """
+    template_id = template.id
+    remove_template(template_id)
+
+    weights = _weighted_terms(template)
+    for term, weight in weights.items():
+        postings = _postings.get(term)
+        if postings is None:
+            postings = _postings[term] = {}
+            bisect.insort(_vocabulary, term)
+        postings[template_id] = weight
+
+    _template_terms[template_id] = tuple(weights)
+
+def remove_template(template_id: bytes) -> None:
+    """
+    Remove a template from the search index.
+
+    Args:
+        template_id: The ID of the template to remove
+    """
+    for term in _template_terms.pop(template_id, ()):
+        postings = _postings.get(term)
+        if postings is None:
+            continue
+        postings.pop(template_id, None)
+        if not postings:
+            del _postings[term]
+            position = bisect.bisect_left(_vocabulary, term)
+            if position < len(_vocabulary) and _vocabulary[position] == term:
+                del _vocabulary[position]
+
+def clear() -> None:
+    """
+    Remove every template from the search index.
+    """
+    _postings.clear()
+    _template_terms.clear()
+    _vocabulary.clear()
+
+def _expand_prefix(prefix: str) -> List[str]:
+    """
+    Get every vocabulary term starting with a prefix.
+
+    The terms are a contiguous run of the sorted vocabulary, whose end is
+    found with a second binary search: U+10FFFF sorts after any character
+    a term can continue with.
+    """
+    start = bisect.bisect_left(_vocabulary, prefix)
+    end = bisect.bisect_left(_vocabulary, prefix + "\U0010ffff", start)
+    return _vocabulary[start:end]
+
+def _term_weights(query_term: str, total: int) -> List[Tuple[Dict[bytes, float], float]]:
+    """
+    Get the posting lists and IDF weights of the terms a query term expands to.
+    """
+    weighted_postings = []
+    for term in _expand_prefix(query_term):
+        postings = _postings[term]
+        idf = math.log(1 + total / len(postings))
+        if term != query_term:
+            # Rank exact matches above prefix matches
+            idf *= 0.5
+        weighted_postings.append((postings, idf))
+    return weighted_postings
+
+def search(query: str, limit: int = 10) -> List[Tuple[bytes, float]]:
+    """
+    Search the index for templates matching every term of a query.
+
+    Each query term matches every indexed term that starts with it, so a
+    short prefix costs as many posting lists as it has terms. Results are
+    ranked by the sum of TF-IDF scores, with exact term matches ranked
+    above prefix matches.
+
+    Args:
+        query: The search query
+        limit: Maximum number of results to return
+
+    Returns:
+        A list of (template id, score) tuples, best match first
+    """
+    query_terms = list(dict.fromkeys(tokenize(query)))
+    if not query_terms or limit <= 0:
+        return []
+
+    total = len(_template_terms)
+    expanded = []
+    for query_term in query_terms:
+        weighted_postings = _term_weights(query_term, total)
+        if not weighted_postings:
+            return []
+        size = sum(len(postings) for postings, _ in weighted_postings)
+        expanded.append((size, weighted_postings))
+
+    # Start from the rarest query term so the work follows the smallest posting lists
+    expanded.sort(key=lambda item: item[0])
+
+    scores: Dict[bytes, float] = {}
+    for postings, idf in expanded[0][1]:
+        for template_id, weight in postings.items():
+            scores[template_id] = scores.get(template_id, 0.0) + weight * idf
+
+    for size, weighted_postings in expanded[1:]:
+        narrowed: Dict[bytes, float] = {}
+        if len(scores) * len(weighted_postings) < size:
+            # Few candidates left: probe the posting lists for each of them
+            for template_id, score in scores.items():
+                matched = False
+                for postings, idf in weighted_postings:
+                    weight = postings.get(template_id)
+                    if weight is not None:
+                        score += weight * idf
+                        matched = True
+                if matched:
+                    narrowed[template_id] = score
+        else:
+            # Many candidates left: walk the posting lists and keep the candidates they hit
+            for postings, idf in weighted_postings:
+                for template_id, weight in postings.items():
+                    score = narrowed.get(template_id)
+                    if score is None:
+                        score = scores.get(template_id)
+                        if score is None:
+                            continue
+                    narrowed[template_id] = score + weight * idf
+        scores = narrowed
+        if not scores:
+            return []
+
+    results = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+    logger.debug(f"Search for '{query}' matched {len(scores)} templates")
+    return results
@@ -0,0 +1,81 @@
+from typing import List, Optional
+from collections import OrderedDict
+
+from services.template_record import TemplateRecord
+from utils.json_codec import dumps
+
+# Maximum number of serialized templates kept in memory
+MAX_CACHED_TEMPLATES = 100000
+
+# Serialized templates by ID, in least recently used order
+_cache: "OrderedDict[bytes, bytes]" = OrderedDict()
+
+def serialize_template(template: TemplateRecord, cache: bool = True) -> bytes:
+    """
+    Serialize a template in the TemplateResponse shape, reusing the cached bytes.
+    
+    Templates are built and validated by the template service, so they are
+    written out directly instead of being validated again as response models.
+    
+    Args:
+        template: The template to serialize
+        cache: Whether to keep the result; full scans such as exports pass False
+            so they do not evict the templates being served
+        
+    Returns:
+        The JSON bytes of the template
+    """
+    template_id = template.id
+    body = _cache.get(template_id)
+    if body is not None:
+        if cache:
+            _cache.move_to_end(template_id)
+        return body
+    
+    body = dumps(template.to_dict())
+    if not cache:
+        return body
+    _cache[template_id] = body
+    if len(_cache) > MAX_CACHED_TEMPLATES:
+        _cache.popitem(last=False)
+    return body
+
+def serialize_templates(templates: List[TemplateRecord]) -> bytes:
+    """
+    Serialize a list of templates as a JSON array.
+    
+    Args:
+        templates: The templates to serialize
+        
+    Returns:
+        The JSON bytes of the array
+    """
+    return b"[" + b",".join([serialize_template(template) for template in templates]) + b"]"
+
+def serialize_page(templates: List[TemplateRecord], next_cursor: Optional[str]) -> bytes:
+    """
+    Serialize a page of templates in the TemplatePage shape.
+    
+    Args:
+        templates: The templates of the page
+        next_cursor: The cursor of the next page
+        
+    Returns:
+        The JSON bytes of the page
+    """
+    return b'{"items":' + serialize_templates(templates) + b',"next_cursor":' + dumps(next_cursor) + b"}"
+
+def invalidate(template_id: bytes) -> None:
+    """
+    Drop the serialized form of a template.
+    
+    Args:
+        template_id: The ID of the template that changed
+    """
+    _cache.pop(template_id, None)
+
+def clear() -> None:
+    """
+    Drop every serialized template.
+    """
+    _cache.clear()
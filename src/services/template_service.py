@@ -1,34 +1,528 @@
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, AsyncIterator, List, Optional, Set, Tuple
 import uuid
 from datetime import datetime
 import asyncio
+import base64
+import bisect
+import os
 
+from config.env import TEMPLATE_STORE, TEMPLATE_STORE_PATH, TEMPLATE_COMMIT_INTERVAL_MS, TEMPLATE_SNAPSHOT_EVERY, TEMPLATE_FEED_POLL_MS
+from services import template_content, template_feed, template_patch, template_render, template_search, template_serializer
+from services.template_record import TemplateRecord, parse_id, intern_tags, to_timestamp
+from services.template_store import TemplateStore, MemoryTemplateStore, LogTemplateStore, SqliteTemplateStore, WriteConflictError
 from utils.logger import logger
 
-# In-memory storage for templates (replace with a database in a real application)
-templates_db = {}
+# In-memory working set of templates by 16-byte ID, persisted through the configured store
+templates_db: Dict[bytes, TemplateRecord] = {}
 
-async def get_templates(skip: int = 0, limit: int = 10) -> List[Dict[str, Any]]:
+# Persistence backend, replaced by init_template_store() at startup
+_store: TemplateStore = MemoryTemplateStore()
+
+# Version of the whole collection, bumped on every change so list responses can be
+# cached and validated. The process token keeps versions of different workers apart.
+_collection_version = 0
+_process_token = uuid.uuid4().hex[:8]
+
+# (collection version, store change position) when a shared store was last caught up with;
+# until the collection changes again, it is the store's state at that position on every worker
+_synced: Optional[Tuple[int, int]] = None
+
+def _bump_version() -> None:
+    """
+    Mark the collection as changed.
+    """
+    global _collection_version
+    _collection_version += 1
+
+def current_collection_version() -> str:
+    """
+    Get the version of the collection as currently held in memory.
+    
+    With a shared store, a collection caught up with the store is versioned
+    by the store's change position, which is the same on every worker; local
+    changes not polled back yet fall back to a version of this process.
+    
+    Returns:
+        An opaque version string that changes on every write
+    """
+    if _synced is not None and _synced[0] == _collection_version:
+        return f"store-{_synced[1]}"
+    return f"{_process_token}-{_collection_version}"
+
+def _mark_synced() -> None:
+    """
+    Record that the in-memory collection matches the store at its current change position.
+    """
+    global _synced
+    
+    position = _store.change_position()
+    _synced = (_collection_version, position) if position is not None else None
+
+def template_etag(template: TemplateRecord) -> str:
+    """
+    Build the strong ETag of a template from its ID and last update time.
+    
+    Args:
+        template: The template
+        
+    Returns:
+        The quoted ETag value
+    """
+    return f'"{template.template_id}-{template.updated_at}"'
+
+class PreconditionFailedError(Exception):
+    """Raised when a conditional write finds the template changed since its ETag was read."""
+
+def _if_match(if_match: str, etag: str) -> bool:
+    """
+    Check an If-Match header against an ETag, using strong comparison.
+    """
+    if if_match.strip() == "*":
+        return True
+    return any(candidate.strip() == etag for candidate in if_match.split(","))
+
+# Ordered index of (created_at, id) keys, kept sorted so pages can be sliced
+# without copying or scanning the whole table
+_ordered_index: List[Tuple[int, bytes]] = []
+
+def _index_key(template: TemplateRecord) -> Tuple[int, bytes]:
+    """
+    Build the ordered index key for a template.
+    """
+    return (template.created_at, template.id)
+
+def _index_add(template: TemplateRecord) -> None:
+    """
+    Insert a template into the ordered index.
+    """
+    key = _index_key(template)
+    # Templates are created with increasing timestamps, so this is almost always an append
+    if not _ordered_index or _ordered_index[-1] < key:
+        _ordered_index.append(key)
+    else:
+        bisect.insort(_ordered_index, key)
+
+def _index_remove(template: TemplateRecord) -> None:
+    """
+    Remove a template from the ordered index.
+    """
+    key = _index_key(template)
+    position = bisect.bisect_left(_ordered_index, key)
+    if position < len(_ordered_index) and _ordered_index[position] == key:
+        del _ordered_index[position]
+
+# Inverted index of tag -> ids of the templates carrying that tag
+_tag_index: Dict[str, Set[bytes]] = {}
+
+def _tags_add(template: TemplateRecord) -> None:
+    """
+    Register a template under each of its tags.
+    """
+    for tag in template.tags:
+        _tag_index.setdefault(tag, set()).add(template.id)
+
+def _tags_remove(template: TemplateRecord) -> None:
+    """
+    Unregister a template from each of its tags.
+    """
+    for tag in template.tags:
+        template_ids = _tag_index.get(tag)
+        if template_ids is None:
+            continue
+        template_ids.discard(template.id)
+        if not template_ids:
+            del _tag_index[tag]
+
+def _matching_keys(tags: Optional[List[str]] = None, match_all: bool = False) -> List[Tuple[int, bytes]]:
+    """
+    Get the ordered index keys of the templates matching the given tags.
+    
+    Args:
+        tags: Tags to filter by, or None for every template
+        match_all: Require every tag (True) or any of them (False)
+        
+    Returns:
+        The sorted (created_at, id) keys of the matching templates
+    """
+    if not tags:
+        return _ordered_index
+    
+    tag_sets = [_tag_index.get(tag, set()) for tag in dict.fromkeys(tags)]
+    
+    if match_all:
+        # Intersect starting from the smallest set so the cost follows the rarest tag
+        tag_sets.sort(key=len)
+        template_ids = set(tag_sets[0])
+        for template_ids_for_tag in tag_sets[1:]:
+            if not template_ids:
+                break
+            template_ids &= template_ids_for_tag
+    else:
+        template_ids = set().union(*tag_sets)
+    
+    return sorted(_index_key(templates_db[template_id]) for template_id in template_ids)
+
+def _register(template: TemplateRecord) -> None:
+    """
+    Add a template to the in-memory table and every index.
+    """
+    if template.content_key is None:
+        template.content_key, template.content = template_content.acquire(template.content)
+    templates_db[template.id] = template
+    _bump_version()
+    _index_add(template)
+    _tags_add(template)
+    template_search.index_template(template)
+
+def _unregister(template_id: bytes) -> TemplateRecord:
+    """
+    Remove a template from the in-memory table and every index.
+    """
+    template = templates_db.pop(template_id)
+    _bump_version()
+    _index_remove(template)
+    _tags_remove(template)
+    template_search.remove_template(template_id)
+    template_render.invalidate(template_id)
+    template_serializer.invalidate(template_id)
+    template_content.release(template.content_key)
+    template.content_key = None
+    return template
+
+def _lookup(template_id: str) -> Optional[TemplateRecord]:
+    """
+    Get a template by its UUID string, treating malformed IDs as not found.
+    """
+    key = parse_id(template_id)
+    return templates_db.get(key) if key is not None else None
+
+def _new_template(template_data: Dict[str, Any], now: int) -> TemplateRecord:
+    """
+    Build a new template from creation data.
+    """
+    return TemplateRecord(
+        id=uuid.uuid4().bytes,
+        name=template_data.name,
+        description=template_data.description,
+        content=template_data.content,
+        tags=intern_tags(template_data.tags),
+        created_at=now,
+        updated_at=now
+    )
+
+def _apply_update(template: TemplateRecord, template_data: Dict[str, Any], now: int) -> bool:
+    """
+    Apply the provided fields of update data to a registered template and its indexes.
+    
+    Returns:
+        True if the template changed, False if the data matched its current state
+    """
+    changes = {
+        field: getattr(template_data, field)
+        for field in ("name", "description", "content", "tags")
+        if getattr(template_data, field) is not None
+    }
+    return _apply_changes(template, changes, now)
+
+def _apply_changes(template: TemplateRecord, changes: Dict[str, Any], now: int) -> bool:
+    """
+    Apply new field values to a registered template and its indexes.
+    
+    Unlike update data, where None means "not provided", every field present
+    in `changes` is applied, so a None description clears it.
+    
+    Returns:
+        True if the template changed, False if the values matched its current state
+    """
+    name_changed = "name" in changes and changes["name"] != template.name
+    description_changed = "description" in changes and changes["description"] != template.description
+    tags = intern_tags(changes["tags"]) if "tags" in changes else template.tags
+    tags_changed = tags != template.tags
+    
+    # Identical contents intern to the same digest, so comparing them is cheap
+    content_changed = False
+    if "content" in changes:
+        content_key, content = template_content.acquire(changes["content"])
+        content_changed = content_key != template.content_key
+        if content_changed:
+            template_content.release(template.content_key)
+            template.content_key, template.content = content_key, content
+            template_render.invalidate(template.id)
+        else:
+            template_content.release(content_key)
+    
+    if not (name_changed or description_changed or tags_changed or content_changed):
+        return False
+    
+    _bump_version()
+    template_serializer.invalidate(template.id)
+    
+    if name_changed:
+        template.name = changes["name"]
+    
+    if description_changed:
+        template.description = changes["description"]
+    
+    if tags_changed:
+        _tags_remove(template)
+        template.tags = tags
+        _tags_add(template)
+    
+    # Re-index the searchable text only when it changed
+    if name_changed or description_changed or content_changed:
+        template_search.index_template(template)
+    
+    template.updated_at = now
+    return True
+
+def _fields(template: TemplateRecord) -> Tuple[Dict[str, Any], int]:
+    """
+    Capture the editable fields and update time of a template, to restore them with _restore().
+    """
+    fields = {"name": template.name, "description": template.description, "content": template.content, "tags": template.tags}
+    return fields, template.updated_at
+
+def _restore(template: TemplateRecord, previous: Tuple[Dict[str, Any], int]) -> None:
+    """
+    Put back the fields captured by _fields() after the store failed to persist a change.
+    """
+    if templates_db.get(template.id) is template:
+        fields, updated_at = previous
+        _apply_changes(template, fields, updated_at)
+
+def _discard(template: TemplateRecord) -> None:
+    """
+    Take back a template registered by a write the store failed to persist.
+    """
+    if templates_db.get(template.id) is template:
+        _unregister(template.id)
+
+def _reinstate(template: TemplateRecord) -> None:
+    """
+    Put back a template removed by a write the store failed to persist.
+    """
+    if template.id not in templates_db:
+        _register(template)
+
+# Attempts of an update that keeps finding its template changed by another worker
+MAX_UPDATE_ATTEMPTS = 5
+
+async def _persist_update(template: TemplateRecord, previous: Tuple[Dict[str, Any], int]) -> bool:
+    """
+    Save an update applied in memory, undoing it if the store refuses or fails the write.
+    
+    Returns:
+        True if the update was saved, False if another worker changed the template
+        first; the caller syncs and applies the update again
+    """
+    try:
+        await _store.save(template, previous[1])
+    except WriteConflictError:
+        _restore(template, previous)
+        return False
+    except BaseException:
+        _restore(template, previous)
+        raise
+    return True
+
+def _create_store() -> TemplateStore:
+    """
+    Create the store selected by the TEMPLATE_STORE setting.
+    """
+    if TEMPLATE_STORE == "memory":
+        return MemoryTemplateStore()
+    if TEMPLATE_STORE == "log":
+        return LogTemplateStore(
+            TEMPLATE_STORE_PATH,
+            state=lambda: templates_db.values(),
+            commit_interval=TEMPLATE_COMMIT_INTERVAL_MS / 1000,
+            snapshot_every=TEMPLATE_SNAPSHOT_EVERY,
+        )
+    if TEMPLATE_STORE == "sqlite":
+        return SqliteTemplateStore(os.path.join(TEMPLATE_STORE_PATH, "templates.db"))
+    raise ValueError(f"Unknown template store: {TEMPLATE_STORE}")
+
+def _replace_all(templates: List[TemplateRecord]) -> None:
+    """
+    Replace the in-memory table and every index with the given templates.
+    """
+    templates_db.clear()
+    _bump_version()
+    _ordered_index.clear()
+    _tag_index.clear()
+    template_search.clear()
+    template_render.clear()
+    template_serializer.clear()
+    template_content.clear()
+    for template in templates:
+        _register(template)
+
+async def _sync() -> None:
+    """
+    Apply the changes other processes made to the store to the in-memory copy.
+    
+    With a shared store this runs before every operation, so each worker
+    serves from memory while staying consistent with the others.
+    """
+    changes = await _store.poll()
+    if changes is None:
+        _replace_all(await _store.load())
+        _mark_synced()
+        template_feed.reset()
+        return
+    
+    for template_id, template in changes:
+        key = parse_id(template_id)
+        existed = key in templates_db
+        if existed:
+            _unregister(key)
+        if template is not None:
+            _register(template)
+            template_feed.publish("updated" if existed else "created", template_id, template)
+        elif existed:
+            template_feed.publish("deleted", template_id)
+    _mark_synced()
+
+async def init_template_store() -> None:
+    """
+    Open the configured template store and load its templates into memory.
+    """
+    global _store
+    
+    _store = _create_store()
+    _replace_all(await _store.load())
+    _mark_synced()
+    if TEMPLATE_STORE == "sqlite":
+        # Other workers' writes would otherwise only reach the feed with this worker's next request
+        template_feed.watch(_sync, TEMPLATE_FEED_POLL_MS / 1000)
+    
+    logger.info(f"Template store '{TEMPLATE_STORE}' ready with {len(templates_db)} templates")
+
+async def close_template_store() -> None:
+    """
+    Flush pending writes and close the template store.
+    """
+    template_feed.stop_watching()
+    await _store.close()
+
+def encode_cursor(key: Tuple[int, bytes]) -> str:
+    """
+    Encode an ordered index key as an opaque pagination cursor.
+    
+    Args:
+        key: The (created_at, id) key of the last template of a page
+        
+    Returns:
+        The opaque cursor string
+    """
+    raw = f"{key[0]}|{key[1].hex()}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[int, bytes]:
+    """
+    Decode an opaque pagination cursor back into an ordered index key.
+    
+    Args:
+        cursor: The cursor returned by a previous page
+        
+    Returns:
+        The (created_at, id) key the cursor points at
+        
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, template_id = base64.urlsafe_b64decode(padded).decode("utf-8").split("|", 1)
+        return (int(created_at), bytes.fromhex(template_id))
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+async def get_collection_version() -> str:
+    """
+    Get the version of the collection, after applying changes from other workers.
+    
+    Returns:
+        An opaque version string that changes on every write
+    """
+    await _sync()
+    return current_collection_version()
+
+async def get_templates(skip: int = 0, limit: int = 10, tags: Optional[List[str]] = None, match_all: bool = False) -> List[TemplateRecord]:
     """
     Get a list of templates with pagination.
     
     Args:
         skip: Number of templates to skip
         limit: Maximum number of templates to return
+        tags: Only return templates carrying these tags
+        match_all: Require every tag (True) or any of them (False)
         
     Returns:
         A list of templates
     """
     try:
-        # Convert the templates dictionary to a list and apply pagination
-        templates_list = list(templates_db.values())
-        return templates_list[skip:skip + limit]
+        await _sync()
+        
+        # Slice the ordered index so only the requested page is materialized
+        keys = _matching_keys(tags, match_all)[skip:skip + limit]
+        return [templates_db[template_id] for _, template_id in keys]
     
     except Exception as e:
         logger.error(f"Error getting templates: {str(e)}", exc_info=True)
         return []
 
-async def get_template_by_id(template_id: str) -> Optional[Dict[str, Any]]:
+async def get_templates_page(cursor: Optional[str] = None, limit: int = 10, tags: Optional[List[str]] = None, match_all: bool = False) -> Tuple[List[TemplateRecord], Optional[str]]:
+    """
+    Get a page of templates using keyset pagination.
+    
+    Args:
+        cursor: The cursor returned by the previous page, or None for the first page
+        limit: Maximum number of templates to return
+        tags: Only return templates carrying these tags
+        match_all: Require every tag (True) or any of them (False)
+        
+    Returns:
+        A tuple with the templates of the page and the cursor of the next page
+        (None when there are no more templates)
+        
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    await _sync()
+    
+    ordered_keys = _matching_keys(tags, match_all)
+    start = bisect.bisect_right(ordered_keys, decode_cursor(cursor)) if cursor else 0
+    keys = ordered_keys[start:start + limit]
+    
+    next_cursor = None
+    if keys and start + len(keys) < len(ordered_keys):
+        next_cursor = encode_cursor(keys[-1])
+    
+    return [templates_db[template_id] for _, template_id in keys], next_cursor
+
+async def search_templates(query: str, limit: int = 10) -> List[TemplateRecord]:
+    """
+    Search templates by the words in their name, description and content.
+    
+    Args:
+        query: The search query; every word must match, as a prefix of an indexed word
+        limit: Maximum number of templates to return
+        
+    Returns:
+        A list of templates, best match first
+    """
+    try:
+        await _sync()
+        
+        results = template_search.search(query, limit)
+        return [templates_db[template_id] for template_id, _ in results]
+    
+    except Exception as e:
+        logger.error(f"Error searching templates: {str(e)}", exc_info=True)
+        return []
+
+async def get_template_by_id(template_id: str) -> Optional[TemplateRecord]:
     """
     Get a template by ID.
     
@@ -39,13 +533,15 @@ async def get_template_by_id(template_id: str) -> Optional[Dict[str, Any]]:
         The template or None if not found
     """
     try:
-        return templates_db.get(template_id)
+        await _sync()
+        
+        return _lookup(template_id)
     
     except Exception as e:
         logger.error(f"Error getting template {template_id}: {str(e)}", exc_info=True)
         return None
 
-async def create_template(template_data: Dict[str, Any]) -> Dict[str, Any]:
+async def create_template(template_data: Dict[str, Any]) -> TemplateRecord:
     """
     Create a new template.
     
@@ -56,25 +552,20 @@ async def create_template(template_data: Dict[str, Any]) -> Dict[str, Any]:
         The created template
     """
     try:
-        # Generate a unique ID for the template
-        template_id = str(uuid.uuid4())
-        
-        # Get the current timestamp
-        now = datetime.now()
+        await _sync()
         
         # Create the template
-        template = {
-            "id": template_id,
-            "name": template_data.name,
-            "description": template_data.description,
-            "content": template_data.content,
-            "tags": template_data.tags,
-            "created_at": now,
-            "updated_at": now
-        }
+        template = _new_template(template_data, to_timestamp(datetime.now()))
+        template_id = template.template_id
         
-        # Store the template
-        templates_db[template_id] = template
+        # Store the template, taking it back out of memory if the store fails
+        _register(template)
+        try:
+            await _store.save(template)
+        except BaseException:
+            _discard(template)
+            raise
+        template_feed.publish("created", template_id, template)
         
         logger.info(f"Created template: {template_id}")
         
@@ -84,7 +575,7 @@ async def create_template(template_data: Dict[str, Any]) -> Dict[str, Any]:
         logger.error(f"Error creating template: {str(e)}", exc_info=True)
         raise
 
-async def update_template(template_id: str, template_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+async def update_template(template_id: str, template_data: Dict[str, Any]) -> Optional[TemplateRecord]:
     """
     Update an existing template.
     
@@ -94,40 +585,112 @@ async def update_template(template_id: str, template_data: Dict[str, Any]) -> Op
         
     Returns:
         The updated template or None if not found
+        
+    Raises:
+        WriteConflictError: If other workers kept changing the template
+        Exception: If the store fails to persist the update, which is then undone in memory
     """
     try:
-        # Check if the template exists
-        template = templates_db.get(template_id)
-        if not template:
-            logger.warning(f"Template not found: {template_id}")
-            return None
+        for _ in range(MAX_UPDATE_ATTEMPTS):
+            await _sync()
+            
+            # Check if the template exists
+            template = _lookup(template_id)
+            if not template:
+                logger.warning(f"Template not found: {template_id}")
+                return None
+            
+            # Update the template fields if provided (created_at never changes, so the ordered index is unaffected)
+            previous = _fields(template)
+            if not _apply_update(template, template_data, to_timestamp(datetime.now())):
+                logger.info(f"Template unchanged, skipping write: {template_id}")
+                return template
+            
+            # Store the updated template, or apply the update again over another worker's change
+            if await _persist_update(template, previous):
+                break
+            logger.info(f"Template {template_id} was changed by another worker, updating again")
+        else:
+            raise WriteConflictError(f"Template {template_id} kept changing during the update")
+        
+        template_feed.publish("updated", template_id, template)
+        
+        logger.info(f"Updated template: {template_id}")
+        
+        return template
+    
+    except Exception as e:
+        logger.error(f"Error updating template {template_id}: {str(e)}", exc_info=True)
+        raise
+
+async def patch_template(template_id: str, patch: Any, merge: bool = False, if_match: Optional[str] = None) -> Optional[TemplateRecord]:
+    """
+    Partially update a template with a JSON Patch or a JSON Merge Patch.
+    
+    The patch applies to the template document (name, description, content
+    and tags) without copying the parts it does not touch, so small edits
+    to large contents only cost the paths they change.
+    
+    Args:
+        template_id: The ID of the template to patch
+        patch: RFC 6902 operations, or an RFC 7396 merge patch when merge is True
+        merge: Whether the patch is a merge patch
+        if_match: If-Match header value; the patch only applies if it holds the current ETag
         
-        # Update the template fields if provided
-        if template_data.name is not None:
-            template["name"] = template_data.name
+    Returns:
+        The patched template or None if not found
         
-        if template_data.description is not None:
-            template["description"] = template_data.description
+    Raises:
+        PreconditionFailedError: If if_match does not hold the current ETag
+        PatchTestFailed: If a JSON Patch test operation does not match
+        PatchError: If the patch is invalid or produces an invalid template
+        WriteConflictError: If other workers kept changing the template
+    """
+    for _ in range(MAX_UPDATE_ATTEMPTS):
+        await _sync()
         
-        if template_data.content is not None:
-            template["content"] = template_data.content
+        template = _lookup(template_id)
+        if not template:
+            logger.warning(f"Template not found: {template_id}")
+            return None
         
-        if template_data.tags is not None:
-            template["tags"] = template_data.tags
+        if if_match is not None and not _if_match(if_match, template_etag(template)):
+            raise PreconditionFailedError(f"Template {template_id} was modified")
         
-        # Update the updated_at timestamp
-        template["updated_at"] = datetime.now()
+        document = {
+            "name": template.name,
+            "description": template.description,
+            "content": template.content,
+            "tags": list(template.tags),
+        }
+        if merge:
+            if not isinstance(patch, dict):
+                raise template_patch.PatchError("A merge patch must be an object")
+            patched = template_patch.apply_merge_patch(document, patch)
+        else:
+            patched = template_patch.apply_json_patch(document, patch)
         
-        # Store the updated template
-        templates_db[template_id] = template
+        # Patching is copy-on-write, so untouched fields are still the same objects
+        changes = {field: patched.get(field) for field in set(document) | set(patched) if patched.get(field) is not document.get(field)}
+        template_patch.validate_changes(changes)
         
-        logger.info(f"Updated template: {template_id}")
+        previous = _fields(template)
+        if not _apply_changes(template, changes, to_timestamp(datetime.now())):
+            logger.info(f"Template unchanged, skipping write: {template_id}")
+            return template
         
-        return template
+        # Store the patched template, or patch again over another worker's change
+        if await _persist_update(template, previous):
+            break
+        logger.info(f"Template {template_id} was changed by another worker, patching again")
+    else:
+        raise WriteConflictError(f"Template {template_id} kept changing during the patch")
     
-    except Exception as e:
-        logger.error(f"Error updating template {template_id}: {str(e)}", exc_info=True)
-        return None
+    template_feed.publish("updated", template_id, template)
+    
+    logger.info(f"Patched template: {template_id}")
+    
+    return template
 
 async def delete_template(template_id: str) -> bool:
     """
@@ -137,16 +700,28 @@ async def delete_template(template_id: str) -> bool:
         template_id: The ID of the template to delete
         
     Returns:
-        True if the template was deleted, False otherwise
+        True if the template was deleted, False if it was not found
+        
+    Raises:
+        Exception: If the store fails to persist the deletion, which is then undone in memory
     """
     try:
+        await _sync()
+        
         # Check if the template exists
-        if template_id not in templates_db:
+        template = _lookup(template_id)
+        if not template:
             logger.warning(f"Template not found: {template_id}")
             return False
         
-        # Delete the template
-        del templates_db[template_id]
+        # Delete the template, putting it back if the store fails
+        _unregister(template.id)
+        try:
+            await _store.delete(template_id)
+        except BaseException:
+            _reinstate(template)
+            raise
+        template_feed.publish("deleted", template_id)
         
         logger.info(f"Deleted template: {template_id}")
         
@@ -154,4 +729,278 @@ async def delete_template(template_id: str) -> bool:
     
     except Exception as e:
         logger.error(f"Error deleting template {template_id}: {str(e)}", exc_info=True)
-        return False 
\ No newline at end of file
+        raise
+
+async def create_templates(templates_data: List[Dict[str, Any]]) -> List[TemplateRecord]:
+    """
+    Create several templates in one batch.
+    
+    The batch is applied to memory without yielding to other requests and
+    persisted with a single store write.
+    
+    Args:
+        templates_data: The template data to create
+        
+    Returns:
+        The created templates, in request order
+    """
+    try:
+        await _sync()
+        
+        now = to_timestamp(datetime.now())
+        templates = [_new_template(template_data, now) for template_data in templates_data]
+        for template in templates:
+            _register(template)
+        try:
+            await _store.write_batch(templates, [])
+        except BaseException:
+            for template in templates:
+                _discard(template)
+            raise
+        for template in templates:
+            template_feed.publish("created", template.template_id, template)
+        
+        logger.info(f"Created {len(templates)} templates in bulk")
+        
+        return templates
+    
+    except Exception as e:
+        logger.error(f"Error creating templates in bulk: {str(e)}", exc_info=True)
+        raise
+
+async def update_templates(updates: List[Tuple[str, Dict[str, Any]]]) -> List[Optional[TemplateRecord]]:
+    """
+    Update several templates in one batch.
+    
+    Args:
+        updates: (template ID, template data to update) tuples
+        
+    Returns:
+        The updated templates in request order, with None for templates not found
+        
+    Raises:
+        WriteConflictError: If other workers kept changing the templates
+    """
+    try:
+        for _ in range(MAX_UPDATE_ATTEMPTS):
+            await _sync()
+            
+            now = to_timestamp(datetime.now())
+            results: List[Optional[TemplateRecord]] = []
+            changed: Dict[bytes, TemplateRecord] = {}
+            previous: Dict[bytes, Tuple[Dict[str, Any], int]] = {}
+            for template_id, template_data in updates:
+                template = _lookup(template_id)
+                if template:
+                    fields = _fields(template)
+                    if _apply_update(template, template_data, now):
+                        changed[template.id] = template
+                        previous.setdefault(template.id, fields)
+                results.append(template)
+            
+            if not changed:
+                break
+            try:
+                expected = {template.template_id: previous[template.id][1] for template in changed.values()}
+                await _store.write_batch(list(changed.values()), [], expected)
+                break
+            except WriteConflictError:
+                for template in changed.values():
+                    _restore(template, previous[template.id])
+                logger.info("Templates were changed by another worker, updating the batch again")
+            except BaseException:
+                for template in changed.values():
+                    _restore(template, previous[template.id])
+                raise
+        else:
+            raise WriteConflictError("Templates kept changing during the bulk update")
+        for template in changed.values():
+            template_feed.publish("updated", template.template_id, template)
+        
+        logger.info(f"Updated {len(changed)} templates in bulk, {results.count(None)} not found")
+        
+        return results
+    
+    except Exception as e:
+        logger.error(f"Error updating templates in bulk: {str(e)}", exc_info=True)
+        raise
+
+async def delete_templates(template_ids: List[str]) -> List[bool]:
+    """
+    Delete several templates in one batch.
+    
+    Args:
+        template_ids: The IDs of the templates to delete
+        
+    Returns:
+        For each ID in request order, True if the template was deleted, False if not found
+    """
+    try:
+        await _sync()
+        
+        results = []
+        removed: List[TemplateRecord] = []
+        for template_id in template_ids:
+            template = _lookup(template_id)
+            if template:
+                removed.append(_unregister(template.id))
+            results.append(template is not None)
+        
+        deleted = [template.template_id for template in removed]
+        try:
+            await _store.write_batch([], deleted)
+        except BaseException:
+            for template in removed:
+                _reinstate(template)
+            raise
+        for template_id in deleted:
+            template_feed.publish("deleted", template_id)
+        
+        logger.info(f"Deleted {len(deleted)} templates in bulk, {results.count(False)} not found")
+        
+        return results
+    
+    except Exception as e:
+        logger.error(f"Error deleting templates in bulk: {str(e)}", exc_info=True)
+        raise
+
+async def iter_templates(batch_size: int = 1000) -> AsyncIterator[List[TemplateRecord]]:
+    """
+    Iterate over every template in creation order, one batch at a time.
+    
+    Each batch resumes after the last key of the previous one, so only one
+    batch is held at a time and writes made between batches are tolerated:
+    templates created after the current position are included, deleted ones
+    are skipped.
+    
+    Args:
+        batch_size: Number of templates per batch
+        
+    Yields:
+        Lists of templates
+    """
+    last_key: Optional[Tuple[int, bytes]] = None
+    while True:
+        await _sync()
+        
+        start = bisect.bisect_right(_ordered_index, last_key) if last_key else 0
+        keys = _ordered_index[start:start + batch_size]
+        if not keys:
+            return
+        
+        last_key = keys[-1]
+        yield [templates_db[template_id] for _, template_id in keys]
+
+async def import_templates(items: List[Any]) -> int:
+    """
+    Import a batch of templates, keeping their IDs and timestamps when provided.
+    
+    A template with the ID of an existing one replaces it. The batch is
+    persisted with a single store write.
+    
+    Args:
+        items: The templates to import (TemplateImportItem)
+        
+    Returns:
+        The number of templates imported
+    """
+    try:
+        await _sync()
+        
+        now = to_timestamp(datetime.now())
+        templates: Dict[bytes, TemplateRecord] = {}
+        events: Dict[bytes, str] = {}
+        # Templates replaced by the import, put back if the store fails
+        replaced: Dict[bytes, TemplateRecord] = {}
+        for item in items:
+            created_at = to_timestamp(item.created_at) if item.created_at else now
+            template = TemplateRecord(
+                id=item.id.bytes if item.id else uuid.uuid4().bytes,
+                name=item.name,
+                description=item.description,
+                content=item.content,
+                tags=intern_tags(item.tags),
+                created_at=created_at,
+                updated_at=to_timestamp(item.updated_at) if item.updated_at else created_at
+            )
+            existed = template.id in templates_db
+            if existed:
+                previous = _unregister(template.id)
+                if template.id not in templates:
+                    replaced[template.id] = previous
+            _register(template)
+            templates[template.id] = template
+            events.setdefault(template.id, "updated" if existed else "created")
+        
+        if templates:
+            try:
+                await _store.write_batch(list(templates.values()), [])
+            except BaseException:
+                for template in templates.values():
+                    _discard(template)
+                for template in replaced.values():
+                    _reinstate(template)
+                raise
+        for template in templates.values():
+            template_feed.publish(events[template.id], template.template_id, template)
+        
+        logger.info(f"Imported {len(templates)} templates")
+        
+        return len(templates)
+    
+    except Exception as e:
+        logger.error(f"Error importing templates: {str(e)}", exc_info=True)
+        raise
+
+async def render_template(template_id: str, parameters: template_render.Parameters) -> Optional[Dict[str, Any]]:
+    """
+    Render a template content with a set of parameters.
+    
+    Args:
+        template_id: The ID of the template to render
+        parameters: Values by placeholder name, or a list of positional values
+        
+    Returns:
+        The rendered content or None if the template is not found
+        
+    Raises:
+        RenderError: If a placeholder has no value
+    """
+    await _sync()
+    
+    template = _lookup(template_id)
+    if not template:
+        logger.warning(f"Template not found: {template_id}")
+        return None
+    
+    return template_render.get_plan(template).render(parameters)
+
+async def render_template_batch(template_id: str, parameter_sets: List[template_render.Parameters]) -> Optional[List[Dict[str, Any]]]:
+    """
+    Render a template content once for each set of parameters.
+    
+    Args:
+        template_id: The ID of the template to render
+        parameter_sets: The parameters of each render
+        
+    Returns:
+        One result per parameter set, with either the rendered `content` or an
+        `error`, or None if the template is not found
+    """
+    await _sync()
+    
+    template = _lookup(template_id)
+    if not template:
+        logger.warning(f"Template not found: {template_id}")
+        return None
+    
+    plan = template_render.get_plan(template)
+    results = []
+    for parameters in parameter_sets:
+        try:
+            results.append({"content": plan.render(parameters), "error": None})
+        except template_render.RenderError as e:
+            results.append({"content": None, "error": str(e)})
+    
+    logger.info(f"Rendered template {template_id} for {len(parameter_sets)} parameter sets")
+    return results
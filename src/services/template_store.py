@@ -0,0 +1,533 @@
+from typing import Dict, Any, Callable, Iterable, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import glob
+import json
+import os
+import sqlite3
+import uuid
+
+from services.template_record import TemplateRecord, from_timestamp
+from utils.append_log import AppendLog
+from utils.logger import logger
+
+class WriteConflictError(Exception):
+    """Raised when another process changed a template since the version a write was based on."""
+
+class TemplateStore:
+    """
+    Persistence backend behind the template service.
+
+    The template service keeps the working set in memory and calls the store
+    to load it at startup and to persist every write.
+    """
+
+    async def load(self) -> List[TemplateRecord]:
+        """
+        Load every stored template.
+
+        Returns:
+            The stored templates
+        """
+        return []
+
+    async def save(self, template: TemplateRecord, expected_updated_at: Optional[int] = None) -> None:
+        """
+        Persist the current state of a template.
+
+        Args:
+            template: The template to persist
+            expected_updated_at: For an update, the update time of the stored version
+                it was applied to; stores shared between processes refuse the write
+                if the stored template changed since
+
+        Raises:
+            WriteConflictError: If the stored template no longer has expected_updated_at
+        """
+
+    async def delete(self, template_id: str) -> None:
+        """
+        Persist the deletion of a template.
+
+        Args:
+            template_id: The ID of the deleted template
+        """
+
+    async def write_batch(self, templates: List[TemplateRecord], deleted_ids: List[str], expected: Optional[Dict[str, int]] = None) -> None:
+        """
+        Persist several saves and deletions at once.
+
+        Args:
+            templates: The templates to persist
+            deleted_ids: The IDs of the deleted templates
+            expected: Update time of the stored version each updated template was
+                applied to, by template ID (see save())
+
+        Raises:
+            WriteConflictError: If a stored template no longer has its expected update time
+        """
+        expected = expected or {}
+        for template in templates:
+            await self.save(template, expected.get(template.template_id))
+        for template_id in deleted_ids:
+            await self.delete(template_id)
+
+    async def poll(self) -> Optional[List[Tuple[str, Optional[TemplateRecord]]]]:
+        """
+        Get the templates changed by other processes since the last poll.
+
+        Returns:
+            A list of (template id, template) tuples, with None as the template
+            when it was deleted, or None when the changes are no longer
+            available and the caller must load() everything again
+        """
+        return []
+
+    def change_position(self) -> Optional[int]:
+        """
+        Get the position in the shared change sequence the last poll caught up to.
+
+        Processes at the same position hold the same templates, so the position
+        can version the collection for every process at once.
+
+        Returns:
+            The position, or None if the store is not shared between processes
+            or one of this process's writes is in progress
+        """
+        return None
+
+    async def close(self) -> None:
+        """
+        Flush pending writes and release the store resources.
+        """
+
+class MemoryTemplateStore(TemplateStore):
+    """
+    Store that keeps nothing, so templates only live in process memory.
+    """
+
+def encode_template(template: TemplateRecord) -> Dict[str, Any]:
+    """
+    Convert a template to its JSON serializable stored form.
+
+    Args:
+        template: The template to convert
+
+    Returns:
+        The stored form of the template
+    """
+    return {
+        "id": template.template_id,
+        "name": template.name,
+        "description": template.description,
+        "content": template.content,
+        "tags": list(template.tags),
+        "created_at": from_timestamp(template.created_at).isoformat(),
+        "updated_at": from_timestamp(template.updated_at).isoformat(),
+    }
+
+def decode_template(stored: Dict[str, Any]) -> TemplateRecord:
+    """
+    Convert a stored template back to its in-memory form.
+
+    Args:
+        stored: The stored form of the template
+
+    Returns:
+        The template
+    """
+    return TemplateRecord.from_dict(stored)
+
+class LogTemplateStore(TemplateStore):
+    """
+    Durable local store made of an append-only write log and compacted snapshots.
+
+    Every write is appended to the current log segment and acknowledged once
+    a group-committed fsync covers it. After `snapshot_every` records, the
+    log is rotated and a snapshot of the full state is written in the
+    background, after which older log segments are deleted. Startup loads
+    the latest snapshot through a memory map and replays only the log
+    records written after it.
+
+    The store is owned by a single process; it does not coordinate writers
+    across processes.
+    """
+
+    SNAPSHOT_FILE = "snapshot.jsonl"
+
+    def __init__(
+        self,
+        path: str,
+        state: Callable[[], Iterable[TemplateRecord]],
+        commit_interval: float = 0.0,
+        snapshot_every: int = 10000,
+        fsync: bool = True,
+    ):
+        """
+        Args:
+            path: Directory holding the snapshot and log segments
+            state: Callable returning every template currently held in memory
+            commit_interval: Seconds to wait for more writers before each fsync
+            snapshot_every: Number of log records after which a snapshot is taken
+            fsync: Whether writes should be fsynced (disable only for tests and benchmarks)
+        """
+        self.path = path
+        self.state = state
+        self.commit_interval = commit_interval
+        self.snapshot_every = snapshot_every
+        self.fsync = fsync
+        self._seq = 0
+        self._records_since_snapshot = 0
+        self._log: Optional[AppendLog] = None
+        self._snapshot_task: Optional[asyncio.Task] = None
+
+    def _segments(self) -> List[str]:
+        return sorted(glob.glob(os.path.join(self.path, "log-*.jsonl")))
+
+    def _new_segment(self) -> AppendLog:
+        """
+        Open a new log segment, named after the next sequence number.
+
+        The name is also past every existing segment: appending to an older
+        one would put new records after whatever a crash left at its end,
+        where replay stops reading.
+        """
+        number = self._seq + 1
+        segments = self._segments()
+        if segments:
+            number = max(number, int(os.path.basename(segments[-1])[len("log-"):-len(".jsonl")]) + 1)
+        return AppendLog(os.path.join(self.path, f"log-{number:020d}.jsonl"), self.commit_interval, self.fsync)
+
+    async def load(self) -> List[TemplateRecord]:
+        os.makedirs(self.path, exist_ok=True)
+        templates: Dict[str, Dict[str, Any]] = {}
+
+        snapshot_seq = 0
+        snapshot_path = os.path.join(self.path, self.SNAPSHOT_FILE)
+        if os.path.exists(snapshot_path):
+            records = AppendLog.read(snapshot_path)
+            header = next(records, None)
+            if header is not None:
+                snapshot_seq = header["seq"]
+                for stored in records:
+                    templates[stored["id"]] = stored
+                # A snapshot is renamed into place only once complete
+                if len(templates) != header["count"]:
+                    raise RuntimeError(f"Template snapshot {snapshot_path} is incomplete")
+
+        self._seq = snapshot_seq
+        replayed = 0
+        for segment in self._segments():
+            # Left by a restart without writes
+            if os.path.getsize(segment) == 0:
+                os.remove(segment)
+                continue
+            for record in AppendLog.read(segment):
+                if record["seq"] <= snapshot_seq:
+                    continue
+                if record["op"] == "put":
+                    templates[record["template"]["id"]] = record["template"]
+                elif record["op"] == "delete":
+                    templates.pop(record["id"], None)
+                self._seq = record["seq"]
+                replayed += 1
+
+        self._records_since_snapshot = replayed
+        self._log = self._new_segment()
+
+        logger.info(f"Loaded {len(templates)} templates from snapshot {snapshot_seq} and {replayed} log records")
+        return [decode_template(stored) for stored in templates.values()]
+
+    async def save(self, template: TemplateRecord, expected_updated_at: Optional[int] = None) -> None:
+        # Owned by a single process, whose memory is the latest state
+        await self._append({"op": "put", "template": encode_template(template)})
+
+    async def delete(self, template_id: str) -> None:
+        await self._append({"op": "delete", "id": template_id})
+
+    async def write_batch(self, templates: List[TemplateRecord], deleted_ids: List[str], expected: Optional[Dict[str, int]] = None) -> None:
+        records = [{"op": "put", "template": encode_template(template)} for template in templates]
+        records.extend({"op": "delete", "id": template_id} for template_id in deleted_ids)
+        if records:
+            await self._append(*records)
+
+    async def _append(self, *records: Dict[str, Any]) -> None:
+        """
+        Append records to the current segment and wait for them to be durable.
+        """
+        log = self._log
+        for record in records:
+            self._seq += 1
+            record["seq"] = self._seq
+            log.write(record)
+
+        self._records_since_snapshot += len(records)
+        if self._records_since_snapshot >= self.snapshot_every and (self._snapshot_task is None or self._snapshot_task.done()):
+            self._snapshot_task = asyncio.get_running_loop().create_task(self._snapshot())
+
+        await log.commit()
+
+    async def _snapshot(self) -> None:
+        """
+        Rotate the log and write a compacted snapshot of the current state.
+
+        The in-memory state reflects every record up to the rotation point, so
+        the snapshot covers them and the segments before it can be dropped.
+        Templates modified while the snapshot is written are also replayed
+        from the new segment, which is harmless since records hold full values.
+        """
+        try:
+            snapshot_seq = self._seq
+            previous_log = self._log
+            self._log = self._new_segment()
+            self._records_since_snapshot = 0
+            await previous_log.close()
+
+            templates = list(self.state())
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, self._write_snapshot, snapshot_seq, templates)
+
+            current_segment = self._log.path
+            for segment in self._segments():
+                if segment != current_segment:
+                    os.remove(segment)
+
+            logger.info(f"Wrote template snapshot {snapshot_seq} with {len(templates)} templates")
+        except Exception as e:
+            logger.error(f"Error writing template snapshot: {str(e)}", exc_info=True)
+
+    def _write_snapshot(self, seq: int, templates: List[TemplateRecord]) -> None:
+        """
+        Write a snapshot file atomically.
+        """
+        snapshot_path = os.path.join(self.path, self.SNAPSHOT_FILE)
+        temporary_path = snapshot_path + ".tmp"
+        with open(temporary_path, "wb") as f:
+            f.write(json.dumps({"seq": seq, "count": len(templates)}).encode("utf-8") + b"\n")
+            for template in templates:
+                f.write(json.dumps(encode_template(template), separators=(",", ":"), default=str).encode("utf-8") + b"\n")
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        os.replace(temporary_path, snapshot_path)
+        if self.fsync:
+            directory = os.open(self.path, os.O_RDONLY)
+            try:
+                os.fsync(directory)
+            finally:
+                os.close(directory)
+
+    async def close(self) -> None:
+        if self._snapshot_task is not None:
+            await self._snapshot_task
+        if self._log is not None:
+            await self._log.close()
+            self._log = None
+
+def _version(updated_at: Optional[int]) -> Optional[str]:
+    """
+    Format an update time the way it is stored, for conditional writes.
+    """
+    return from_timestamp(updated_at).isoformat() if updated_at is not None else None
+
+class SqliteTemplateStore(TemplateStore):
+    """
+    Store shared by several processes through a SQLite database in WAL mode.
+
+    Every write updates the template row and appends a row to a change
+    table in the same transaction. Each process keeps its own in-memory
+    copy and polls the change table, which only costs a `PRAGMA data_version`
+    check when no other connection has committed since the last poll.
+    Updates only apply over the stored version they were based on, so a
+    process never overwrites a change it has not seen yet.
+
+    Writes run on a dedicated thread so the event loop never waits on the
+    database lock; polls run inline because they only touch the WAL index.
+    """
+
+    def __init__(self, path: str, change_retention: int = 100000, busy_timeout: float = 5.0):
+        """
+        Args:
+            path: Path of the SQLite database file
+            change_retention: Number of change rows kept for lagging processes
+            busy_timeout: Seconds a write waits for the database lock
+        """
+        self.path = path
+        self.change_retention = change_retention
+        self.busy_timeout = busy_timeout
+        self.writer_id = uuid.uuid4().hex
+        self._last_seq = 0
+        self._data_version: Optional[int] = None
+        self._writes = 0
+        self._writes_in_progress = 0
+        self._reader: Optional[sqlite3.Connection] = None
+        self._writer: Optional[sqlite3.Connection] = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="template-store")
+
+    def _connect(self, check_same_thread: bool = True) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None, check_same_thread=check_same_thread)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    def _open_writer(self) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._writer = self._connect(check_same_thread=False)
+        self._writer.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS templates (
+                id TEXT PRIMARY KEY,
+                data TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS template_changes (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                template_id TEXT NOT NULL,
+                writer TEXT NOT NULL
+            );
+            """
+        )
+
+    async def _run(self, function: Callable, *args: Any) -> Any:
+        return await asyncio.get_running_loop().run_in_executor(self._executor, function, *args)
+
+    async def load(self) -> List[TemplateRecord]:
+        if self._writer is None:
+            await self._run(self._open_writer)
+        if self._reader is None:
+            self._reader = self._connect()
+
+        # Read the templates and the change position in one snapshot
+        self._reader.execute("BEGIN")
+        try:
+            self._last_seq = self._reader.execute("SELECT COALESCE(MAX(seq), 0) FROM template_changes").fetchone()[0]
+            rows = self._reader.execute("SELECT data FROM templates").fetchall()
+        finally:
+            self._reader.execute("COMMIT")
+        self._data_version = self._reader.execute("PRAGMA data_version").fetchone()[0]
+
+        logger.info(f"Loaded {len(rows)} templates from {self.path} at change {self._last_seq}")
+        return [decode_template(json.loads(data)) for data, in rows]
+
+    async def save(self, template: TemplateRecord, expected_updated_at: Optional[int] = None) -> None:
+        data = json.dumps(encode_template(template), separators=(",", ":"), default=str)
+        await self._write_rows([(template.template_id, data, _version(expected_updated_at))])
+
+    async def delete(self, template_id: str) -> None:
+        await self._write_rows([(template_id, None, None)])
+
+    async def write_batch(self, templates: List[TemplateRecord], deleted_ids: List[str], expected: Optional[Dict[str, int]] = None) -> None:
+        expected = expected or {}
+        rows = [
+            (
+                template.template_id,
+                json.dumps(encode_template(template), separators=(",", ":"), default=str),
+                _version(expected.get(template.template_id)),
+            )
+            for template in templates
+        ]
+        rows.extend((template_id, None, None) for template_id in deleted_ids)
+        if rows:
+            await self._write_rows(rows)
+
+    async def _write_rows(self, rows: List[Tuple[str, Optional[str], Optional[str]]]) -> None:
+        # Counted before the first await, so a write is in progress as soon as it is requested
+        self._writes_in_progress += 1
+        try:
+            await self._run(self._write, rows)
+        finally:
+            self._writes_in_progress -= 1
+
+    def _write(self, rows: List[Tuple[str, Optional[str], Optional[str]]]) -> None:
+        """
+        Write template rows and their change rows in one transaction.
+
+        Rows are (id, data, expected updated_at); rows with None as data are
+        deletions. A row with an expected updated_at is only written over a
+        stored template that still has it, otherwise nothing is written.
+
+        Raises:
+            WriteConflictError: If a stored template no longer has its expected updated_at
+        """
+        self._writer.execute("BEGIN IMMEDIATE")
+        try:
+            deleted = [(template_id,) for template_id, data, _ in rows if data is None]
+            saved = [(template_id, data) for template_id, data, expected in rows if data is not None and expected is None]
+            updated = [(template_id, data, expected) for template_id, data, expected in rows if data is not None and expected is not None]
+            if deleted:
+                self._writer.executemany("DELETE FROM templates WHERE id = ?", deleted)
+            if saved:
+                self._writer.executemany(
+                    "INSERT INTO templates (id, data) VALUES (?, ?) ON CONFLICT(id) DO UPDATE SET data = excluded.data",
+                    saved,
+                )
+            for template_id, data, expected in updated:
+                cursor = self._writer.execute(
+                    "UPDATE templates SET data = ? WHERE id = ? AND json_extract(data, '$.updated_at') = ?",
+                    (data, template_id, expected),
+                )
+                if cursor.rowcount != 1:
+                    raise WriteConflictError(f"Template {template_id} was changed by another process")
+            self._writer.executemany(
+                "INSERT INTO template_changes (template_id, writer) VALUES (?, ?)",
+                [(template_id, self.writer_id) for template_id, _, _ in rows],
+            )
+
+            previous_writes = self._writes
+            self._writes += len(rows)
+            if self._writes // 1000 != previous_writes // 1000:
+                last_seq = self._writer.execute("SELECT MAX(seq) FROM template_changes").fetchone()[0]
+                self._writer.execute("DELETE FROM template_changes WHERE seq <= ?", (last_seq - self.change_retention,))
+
+            self._writer.execute("COMMIT")
+        except Exception:
+            self._writer.execute("ROLLBACK")
+            raise
+
+    async def poll(self) -> Optional[List[Tuple[str, Optional[TemplateRecord]]]]:
+        data_version = self._reader.execute("PRAGMA data_version").fetchone()[0]
+        if data_version == self._data_version:
+            return []
+        self._data_version = data_version
+
+        # Join with the current rows, so every process converges on the latest state
+        rows = self._reader.execute(
+            """
+            SELECT c.seq, c.template_id, c.writer, t.data,
+                   (SELECT MIN(seq) FROM template_changes) AS first_seq
+            FROM template_changes c
+            LEFT JOIN templates t ON t.id = c.template_id
+            WHERE c.seq > ?
+            ORDER BY c.seq
+            """,
+            (self._last_seq,),
+        ).fetchall()
+        if not rows:
+            return []
+
+        if rows[0][4] > self._last_seq + 1:
+            logger.warning(f"Template changes after {self._last_seq} were pruned, reloading every template")
+            return None
+
+        changes: Dict[str, Optional[TemplateRecord]] = {}
+        for seq, template_id, writer, data, _ in rows:
+            self._last_seq = seq
+            if writer == self.writer_id:
+                continue
+            changes[template_id] = decode_template(json.loads(data)) if data is not None else None
+
+        return list(changes.items())
+
+    def change_position(self) -> Optional[int]:
+        # The in-memory copy may already hold a write that is not in the database yet
+        return None if self._writes_in_progress else self._last_seq
+
+    async def close(self) -> None:
+        if self._writer is not None:
+            await self._run(self._writer.close)
+            self._writer = None
+        if self._reader is not None:
+            self._reader.close()
+            self._reader = None
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,72 @@
+from collections import OrderedDict
+from typing import Dict, Any, List
+import time
+
+from config.env import WEBHOOK_RATE_LIMIT, WEBHOOK_RATE_BURST, WEBHOOK_RATE_MAX_SENDERS
+
+# Token bucket of each active sender, least recently seen first: [tokens, last seen (monotonic seconds)]
+_buckets: "OrderedDict[str, List[float]]" = OrderedDict()
+
+# Seconds for an empty bucket to fill up again; a bucket idle that long is the same as a new one
+_REFILL_SECONDS = WEBHOOK_RATE_BURST / WEBHOOK_RATE_LIMIT if WEBHOOK_RATE_LIMIT > 0 else 0.0
+
+_stats = {
+    "admitted": 0,
+    "rejected": 0,
+}
+
+def admit(sender: str) -> float:
+    """
+    Take a token from a sender's bucket.
+
+    Buckets hold up to WEBHOOK_RATE_BURST tokens and refill at
+    WEBHOOK_RATE_LIMIT tokens per second. Buckets idle long enough to be
+    full again are dropped, so only senders active within the last
+    WEBHOOK_RATE_BURST / WEBHOOK_RATE_LIMIT seconds take memory; past
+    WEBHOOK_RATE_MAX_SENDERS the least recently seen are dropped too.
+
+    Args:
+        sender: The sender key
+
+    Returns:
+        0 if the request is admitted, otherwise the seconds until the sender gets a token
+    """
+    if WEBHOOK_RATE_LIMIT <= 0:
+        return 0.0
+
+    now = time.monotonic()
+    while _buckets:
+        oldest = next(iter(_buckets.values()))
+        if now - oldest[1] < _REFILL_SECONDS and len(_buckets) < WEBHOOK_RATE_MAX_SENDERS:
+            break
+        _buckets.popitem(last=False)
+
+    bucket = _buckets.get(sender)
+    if bucket is None:
+        bucket = _buckets[sender] = [WEBHOOK_RATE_BURST, now]
+    else:
+        bucket[0] = min(WEBHOOK_RATE_BURST, bucket[0] + (now - bucket[1]) * WEBHOOK_RATE_LIMIT)
+        bucket[1] = now
+        _buckets.move_to_end(sender)
+
+    if bucket[0] >= 1:
+        bucket[0] -= 1
+        _stats["admitted"] += 1
+        return 0.0
+
+    _stats["rejected"] += 1
+    return (1 - bucket[0]) / WEBHOOK_RATE_LIMIT
+
+def get_stats() -> Dict[str, Any]:
+    """
+    Get the admission counters.
+
+    Returns:
+        The configured rate, the number of active senders and the admitted and rejected requests
+    """
+    return {
+        "rate_limit": WEBHOOK_RATE_LIMIT,
+        "burst": WEBHOOK_RATE_BURST,
+        "senders": len(_buckets),
+        **_stats,
+    }
@@ -0,0 +1,257 @@
+from typing import Dict, Any, List, Optional
+from urllib.parse import urlsplit
+import asyncio
+import random
+import time
+
+import httpx
+
+from config.env import (
+    DELIVERY_MAX_CONNECTIONS,
+    DELIVERY_MAX_CONNECTIONS_PER_HOST,
+    DELIVERY_TIMEOUT,
+    DELIVERY_MAX_RETRIES,
+    DELIVERY_BACKOFF_BASE_MS,
+    DELIVERY_BACKOFF_MAX_MS,
+    DELIVERY_BREAKER_THRESHOLD,
+    DELIVERY_BREAKER_RESET_SECONDS,
+    DELIVERY_BATCH_SIZE,
+)
+from utils.json_codec import dumps
+from utils.logger import logger
+
+# HTTP/2 needs the optional h2 package; without it the client speaks HTTP/1.1 with keep-alive
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:  # pragma: no cover - depends on the installed packages
+    HTTP2_AVAILABLE = False
+
+# Responses worth retrying: the destination is overloaded or temporarily failing
+RETRY_STATUS_CODES = {408, 425, 429, 500, 502, 503, 504}
+
+class CircuitBreaker:
+    """
+    Circuit breaker of a destination.
+
+    After `threshold` consecutive failures the circuit opens and deliveries
+    fail fast for `reset_seconds`. A single trial delivery is then let
+    through (half-open): its success closes the circuit, its failure opens
+    it again.
+    """
+
+    def __init__(self, destination: str, threshold: int, reset_seconds: float):
+        self.destination = destination
+        self.threshold = threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        """closed, open or half_open."""
+        if self.opened_at is None:
+            return "closed"
+        if self._probing or time.monotonic() - self.opened_at >= self.reset_seconds:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        """
+        Check whether a delivery may be attempted, taking the trial slot when half-open.
+        """
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+
+    def release(self) -> None:
+        """Give back the trial slot of an attempt that ended without an outcome, e.g. cancelled."""
+        self._probing = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        # Failures of deliveries started before the circuit opened do not extend it
+        if self._probing or (self.opened_at is None and self.failures >= self.threshold):
+            logger.warning(f"Circuit to {self.destination} opened after {self.failures} consecutive delivery failures")
+            self.opened_at = time.monotonic()
+            self._probing = False
+
+# Shared client, created on first use and closed by close_delivery()
+_client: Optional[httpx.AsyncClient] = None
+
+# Per-host connection limits and circuit breakers, by "scheme://host:port"
+_host_limits: Dict[str, asyncio.Semaphore] = {}
+_breakers: Dict[str, CircuitBreaker] = {}
+
+_metrics = {
+    "delivered": 0,
+    "failed": 0,
+    "retries": 0,
+    "rejected_by_breaker": 0,
+}
+
+def _get_client() -> httpx.AsyncClient:
+    """
+    Get the shared pooled client, creating it on first use.
+    """
+    global _client
+
+    if _client is None:
+        _client = httpx.AsyncClient(
+            http2=HTTP2_AVAILABLE,
+            timeout=DELIVERY_TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=DELIVERY_MAX_CONNECTIONS,
+                max_keepalive_connections=DELIVERY_MAX_CONNECTIONS,
+                keepalive_expiry=30.0,
+            ),
+            headers={"Content-Type": "application/json"},
+        )
+        logger.info(f"Created delivery client ({'HTTP/2' if HTTP2_AVAILABLE else 'HTTP/1.1'}, {DELIVERY_MAX_CONNECTIONS} connections)")
+    return _client
+
+def _destination(url: str) -> str:
+    """
+    Get the destination (scheme, host and port) of a URL, which limits and breakers are kept by.
+    """
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+def _backoff(attempt: int, retry_after: Optional[str] = None) -> float:
+    """
+    Get the seconds to wait before a retry: exponential with full jitter, or the server's Retry-After.
+    """
+    cap = DELIVERY_BACKOFF_MAX_MS / 1000
+    if retry_after is not None:
+        try:
+            return min(float(retry_after), cap)
+        except ValueError:
+            pass
+    return random.uniform(0, min(cap, DELIVERY_BACKOFF_BASE_MS / 1000 * 2 ** attempt))
+
+async def deliver(url: str, payload: Any) -> Dict[str, Any]:
+    """
+    POST a JSON payload to a destination, retrying transient failures.
+
+    Network errors, timeouts and 408/425/429/5xx responses are retried up to
+    DELIVERY_MAX_RETRIES times. Other responses are final. Every failed
+    attempt counts towards the destination's circuit breaker; while it is
+    open, deliveries fail immediately without a request.
+
+    Args:
+        url: The destination URL
+        payload: The JSON serializable payload
+
+    Returns:
+        A dictionary with the delivery status (delivered, failed or circuit_open),
+        the last HTTP status code, the number of attempts and the last error
+    """
+    destination = _destination(url)
+    breaker = _breakers.get(destination)
+    if breaker is None:
+        breaker = _breakers[destination] = CircuitBreaker(destination, DELIVERY_BREAKER_THRESHOLD, DELIVERY_BREAKER_RESET_SECONDS)
+    limit = _host_limits.get(destination)
+    if limit is None:
+        limit = _host_limits[destination] = asyncio.Semaphore(DELIVERY_MAX_CONNECTIONS_PER_HOST)
+
+    body = dumps(payload)
+    client = _get_client()
+    status_code = None
+    error = None
+
+    for attempt in range(DELIVERY_MAX_RETRIES + 1):
+        if not breaker.allow():
+            _metrics["rejected_by_breaker"] += 1
+            return {"url": url, "status": "circuit_open", "status_code": status_code, "attempts": attempt, "error": error}
+        if attempt:
+            _metrics["retries"] += 1
+
+        retry_after = None
+        try:
+            async with limit:
+                response = await client.post(url, content=body)
+            status_code = response.status_code
+            if status_code < 400:
+                breaker.record_success()
+                _metrics["delivered"] += 1
+                return {"url": url, "status": "delivered", "status_code": status_code, "attempts": attempt + 1, "error": None}
+            error = f"HTTP {status_code}"
+            retry_after = response.headers.get("Retry-After")
+            if status_code not in RETRY_STATUS_CODES:
+                # The destination answered: it is up, but rejects this payload
+                breaker.record_success()
+                break
+        except httpx.HTTPError as e:
+            error = f"{type(e).__name__}: {e}"
+        except asyncio.CancelledError:
+            breaker.release()
+            raise
+        except BaseException:
+            # Never leave a half-open circuit waiting for a trial that is over
+            breaker.record_failure()
+            raise
+
+        breaker.record_failure()
+        if attempt < DELIVERY_MAX_RETRIES:
+            delay = _backoff(attempt, retry_after)
+            logger.debug(f"Delivery to {url} failed ({error}), retrying in {delay:.2f}s")
+            await asyncio.sleep(delay)
+
+    _metrics["failed"] += 1
+    logger.warning(f"Delivery to {url} failed after {attempt + 1} attempts: {error}")
+    return {"url": url, "status": "failed", "status_code": status_code, "attempts": attempt + 1, "error": error}
+
+async def deliver_batch(url: str, payloads: List[Any], batch_size: int = DELIVERY_BATCH_SIZE) -> List[Dict[str, Any]]:
+    """
+    POST payloads to a destination that accepts JSON arrays, `batch_size` per request.
+
+    The chunks are sent concurrently, within the destination's connection limit.
+
+    Args:
+        url: The destination URL
+        payloads: The JSON serializable payloads
+        batch_size: Maximum number of payloads per request
+
+    Returns:
+        The delivery result of each chunk, in order, with the number of payloads it held
+    """
+    chunks = [payloads[start:start + batch_size] for start in range(0, len(payloads), batch_size)]
+    results = await asyncio.gather(*(deliver(url, chunk) for chunk in chunks))
+    return [{**result, "count": len(chunk)} for result, chunk in zip(results, chunks)]
+
+async def close_delivery() -> None:
+    """
+    Close the shared client and its connections.
+    """
+    global _client
+
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+def get_metrics() -> Dict[str, Any]:
+    """
+    Get the delivery counters and the circuit breaker state of each destination.
+
+    Returns:
+        Delivery counters, the protocol in use and breakers that are not closed
+    """
+    return {
+        "http2": HTTP2_AVAILABLE,
+        **_metrics,
+        "open_circuits": {
+            destination: {"state": breaker.state, "failures": breaker.failures}
+            for destination, breaker in _breakers.items()
+            if breaker.state != "closed"
+        },
+    }
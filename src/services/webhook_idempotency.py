@@ -0,0 +1,243 @@
+from collections import OrderedDict
+from typing import Dict, Any, List, Mapping, Optional
+import asyncio
+import json
+import os
+import time
+
+from config.env import (
+    WEBHOOK_IDEMPOTENCY_KEY,
+    WEBHOOK_DELIVERY_HEADER,
+    WEBHOOK_IDEMPOTENCY_TTL,
+    WEBHOOK_IDEMPOTENCY_MAX_ENTRIES,
+    WEBHOOK_IDEMPOTENCY_PATH,
+)
+from schemas.webhook_schemas import WebhookPayload
+from utils.append_log import AppendLog
+from utils.logger import logger
+
+# Recent webhooks by idempotency key, least recently used first:
+# [expires at (epoch seconds), webhook ID, result or None while processing]
+_entries: "OrderedDict[str, List[Any]]" = OrderedDict()
+
+# Log of processed webhooks, opened by init_idempotency() when WEBHOOK_IDEMPOTENCY_PATH is set
+_log: Optional[AppendLog] = None
+_logged = 0
+
+# Records written while the log is being compacted, copied into the compacted log
+_compacting: Optional[List[Dict[str, Any]]] = None
+
+_stats = {
+    "hits": 0,
+    "misses": 0,
+    "evictions": 0,
+}
+
+def webhook_key(webhook_data: WebhookPayload, headers: Optional[Mapping[str, str]] = None) -> Optional[str]:
+    """
+    Get the idempotency key of a webhook, following WEBHOOK_IDEMPOTENCY_KEY.
+
+    "auto" only uses identifiers of a single delivery or message. The entity
+    and status of a status update are only used when "entity_status" is
+    chosen explicitly, as a later change back to an earlier status within
+    WEBHOOK_IDEMPOTENCY_TTL is then dropped as a duplicate.
+
+    Args:
+        webhook_data: The validated webhook
+        headers: The request headers, for the delivery header
+
+    Returns:
+        The key, or None if the webhook has none and must always be processed
+    """
+    strategy = WEBHOOK_IDEMPOTENCY_KEY
+    if strategy == "none":
+        return None
+
+    if strategy in ("auto", "header") and headers is not None:
+        delivery_id = headers.get(WEBHOOK_DELIVERY_HEADER)
+        if delivery_id:
+            return f"delivery:{delivery_id}"
+    if strategy == "header":
+        return None
+
+    event_type = webhook_data.event_type
+    message_id = webhook_data.data_field("message_id")
+    if strategy in ("auto", "message_id") and message_id is not None:
+        return f"message:{event_type}:{message_id}"
+    entity_id = webhook_data.data_field("entity_id")
+    status = webhook_data.data_field("status")
+    if strategy == "entity_status" and entity_id is not None and status is not None:
+        return f"status:{event_type}:{entity_id}:{status}"
+    return None
+
+def lookup(key: str) -> Optional[Dict[str, Any]]:
+    """
+    Find an earlier delivery of a webhook.
+
+    Args:
+        key: The idempotency key
+
+    Returns:
+        A dictionary with the ID of the earlier webhook and its result (None while
+        it is still being processed), or None if the webhook was not seen
+    """
+    entry = _entries.get(key)
+    if entry is not None and entry[0] <= time.time():
+        del _entries[key]
+        entry = None
+
+    if entry is None:
+        _stats["misses"] += 1
+        return None
+
+    _stats["hits"] += 1
+    _entries.move_to_end(key)
+    return {"id": entry[1], "result": entry[2]}
+
+def begin(key: str, webhook_id: str) -> None:
+    """
+    Record that a webhook was accepted and is being processed.
+
+    Args:
+        key: The idempotency key
+        webhook_id: The ID assigned to the webhook
+    """
+    _store(key, [time.time() + WEBHOOK_IDEMPOTENCY_TTL, webhook_id, None])
+
+async def complete(key: str, webhook_id: str, result: Dict[str, Any]) -> None:
+    """
+    Record the result of a webhook, returned to its later deliveries.
+
+    Args:
+        key: The idempotency key
+        webhook_id: The ID assigned to the webhook
+        result: The processing result
+    """
+    global _logged
+
+    expires_at = time.time() + WEBHOOK_IDEMPOTENCY_TTL
+    _store(key, [expires_at, webhook_id, result])
+
+    if _log is not None:
+        try:
+            record = {"key": key, "expires_at": expires_at, "id": webhook_id, "result": result}
+            _log.write(record)
+            _logged += 1
+            if _compacting is not None:
+                _compacting.append(record)
+            elif _logged > 2 * WEBHOOK_IDEMPOTENCY_MAX_ENTRIES:
+                await _compact()
+        except Exception as e:
+            logger.error(f"Error persisting webhook idempotency key: {str(e)}", exc_info=True)
+
+def forget(key: str) -> None:
+    """
+    Drop a webhook from the cache so that its next delivery is processed,
+    e.g. after it failed or could not be queued.
+
+    Args:
+        key: The idempotency key
+    """
+    _entries.pop(key, None)
+
+def _store(key: str, entry: List[Any]) -> None:
+    """
+    Insert or refresh an entry, evicting expired and least recently used entries over the cap.
+    """
+    _entries[key] = entry
+    _entries.move_to_end(key)
+
+    now = time.time()
+    while _entries:
+        oldest_key, oldest = next(iter(_entries.items()))
+        if len(_entries) <= WEBHOOK_IDEMPOTENCY_MAX_ENTRIES and oldest[0] > now:
+            break
+        del _entries[oldest_key]
+        _stats["evictions"] += 1
+
+def _write_records(path: str, records: List[Dict[str, Any]]) -> None:
+    """
+    Write records to a new log file, replacing the current one atomically.
+    """
+    temporary_path = path + ".tmp"
+    with open(temporary_path, "wb") as f:
+        for record in records:
+            f.write(json.dumps(record, separators=(",", ":"), default=str).encode("utf-8") + b"\n")
+    os.replace(temporary_path, path)
+
+async def _compact() -> None:
+    """
+    Rewrite the log with only the processed webhooks still cached.
+
+    The file is written on a thread; records logged meanwhile are copied
+    into the compacted log once it replaces the current one.
+    """
+    global _log, _logged, _compacting
+
+    records = [
+        {"key": key, "expires_at": expires_at, "id": webhook_id, "result": result}
+        for key, (expires_at, webhook_id, result) in _entries.items()
+        if result is not None
+    ]
+    _compacting = []
+    try:
+        await asyncio.get_running_loop().run_in_executor(None, _write_records, WEBHOOK_IDEMPOTENCY_PATH, records)
+
+        if _log is not None:
+            await _log.close()
+        _log = AppendLog(WEBHOOK_IDEMPOTENCY_PATH, fsync=False)
+        for record in _compacting:
+            _log.write(record)
+        _logged = len(records) + len(_compacting)
+    finally:
+        _compacting = None
+
+async def init_idempotency() -> None:
+    """
+    Load the processed webhooks persisted by an earlier run, if WEBHOOK_IDEMPOTENCY_PATH is set.
+
+    Records are written without fsync: losing the last ones in a crash only
+    means their retries are processed again.
+    """
+    _entries.clear()
+    if not WEBHOOK_IDEMPOTENCY_PATH or WEBHOOK_IDEMPOTENCY_KEY == "none":
+        return
+
+    directory = os.path.dirname(WEBHOOK_IDEMPOTENCY_PATH)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    if os.path.exists(WEBHOOK_IDEMPOTENCY_PATH):
+        now = time.time()
+        for record in AppendLog.read(WEBHOOK_IDEMPOTENCY_PATH):
+            if record["expires_at"] > now:
+                _entries[record["key"]] = [record["expires_at"], record["id"], record["result"]]
+                _entries.move_to_end(record["key"])
+        while len(_entries) > WEBHOOK_IDEMPOTENCY_MAX_ENTRIES:
+            _entries.popitem(last=False)
+
+    await _compact()
+    logger.info(f"Loaded {len(_entries)} processed webhooks from {WEBHOOK_IDEMPOTENCY_PATH}")
+
+async def close_idempotency() -> None:
+    """
+    Flush and close the log of processed webhooks.
+    """
+    global _log
+
+    if _log is not None:
+        await _log.close()
+        _log = None
+
+def get_stats() -> Dict[str, Any]:
+    """
+    Get the de-duplication counters.
+
+    Returns:
+        Hits (duplicates), misses, evictions and the number of cached webhooks
+    """
+    return {
+        "key": WEBHOOK_IDEMPOTENCY_KEY,
+        "entries": len(_entries),
+        **_stats,
+    }
@@ -0,0 +1,459 @@
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Dict, Any, AsyncIterator, Deque, List, Optional, Set, Tuple
+import asyncio
+import itertools
+import time
+import uuid
+
+from config.env import (
+    WEBHOOK_QUEUE_SIZE,
+    WEBHOOK_QUEUE_WORKERS,
+    WEBHOOK_DRAIN_TIMEOUT,
+    WEBHOOK_ORDERING_KEYS,
+    WEBHOOK_LANES,
+    WEBHOOK_COALESCE_TYPES,
+    WEBHOOK_COALESCE_KEY,
+    WEBHOOK_COALESCE_WINDOW_MS,
+    WEBHOOK_SPOOL_PATH,
+    WEBHOOK_SPOOL_SEGMENT_MB,
+    WEBHOOK_SPOOL_COMMIT_INTERVAL_MS,
+)
+from schemas.webhook_schemas import WebhookPayload, payload_model
+from services import webhook_idempotency
+from services.webhook_spool import WebhookSpool
+from services.webhook_service import WebhookHandler, get_handlers, process_webhook, resolve_handler
+from utils.logger import logger
+
+class QueueFullError(Exception):
+    """Raised when a webhook cannot be queued because the queue is full."""
+
+class QueueClosedError(Exception):
+    """Raised when a webhook cannot be queued because the workers are not running."""
+
+# Priority of events without a handler, which are only logged
+DEFAULT_PRIORITY = 100
+
+# Queued webhooks as (priority, seq, id, data, idempotency key, lane, superseded (id, idempotency key) pairs),
+# created by start_webhook_workers(); seq keeps events of the same priority in arrival order
+_queue: Optional[asyncio.PriorityQueue] = None
+_seq = itertools.count()
+_workers: List[asyncio.Task] = []
+_accepting = False
+
+# Number of webhooks parked on a handler at its concurrency limit
+_parked = 0
+
+# Tasks running parked webhooks once their handler has a free slot
+_resumed: Set[asyncio.Task] = set()
+
+# Lanes with a webhook queued or in flight, by (event type, lane number), with the webhooks waiting
+# behind it in arrival order; a lane only ever has one webhook in the queue, so webhooks of the same
+# type and key never run in parallel. Lanes are per event type so that a key colliding with a lane of
+# another type cannot hold its webhooks behind that type's backlog. Webhooks processed outside the
+# queue (hold_lanes()) wait in the lane as a future, resolved when their turn comes
+_lanes: Dict[Tuple[str, int], Deque[Any]] = {}
+_laned = 0
+
+# Webhooks held for coalescing by (event type, key value):
+# [id, data, idempotency key, superseded (id, idempotency key) pairs, release timer]
+_held: Dict[Tuple[str, str], List[Any]] = {}
+
+# Write-ahead spool of queued webhooks, opened by start_webhook_workers() when WEBHOOK_SPOOL_PATH is set
+_spool: Optional[WebhookSpool] = None
+
+_metrics = {
+    "accepted": 0,
+    "rejected": 0,
+    "processed": 0,
+    "failed": 0,
+    "in_flight": 0,
+    "coalesced": 0,
+    "max_queue_depth": 0,
+    "processing_seconds": 0.0,
+}
+
+def enqueue(webhook_data: WebhookPayload, idempotency_key: Optional[str] = None) -> str:
+    """
+    Queue a webhook for background processing.
+
+    Webhooks are processed in the priority order of their handlers, except
+    that webhooks of a type sharing an ordering key run one at a time in arrival order.
+    Webhooks of a coalesced type are held for a short window first, and only
+    the latest one per key is queued. The queue capacity counts held, queued,
+    parked and lane-waiting webhooks. With a spool, the
+    webhook is written to it but only durable once wait_durable() returns.
+
+    Args:
+        webhook_data: The validated webhook to process
+        idempotency_key: Key under which the result is cached for later deliveries, if any
+
+    Returns:
+        The ID assigned to the queued webhook
+
+    Raises:
+        QueueClosedError: If the workers are not running (startup or shutdown)
+        QueueFullError: If the queue is full
+    """
+    if not _accepting:
+        _metrics["rejected"] += 1
+        raise QueueClosedError("Webhook processing is not running")
+
+    depth = _queue.qsize() + _parked + _laned + len(_held)
+    if depth >= WEBHOOK_QUEUE_SIZE:
+        _metrics["rejected"] += 1
+        raise QueueFullError(f"Webhook queue is full ({depth} events waiting)")
+
+    webhook_id = uuid.uuid4().hex
+    if _spool is not None:
+        _spool.append(webhook_id, webhook_data.model_dump(mode="json", by_alias=True), idempotency_key)
+
+    coalesce_key = _coalesce_key(webhook_data)
+    if coalesce_key is not None:
+        _hold(coalesce_key, webhook_id, webhook_data, idempotency_key)
+    else:
+        _put(webhook_id, webhook_data, idempotency_key)
+
+    _metrics["accepted"] += 1
+    _metrics["max_queue_depth"] = max(_metrics["max_queue_depth"], depth + 1)
+    return webhook_id
+
+def _lane(webhook_data: WebhookPayload) -> Optional[Tuple[str, int]]:
+    """
+    Get the lane of a webhook from its ordering key, or None if it has none.
+    """
+    for field in WEBHOOK_ORDERING_KEYS:
+        value = webhook_data.data_field(field)
+        if value is not None:
+            return webhook_data.event_type, hash(str(value)) % WEBHOOK_LANES
+    return None
+
+def _coalesce_key(webhook_data: WebhookPayload) -> Optional[Tuple[str, str]]:
+    """
+    Get the key under which a webhook is coalesced, or None if it is not coalesced.
+    """
+    event_type = webhook_data.event_type
+    if event_type not in WEBHOOK_COALESCE_TYPES:
+        return None
+    value = webhook_data.data_field(WEBHOOK_COALESCE_KEY)
+    if value is None:
+        return None
+    return event_type, str(value)
+
+def _hold(coalesce_key: Tuple[str, str], webhook_id: str, webhook_data: WebhookPayload, idempotency_key: Optional[str]) -> None:
+    """
+    Hold a webhook for the coalescing window, superseding the webhook held under the same key.
+    """
+    if idempotency_key is not None:
+        webhook_idempotency.begin(idempotency_key, webhook_id)
+
+    held = _held.get(coalesce_key)
+    if held is None:
+        timer = asyncio.get_running_loop().call_later(WEBHOOK_COALESCE_WINDOW_MS / 1000, _release_held, coalesce_key)
+        _held[coalesce_key] = [webhook_id, webhook_data, idempotency_key, [], timer]
+        return
+
+    held[3].append((held[0], held[2]))
+    held[0], held[1], held[2] = webhook_id, webhook_data, idempotency_key
+    _metrics["coalesced"] += 1
+
+def _release_held(coalesce_key: Tuple[str, str]) -> None:
+    """
+    Queue the latest webhook held under a key, with the number of webhooks it superseded.
+    """
+    webhook_id, webhook_data, idempotency_key, superseded, timer = _held.pop(coalesce_key)
+    timer.cancel()
+    _put(webhook_id, webhook_data.model_copy(update={"coalesced": len(superseded)}), idempotency_key, tuple(superseded))
+
+def _put(
+    webhook_id: str,
+    webhook_data: WebhookPayload,
+    idempotency_key: Optional[str],
+    superseded: Tuple[Tuple[str, Optional[str]], ...] = (),
+) -> None:
+    """
+    Add a webhook to the queue with the priority of its handler, or behind the webhook of its lane.
+    """
+    global _laned
+
+    handler = resolve_handler(webhook_data.event_type)
+    priority = handler.priority if handler is not None else DEFAULT_PRIORITY
+    lane = _lane(webhook_data)
+    item = (priority, next(_seq), webhook_id, webhook_data, idempotency_key, lane, superseded)
+    if idempotency_key is not None:
+        webhook_idempotency.begin(idempotency_key, webhook_id)
+
+    if lane is not None:
+        waiting = _lanes.get(lane)
+        if waiting is not None:
+            waiting.append(item)
+            _laned += 1
+            return
+        _lanes[lane] = deque()
+    _queue.put_nowait(item)
+
+def _release_lane(lane: Tuple[str, int]) -> None:
+    """
+    Queue the next webhook of a lane once the previous one is finished, or free the lane.
+    """
+    global _laned
+
+    waiting = _lanes.get(lane)
+    if waiting is None:
+        # Cleared by stop_webhook_workers()
+        return
+    while waiting:
+        item = waiting.popleft()
+        if isinstance(item, asyncio.Future):
+            if item.cancelled():
+                continue
+            item.set_result(None)
+            return
+        _laned -= 1
+        _queue.put_nowait(item)
+        return
+    del _lanes[lane]
+
+async def _acquire_lane(lane: Tuple[str, int]) -> None:
+    """
+    Wait for the turn of a webhook processed outside the queue in a lane, and take the lane.
+    """
+    waiting = _lanes.get(lane)
+    if waiting is None:
+        _lanes[lane] = deque()
+        return
+
+    turn = asyncio.get_running_loop().create_future()
+    waiting.append(turn)
+    try:
+        await turn
+    except asyncio.CancelledError:
+        if not turn.cancelled():
+            # Given the lane just as the wait was cancelled
+            _release_lane(lane)
+        raise
+
+@asynccontextmanager
+async def hold_lanes(events: List[WebhookPayload]) -> AsyncIterator[None]:
+    """
+    Hold the lanes of webhooks processed outside the queue, e.g. by the batch endpoint.
+
+    Waits behind the webhooks queued, in flight or held in each lane, and
+    keeps later ones from starting until released, so webhooks with the same
+    ordering key run one at a time in arrival order whichever endpoint they
+    came through. Lanes are taken in a fixed order, so that holders of
+    several lanes cannot wait on each other.
+
+    Args:
+        events: The webhooks processed together
+    """
+    lanes = sorted({lane for lane in map(_lane, events) if lane is not None}, key=lambda lane: (str(lane[0]), lane[1]))
+    held = []
+    try:
+        for lane in lanes:
+            await _acquire_lane(lane)
+            held.append(lane)
+        yield
+    finally:
+        for lane in reversed(held):
+            _release_lane(lane)
+
+async def wait_durable() -> None:
+    """
+    Wait until every webhook queued so far is in the spool on disk (no-op without a spool).
+    """
+    if _spool is not None:
+        await _spool.commit()
+
+async def _worker(number: int) -> None:
+    """
+    Process queued webhooks until cancelled.
+
+    A webhook whose handler is at its concurrency limit is parked on the
+    handler instead of holding the worker, so a flood of slow events of one
+    type cannot take every worker away from the other types.
+    """
+    global _parked
+
+    while True:
+        item = await _queue.get()
+        handler = resolve_handler(item[3].event_type)
+        if handler is not None and handler.at_limit():
+            handler.parked.append(item)
+            _parked += 1
+            continue
+        await _process(item, number)
+
+def _resume(handler: WebhookHandler) -> None:
+    """
+    Run the oldest webhook parked on a handler once it has a free slot.
+    """
+    global _parked
+
+    if not handler.parked or handler.at_limit():
+        return
+    item = handler.parked.popleft()
+    _parked -= 1
+    task = asyncio.create_task(_process(item, None))
+    _resumed.add(task)
+    task.add_done_callback(_resumed.discard)
+
+async def _finish(webhook_id: str, idempotency_key: Optional[str], result: Optional[Dict[str, Any]]) -> None:
+    """
+    Mark a webhook done in the spool and record its result for later deliveries.
+
+    Failed webhooks (error result or None) are forgotten so that the provider's retry processes them again.
+    """
+    if _spool is not None:
+        _spool.done(webhook_id)
+    if idempotency_key is not None:
+        if result is None or result.get("status") == "error":
+            webhook_idempotency.forget(idempotency_key)
+        else:
+            await webhook_idempotency.complete(idempotency_key, webhook_id, result)
+
+async def _process(
+    item: Tuple[int, int, str, WebhookPayload, Optional[str], Optional[Tuple[str, int]], Tuple[Tuple[str, Optional[str]], ...]],
+    number: Optional[int],
+) -> None:
+    """
+    Process a queued webhook and record the outcome, for it and the webhooks it superseded.
+    """
+    _, _, webhook_id, webhook_data, idempotency_key, lane, superseded = item
+    _metrics["in_flight"] += 1
+    start = time.perf_counter()
+    result = None
+    try:
+        try:
+            result = await process_webhook(webhook_data)
+            if result.get("status") == "error":
+                _metrics["failed"] += 1
+                logger.warning(f"Webhook {webhook_id} failed: {result.get('message')}")
+            else:
+                _metrics["processed"] += 1
+                logger.debug(f"Webhook {webhook_id} processed by {f'worker {number}' if number is not None else 'a resumed task'}")
+        except Exception as e:
+            _metrics["failed"] += 1
+            logger.error(f"Error processing webhook {webhook_id}: {str(e)}", exc_info=True)
+
+        try:
+            for superseded_id, superseded_key in superseded:
+                await _finish(superseded_id, superseded_key, result)
+            await _finish(webhook_id, idempotency_key, result)
+        except Exception as e:
+            logger.error(f"Error recording the outcome of webhook {webhook_id}: {str(e)}", exc_info=True)
+    finally:
+        _metrics["processing_seconds"] += time.perf_counter() - start
+        _metrics["in_flight"] -= 1
+        # Queued before marking this one done, so that draining waits for the whole lane
+        if lane is not None:
+            _release_lane(lane)
+        _queue.task_done()
+
+async def start_webhook_workers() -> None:
+    """
+    Create the webhook queue, replay the spool into it and start the worker pool.
+
+    Webhooks replayed from the spool are queued even beyond the queue capacity.
+    """
+    global _queue, _accepting, _spool
+
+    _queue = asyncio.PriorityQueue()
+    for handler in get_handlers():
+        handler.on_release = _resume
+
+    if WEBHOOK_SPOOL_PATH:
+        _spool = WebhookSpool(
+            WEBHOOK_SPOOL_PATH,
+            segment_bytes=WEBHOOK_SPOOL_SEGMENT_MB * 1024 * 1024,
+            commit_interval=WEBHOOK_SPOOL_COMMIT_INTERVAL_MS / 1000,
+        )
+        replayed = await _spool.open()
+        for webhook_id, webhook_data, idempotency_key in replayed:
+            # Validated when accepted; replayed with the model of its type again
+            _put(webhook_id, payload_model(webhook_data.get("event_type")).model_validate(webhook_data), idempotency_key)
+        if replayed:
+            logger.info(f"Replaying {len(replayed)} webhooks from the spool")
+
+    _workers[:] = [asyncio.create_task(_worker(number)) for number in range(WEBHOOK_QUEUE_WORKERS)]
+    _accepting = True
+
+    logger.info(f"Started {WEBHOOK_QUEUE_WORKERS} webhook workers with a queue of {WEBHOOK_QUEUE_SIZE}")
+
+async def stop_webhook_workers() -> None:
+    """
+    Stop accepting webhooks, let the workers drain the queue and stop them.
+
+    Webhooks still queued after WEBHOOK_DRAIN_TIMEOUT seconds are dropped
+    and logged; with a spool they are replayed on the next start.
+    """
+    global _accepting, _parked, _laned, _spool
+
+    _accepting = False
+    if _queue is None:
+        return
+
+    for coalesce_key in list(_held):
+        _release_held(coalesce_key)
+
+    try:
+        await asyncio.wait_for(_queue.join(), WEBHOOK_DRAIN_TIMEOUT)
+        logger.info("Webhook queue drained")
+    except asyncio.TimeoutError:
+        outcome = "keeping them in the spool" if _spool is not None else "dropping them"
+        logger.warning(f"Webhook queue not drained after {WEBHOOK_DRAIN_TIMEOUT}s with {_queue.qsize() + _parked + _laned} queued webhooks, {outcome}")
+
+    tasks = _workers + list(_resumed)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    _workers.clear()
+
+    for handler in get_handlers():
+        handler.on_release = None
+        handler.parked.clear()
+    _parked = 0
+    # Let webhooks processed outside the queue that wait for a lane go ahead
+    for waiting in _lanes.values():
+        for item in waiting:
+            if isinstance(item, asyncio.Future) and not item.done():
+                item.set_result(None)
+    _lanes.clear()
+    _laned = 0
+
+    if _spool is not None:
+        await _spool.close()
+        _spool = None
+
+def get_metrics() -> Dict[str, Any]:
+    """
+    Get the webhook queue metrics.
+
+    Returns:
+        Queue depth and capacity, worker count, event counters, per-handler state
+        and de-duplication counters
+    """
+    finished = _metrics["processed"] + _metrics["failed"]
+    return {
+        "queue_depth": _queue.qsize() if _queue is not None else 0,
+        "parked": _parked,
+        "lane_waiting": _laned,
+        "coalescing": len(_held),
+        "active_lanes": len(_lanes),
+        "spooled": _spool.pending if _spool is not None else 0,
+        "queue_capacity": WEBHOOK_QUEUE_SIZE,
+        "workers": len(_workers),
+        "accepting": _accepting,
+        **{name: value for name, value in _metrics.items() if name != "processing_seconds"},
+        "average_processing_ms": round(_metrics["processing_seconds"] / finished * 1000, 3) if finished else 0.0,
+        "handlers": {
+            handler.event_type: {
+                "concurrency": handler.concurrency,
+                "timeout": handler.timeout,
+                "priority": handler.priority,
+                "parked": len(handler.parked),
+            }
+            for handler in get_handlers()
+        },
+        "idempotency": webhook_idempotency.get_stats(),
+    }
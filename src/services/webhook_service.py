@@ -1,42 +1,306 @@
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, AsyncContextManager, AsyncIterator, Awaitable, Callable, Deque, List, Optional
+from collections import deque
+from contextlib import asynccontextmanager
 import asyncio
 
+from schemas.webhook_schemas import MessageReceivedPayload, StatusUpdatePayload, UserCreatedPayload, WebhookPayload
 from utils.logger import logger
 
-async def process_webhook(webhook_data: Dict[str, Any]) -> Dict[str, Any]:
+Handler = Callable[[WebhookPayload], Awaitable[Dict[str, Any]]]
+BatchHandler = Callable[[List[WebhookPayload]], Awaitable[List[Dict[str, Any]]]]
+
+class WebhookHandler:
+    """
+    A handler registered for an event type, with its own limits.
+    """
+
+    def __init__(self, event_type: str, handler: Handler, concurrency: Optional[int], timeout: Optional[float], priority: int):
+        self.event_type = event_type
+        self.handler = handler
+        self.concurrency = concurrency or None
+        self.timeout = timeout
+        self.priority = priority
+        # Optional handler taking a whole same-type sub-batch, see register_batch_handler()
+        self.batch_handler: Optional[BatchHandler] = None
+        # Running invocations, and callers waiting for a slot when at the limit
+        self.running = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        # Events the queue set aside while this handler was at its concurrency limit
+        self.parked: Deque[Any] = deque()
+        # Called whenever a slot becomes free, so parked events can be resumed
+        self.on_release: Optional[Callable[["WebhookHandler"], None]] = None
+
+    def at_limit(self) -> bool:
+        """
+        Check whether a new invocation would have to wait for a free slot.
+        """
+        return self.concurrency is not None and self.running >= self.concurrency
+
+    async def acquire(self) -> None:
+        """
+        Take a slot for an invocation, waiting in arrival order when at the limit.
+        """
+        if not self.at_limit():
+            self.running += 1
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            # release() hands its slot over, so `running` is already counted
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            else:
+                self._waiters.remove(waiter)
+            raise
+
+    def release(self) -> None:
+        """
+        Free a slot, handing it to the next waiting caller if any.
+        
+        The running count is exact at all times (unlike asyncio.Semaphore.locked(),
+        which reports woken waiters as holding a slot), so on_release() fires
+        exactly when a slot is free.
+        """
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.running -= 1
+        if self.on_release is not None:
+            self.on_release(self)
+
+# Handlers by the event type (or wildcard pattern) they were registered for
+_handlers: Dict[str, WebhookHandler] = {}
+
+# Resolved handler of the event types seen, so dispatch is a single lookup. Event types
+# come from senders: unhandled ones are not cached and the cache stops growing at
+# RESOLVED_CACHE_SIZE, past which types are resolved on every dispatch
+RESOLVED_CACHE_SIZE = 1024
+_resolved: Dict[str, WebhookHandler] = {}
+
+def register_handler(
+    event_type: str,
+    concurrency: Optional[int] = None,
+    timeout: Optional[float] = None,
+    priority: int = 100,
+) -> Callable[[Handler], Handler]:
+    """
+    Register a function as the handler of an event type.
+    
+    `event_type` may be an exact type such as "message.received", a prefix
+    wildcard such as "message.*", or "*" for every type without a more
+    specific handler.
+    
+    Args:
+        event_type: The event type or wildcard pattern to handle
+        concurrency: Maximum number of events of this type processed at once (None for no limit)
+        timeout: Seconds after which an invocation is cancelled (None for no limit)
+        priority: Queue priority of the events, lower values are processed first
+        
+    Returns:
+        A decorator registering the handler and returning it unchanged
+    """
+    def decorator(handler: Handler) -> Handler:
+        _handlers[event_type] = WebhookHandler(event_type, handler, concurrency, timeout, priority)
+        _resolved.clear()
+        logger.debug(f"Registered webhook handler {handler.__name__} for {event_type}")
+        return handler
+    return decorator
+
+def register_batch_handler(event_type: str) -> Callable[[BatchHandler], BatchHandler]:
+    """
+    Register a function processing a list of events of a type in one call.
+    
+    The batch endpoint hands every event of the type to this function at
+    once (e.g. to write them in bulk) instead of calling the handler per
+    event. The handler of the type must be registered first; its concurrency
+    limit counts each batch as one invocation and its timeout applies to the
+    whole batch.
+    
+    Args:
+        event_type: The event type or wildcard pattern of a registered handler
+        
+    Returns:
+        A decorator registering the batch handler and returning it unchanged
+        
+    Raises:
+        KeyError: If no handler is registered for the event type
+    """
+    def decorator(batch_handler: BatchHandler) -> BatchHandler:
+        _handlers[event_type].batch_handler = batch_handler
+        logger.debug(f"Registered webhook batch handler {batch_handler.__name__} for {event_type}")
+        return batch_handler
+    return decorator
+
+def resolve_handler(event_type: Optional[str]) -> Optional[WebhookHandler]:
+    """
+    Get the handler of an event type: its own, then the closest prefix wildcard, then "*".
+    
+    Args:
+        event_type: The event type
+        
+    Returns:
+        The handler or None if no handler matches
+    """
+    try:
+        return _resolved[event_type]
+    except KeyError:
+        pass
+    
+    handler = _handlers.get(event_type)
+    if handler is None and isinstance(event_type, str):
+        prefix = event_type
+        while handler is None and "." in prefix:
+            prefix = prefix.rsplit(".", 1)[0]
+            handler = _handlers.get(f"{prefix}.*")
+    if handler is None:
+        handler = _handlers.get("*")
+    
+    if handler is not None and isinstance(event_type, str) and len(_resolved) < RESOLVED_CACHE_SIZE:
+        _resolved[event_type] = handler
+    return handler
+
+def get_handlers() -> List[WebhookHandler]:
+    """
+    Get every registered handler.
+    
+    Returns:
+        The registered handlers
+    """
+    return list(_handlers.values())
+
+async def _invoke(handler: WebhookHandler, function: Callable[[Any], Awaitable[Any]], argument: Any) -> Any:
+    """
+    Run a handler call within the handler's concurrency limit and timeout.
+    
+    Raises:
+        asyncio.TimeoutError: If the call takes longer than the handler's timeout
+    """
+    if handler.concurrency is None:
+        return await asyncio.wait_for(function(argument), handler.timeout)
+    
+    await handler.acquire()
+    try:
+        return await asyncio.wait_for(function(argument), handler.timeout)
+    finally:
+        handler.release()
+
+async def process_webhook(webhook_data: WebhookPayload) -> Dict[str, Any]:
     """
     Process a webhook request.
     
     Args:
-        webhook_data: The webhook data to process
+        webhook_data: The validated webhook to process
         
     Returns:
         A dictionary with the processing result
     """
     try:
         # Extract event type from the webhook data
-        event_type = webhook_data.get("event_type")
+        event_type = webhook_data.event_type
         
         if not event_type:
             logger.warning("Webhook data missing event_type")
             return {"status": "error", "message": "Missing event_type in webhook data"}
         
-        # Process different event types
-        if event_type == "message.received":
-            return await process_message_received(webhook_data)
-        elif event_type == "user.created":
-            return await process_user_created(webhook_data)
-        elif event_type == "status.update":
-            return await process_status_update(webhook_data)
-        else:
+        handler = resolve_handler(event_type)
+        if handler is None:
             logger.warning(f"Unknown event type: {event_type}")
             return {"status": "warning", "message": f"Unknown event type: {event_type}"}
+        
+        try:
+            return await _invoke(handler, handler.handler, webhook_data)
+        except asyncio.TimeoutError:
+            logger.warning(f"Webhook handler for {handler.event_type} timed out after {handler.timeout}s")
+            return {"status": "error", "message": f"Handler timed out after {handler.timeout}s"}
     
     except Exception as e:
         logger.error(f"Error processing webhook: {str(e)}", exc_info=True)
         return {"status": "error", "message": f"Error processing webhook: {str(e)}"}
 
-async def process_message_received(webhook_data: Dict[str, Any]) -> Dict[str, Any]:
+async def _process_sub_batch(handler: WebhookHandler, events: List[WebhookPayload]) -> List[Dict[str, Any]]:
+    """
+    Process events of the same type with their handler's batch handler.
+    """
+    try:
+        results = await _invoke(handler, handler.batch_handler, events)
+        if len(results) != len(events):
+            raise ValueError(f"Batch handler returned {len(results)} results for {len(events)} events")
+        return results
+    except asyncio.TimeoutError:
+        logger.warning(f"Webhook batch handler for {handler.event_type} timed out after {handler.timeout}s")
+        return [{"status": "error", "message": f"Handler timed out after {handler.timeout}s"}] * len(events)
+    except Exception as e:
+        logger.error(f"Error processing webhook batch: {str(e)}", exc_info=True)
+        return [{"status": "error", "message": f"Error processing webhook batch: {str(e)}"}] * len(events)
+
+@asynccontextmanager
+async def _hold_nothing(events: List[WebhookPayload]) -> AsyncIterator[None]:
+    yield
+
+async def process_webhook_batch(
+    events: List[Dict[str, Any]],
+    concurrency: int,
+    hold: Optional[Callable[[List[Dict[str, Any]]], AsyncContextManager[None]]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Process a batch of webhooks concurrently.
+    
+    Events whose handler has a batch handler are grouped by handler and
+    processed in one call per group; the others are processed one by one.
+    At most `concurrency` events or groups run at once, on top of the
+    handlers' own limits.
+    
+    Each event or group is processed within `hold(its events)`, entered in
+    the order of the events, which the queue uses to keep events with the
+    same ordering key one at a time and in order (see webhook_queue.hold_lanes).
+    
+    Args:
+        events: The webhook data of each event
+        concurrency: Maximum number of concurrent handler calls
+        hold: Context manager factory serializing the processing of related events
+        
+    Returns:
+        The processing result of each event, in the order of the events
+    """
+    results: List[Optional[Dict[str, Any]]] = [None] * len(events)
+    semaphore = asyncio.Semaphore(concurrency)
+    
+    groups: Dict[WebhookHandler, List[int]] = {}
+    singles: List[int] = []
+    for index, event in enumerate(events):
+        handler = resolve_handler(event.event_type)
+        if handler is not None and handler.batch_handler is not None:
+            groups.setdefault(handler, []).append(index)
+        else:
+            singles.append(index)
+    
+    if hold is None:
+        hold = _hold_nothing
+    
+    # Waiting for a turn comes before taking a slot, so a held key never blocks unrelated events
+    async def process_single(index: int) -> None:
+        async with hold(events[index:index + 1]), semaphore:
+            results[index] = await process_webhook(events[index])
+    
+    async def process_group(handler: WebhookHandler, indexes: List[int]) -> None:
+        group = [events[index] for index in indexes]
+        async with hold(group), semaphore:
+            group_results = await _process_sub_batch(handler, group)
+        for index, result in zip(indexes, group_results):
+            results[index] = result
+    
+    await asyncio.gather(
+        *(process_single(index) for index in singles),
+        *(process_group(handler, indexes) for handler, indexes in groups.items()),
+    )
+    return results
+
+@register_handler("message.received", concurrency=64, timeout=30, priority=10)
+async def process_message_received(webhook_data: MessageReceivedPayload) -> Dict[str, Any]:
     """
     Process a message.received webhook event.
     
@@ -48,10 +312,10 @@ async def process_message_received(webhook_data: Dict[str, Any]) -> Dict[str, An
     """
     try:
         # Extract message data
-        data = webhook_data.get("data", {})
-        message_id = data.get("message_id")
-        sender = data.get("from")
-        content = data.get("content")
+        data = webhook_data.data
+        message_id = data.message_id
+        sender = data.sender
+        content = data.content
         
         logger.info(f"Processing message from {sender}: {content}")
         
@@ -73,7 +337,8 @@ async def process_message_received(webhook_data: Dict[str, Any]) -> Dict[str, An
         logger.error(f"Error processing message: {str(e)}", exc_info=True)
         return {"status": "error", "message": f"Error processing message: {str(e)}"}
 
-async def process_user_created(webhook_data: Dict[str, Any]) -> Dict[str, Any]:
+@register_handler("user.created", concurrency=32, timeout=30, priority=50)
+async def process_user_created(webhook_data: UserCreatedPayload) -> Dict[str, Any]:
     """
     Process a user.created webhook event.
     
@@ -85,8 +350,7 @@ async def process_user_created(webhook_data: Dict[str, Any]) -> Dict[str, Any]:
     """
     try:
         # Extract user data
-        data = webhook_data.get("data", {})
-        user_id = data.get("user_id")
+        user_id = webhook_data.data.user_id
         
         logger.info(f"Processing new user: {user_id}")
         
@@ -108,7 +372,8 @@ async def process_user_created(webhook_data: Dict[str, Any]) -> Dict[str, Any]:
         logger.error(f"Error processing user: {str(e)}", exc_info=True)
         return {"status": "error", "message": f"Error processing user: {str(e)}"}
 
-async def process_status_update(webhook_data: Dict[str, Any]) -> Dict[str, Any]:
+@register_handler("status.update", concurrency=16, timeout=30, priority=100)
+async def process_status_update(webhook_data: StatusUpdatePayload) -> Dict[str, Any]:
     """
     Process a status.update webhook event.
     
@@ -120,11 +385,13 @@ async def process_status_update(webhook_data: Dict[str, Any]) -> Dict[str, Any]:
     """
     try:
         # Extract status data
-        data = webhook_data.get("data", {})
-        status = data.get("status")
-        entity_id = data.get("entity_id")
+        data = webhook_data.data
+        status = data.status
+        entity_id = data.entity_id
+        # Number of earlier updates of the entity superseded by this one when coalescing is enabled
+        coalesced = webhook_data.coalesced
         
-        logger.info(f"Processing status update for {entity_id}: {status}")
+        logger.info(f"Processing status update for {entity_id}: {status}" + (f" ({coalesced} earlier updates coalesced)" if coalesced else ""))
         
         # Simulate async processing
         await asyncio.sleep(0.5)
@@ -143,4 +410,37 @@ async def process_status_update(webhook_data: Dict[str, Any]) -> Dict[str, Any]:
     
     except Exception as e:
         logger.error(f"Error processing status update: {str(e)}", exc_info=True)
-        return {"status": "error", "message": f"Error processing status update: {str(e)}"} 
\ No newline at end of file
+        return {"status": "error", "message": f"Error processing status update: {str(e)}"} 
+
+@register_batch_handler("status.update")
+async def process_status_updates(events: List[StatusUpdatePayload]) -> List[Dict[str, Any]]:
+    """
+    Process a batch of status.update webhook events in one go.
+    
+    Args:
+        events: The webhook data of each event
+        
+    Returns:
+        The processing result of each event, in the same order
+    """
+    updates = [(event.data.entity_id, event.data.status) for event in events]
+    
+    logger.info(f"Processing {len(updates)} status updates")
+    
+    # Simulate a single bulk write
+    await asyncio.sleep(0.5)
+    
+    # This is a placeholder for your actual bulk status update logic
+    
+    return [
+        {
+            "status": "success",
+            "message": "Status update processed successfully",
+            "data": {
+                "entity_id": entity_id,
+                "status": status,
+                "processed": True
+            }
+        }
+        for entity_id, status in updates
+    ]
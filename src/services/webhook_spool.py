@@ -0,0 +1,153 @@
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
+import asyncio
+import glob
+import os
+
+from utils.append_log import AppendLog
+from utils.logger import logger
+
+class WebhookSpool:
+    """
+    Write-ahead spool of accepted webhooks, for at-least-once processing across restarts.
+
+    Every accepted webhook is appended to the current log segment and the
+    request is acknowledged once the segment is fsynced; concurrent requests
+    share fsyncs through AppendLog's group commit. A done marker is appended
+    (without waiting for an fsync) once the webhook is processed. On startup
+    the segments are replayed and every webhook without a done marker is
+    returned to be processed again.
+
+    When the current segment exceeds `segment_bytes`, a new segment is
+    started with the webhooks still pending copied into it, and the older
+    segments are deleted, so the spool stays about the size of one segment
+    plus the pending webhooks.
+
+    The spool is owned by a single process; it does not coordinate writers
+    across processes.
+    """
+
+    def __init__(self, path: str, segment_bytes: int = 64 * 1024 * 1024, commit_interval: float = 0.0, fsync: bool = True):
+        """
+        Args:
+            path: Directory holding the log segments
+            segment_bytes: Size after which the current segment is compacted into a new one
+            commit_interval: Seconds to wait for more writers before each fsync
+            fsync: Whether writes should be fsynced (disable only for tests and benchmarks)
+        """
+        self.path = path
+        self.segment_bytes = segment_bytes
+        self.commit_interval = commit_interval
+        self.fsync = fsync
+        self._segment_number = 0
+        self._log: Optional[AppendLog] = None
+        self._rotation: Optional[asyncio.Task] = None
+        # Webhooks appended and not yet done, in arrival order: id -> (data, idempotency key)
+        self._pending: "OrderedDict[str, Tuple[Dict[str, Any], Optional[str]]]" = OrderedDict()
+
+    def _segment_path(self, number: int) -> str:
+        return os.path.join(self.path, f"spool-{number:020d}.jsonl")
+
+    def _segments(self) -> List[str]:
+        return sorted(glob.glob(os.path.join(self.path, "spool-*.jsonl")))
+
+    @property
+    def pending(self) -> int:
+        """Number of spooled webhooks not processed yet."""
+        return len(self._pending)
+
+    async def open(self) -> List[Tuple[str, Dict[str, Any], Optional[str]]]:
+        """
+        Replay the spool and start a new segment.
+
+        Returns:
+            (id, data, idempotency key) of every webhook accepted by an earlier run
+            and not processed, in arrival order
+        """
+        os.makedirs(self.path, exist_ok=True)
+
+        segments = self._segments()
+        for segment in segments:
+            for record in AppendLog.read(segment):
+                if record["op"] == "event":
+                    self._pending[record["id"]] = (record["data"], record.get("key"))
+                elif record["op"] == "done":
+                    self._pending.pop(record["id"], None)
+        if segments:
+            self._segment_number = int(os.path.basename(segments[-1])[len("spool-"):-len(".jsonl")])
+
+        await self._rotate()
+        logger.info(f"Webhook spool ready in {self.path} with {len(self._pending)} webhooks to replay")
+        return [(webhook_id, data, key) for webhook_id, (data, key) in self._pending.items()]
+
+    def append(self, webhook_id: str, webhook_data: Dict[str, Any], idempotency_key: Optional[str] = None) -> None:
+        """
+        Write an accepted webhook to the spool; commit() makes it durable.
+
+        Args:
+            webhook_id: The ID assigned to the webhook
+            webhook_data: The webhook data
+            idempotency_key: The idempotency key of the webhook, if any
+        """
+        self._pending[webhook_id] = (webhook_data, idempotency_key)
+        self._log.write({"op": "event", "id": webhook_id, "key": idempotency_key, "data": webhook_data})
+        if self._log.size >= self.segment_bytes and (self._rotation is None or self._rotation.done()):
+            self._rotation = asyncio.get_running_loop().create_task(self._compact())
+
+    async def commit(self) -> None:
+        """
+        Wait until every webhook appended so far is durable.
+        """
+        await self._log.commit()
+
+    def done(self, webhook_id: str) -> None:
+        """
+        Mark a webhook as processed so that it is not replayed.
+
+        The marker is made durable by the next commit; losing it in a crash
+        only means the webhook is processed again.
+
+        Args:
+            webhook_id: The ID of the processed webhook
+        """
+        if self._pending.pop(webhook_id, None) is not None:
+            self._log.write({"op": "done", "id": webhook_id})
+
+    async def _rotate(self) -> None:
+        """
+        Start a new segment holding the pending webhooks and delete the older segments.
+        """
+        self._segment_number += 1
+        previous_log = self._log
+        log = AppendLog(self._segment_path(self._segment_number), self.commit_interval, self.fsync)
+        # Switched before any await, so the new segment gets every later record
+        self._log = log
+        for webhook_id, (data, key) in self._pending.items():
+            log.write({"op": "event", "id": webhook_id, "key": key, "data": data})
+        await log.commit()
+
+        if previous_log is not None:
+            await previous_log.close()
+        for segment in self._segments():
+            if segment != log.path:
+                os.remove(segment)
+
+    async def _compact(self) -> None:
+        """
+        Rotate the spool in the background once the current segment is full.
+        """
+        try:
+            await self._rotate()
+            logger.debug(f"Webhook spool compacted into {self._log.path} with {len(self._pending)} pending webhooks")
+        except Exception as e:
+            logger.error(f"Error compacting webhook spool: {str(e)}", exc_info=True)
+
+    async def close(self) -> None:
+        """
+        Wait for a running compaction and pending commits, and close the current segment.
+        """
+        if self._rotation is not None:
+            await self._rotation
+        if self._log is not None:
+            await self._log.close()
+            self._log = None
@@ -0,0 +1,130 @@
+from typing import Dict, Any, Iterator, List, Optional
+import asyncio
+import json
+import mmap
+import os
+
+from utils.logger import logger
+
+class AppendLog:
+    """
+    Append-only JSON lines log with group-committed fsyncs.
+
+    Records are written to the file as soon as they are appended, and every
+    writer waiting for durability within the same commit interval shares a
+    single fsync, so throughput is not bound to one fsync per write.
+    """
+
+    def __init__(self, path: str, commit_interval: float = 0.0, fsync: bool = True):
+        """
+        Open (or create) the log file for appending.
+
+        Args:
+            path: Path of the log file
+            commit_interval: Seconds to wait for more writers before each fsync; with 0,
+                writers arriving while an fsync runs are batched into the next one
+            fsync: Whether commits should fsync the file (disable only for tests and benchmarks)
+        """
+        self.path = path
+        self.commit_interval = commit_interval
+        self.fsync = fsync
+        self.size = os.path.getsize(path) if os.path.exists(path) else 0
+        self._fd: Optional[int] = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        self._waiters: List[asyncio.Future] = []
+        self._flusher: Optional[asyncio.Task] = None
+
+    def write(self, record: Dict[str, Any]) -> None:
+        """
+        Write a record to the log without waiting for it to be durable.
+
+        Args:
+            record: The JSON serializable record to write
+        """
+        if self._fd is None:
+            raise RuntimeError(f"Append log {self.path} is closed")
+        line = json.dumps(record, separators=(",", ":"), default=str).encode("utf-8") + b"\n"
+        os.write(self._fd, line)
+        self.size += len(line)
+
+    async def append(self, record: Dict[str, Any]) -> None:
+        """
+        Write a record to the log and wait until it is durable.
+
+        Args:
+            record: The JSON serializable record to append
+        """
+        self.write(record)
+        await self.commit()
+
+    async def commit(self) -> None:
+        """
+        Wait until every record written so far is durable.
+        """
+        loop = asyncio.get_running_loop()
+        waiter = loop.create_future()
+        self._waiters.append(waiter)
+        if self._flusher is None or self._flusher.done():
+            self._flusher = loop.create_task(self._flush())
+        await waiter
+
+    async def _flush(self) -> None:
+        """
+        Fsync the log for every batch of waiting writers.
+        """
+        loop = asyncio.get_running_loop()
+        while self._waiters:
+            if self.commit_interval > 0:
+                await asyncio.sleep(self.commit_interval)
+            waiters, self._waiters = self._waiters, []
+            try:
+                if self.fsync:
+                    await loop.run_in_executor(None, os.fsync, self._fd)
+            except Exception as e:
+                logger.error(f"Error syncing append log {self.path}: {str(e)}", exc_info=True)
+                for waiter in waiters:
+                    if not waiter.done():
+                        waiter.set_exception(e)
+            else:
+                for waiter in waiters:
+                    if not waiter.done():
+                        waiter.set_result(None)
+
+    async def close(self) -> None:
+        """
+        Wait for pending commits and close the log file.
+        """
+        if self._flusher is not None:
+            await asyncio.shield(self._flusher)
+        if self._fd is not None:
+            if self.fsync:
+                os.fsync(self._fd)
+            os.close(self._fd)
+            self._fd = None
+
+    @staticmethod
+    def read(path: str) -> Iterator[Dict[str, Any]]:
+        """
+        Read the records of a log file through a memory map.
+
+        Reading stops at the first incomplete or corrupt line, which is what
+        a crash in the middle of a write leaves behind.
+
+        Args:
+            path: Path of the log file
+
+        Yields:
+            The records of the log, in order
+        """
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                for line in iter(mapped.readline, b""):
+                    if not line.endswith(b"\n"):
+                        logger.warning(f"Ignoring incomplete record at the end of {path}")
+                        return
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        logger.warning(f"Ignoring corrupt record at the end of {path}")
+                        return
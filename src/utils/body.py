@@ -0,0 +1,59 @@
+from typing import AsyncIterable, AsyncIterator, Optional
+
+class BodyTooLargeError(ValueError):
+    """Raised when a request body exceeds the allowed size."""
+
+    def __init__(self, max_bytes: int):
+        super().__init__(f"Body is larger than {max_bytes} bytes")
+
+async def limit_body(chunks: AsyncIterable[bytes], max_bytes: int, content_length: Optional[str] = None) -> AsyncIterator[bytes]:
+    """
+    Pass request body chunks through, giving up as soon as they exceed a size limit.
+
+    A body declaring a larger Content-Length is rejected before any chunk is
+    read; otherwise the chunks are counted as they arrive.
+
+    Args:
+        chunks: The byte chunks, e.g. `request.stream()`
+        max_bytes: Maximum size of the body
+        content_length: The Content-Length header of the request, if any
+
+    Yields:
+        The chunks
+
+    Raises:
+        BodyTooLargeError: If the body exceeds max_bytes
+    """
+    if content_length is not None and content_length.isdigit() and int(content_length) > max_bytes:
+        raise BodyTooLargeError(max_bytes)
+
+    size = 0
+    async for chunk in chunks:
+        size += len(chunk)
+        if size > max_bytes:
+            raise BodyTooLargeError(max_bytes)
+        yield chunk
+
+async def read_body(chunks: AsyncIterable[bytes], max_bytes: int, content_length: Optional[str] = None) -> bytes:
+    """
+    Read a request body, giving up as soon as it exceeds a size limit.
+
+    A body declaring a larger Content-Length is rejected before any chunk is
+    read; otherwise the chunks are counted as they arrive, so an oversized
+    chunked or mislabelled body is not buffered past the limit.
+
+    Args:
+        chunks: The byte chunks, e.g. `request.stream()`
+        max_bytes: Maximum size of the body
+        content_length: The Content-Length header of the request, if any
+
+    Returns:
+        The body
+
+    Raises:
+        BodyTooLargeError: If the body exceeds max_bytes
+    """
+    body = bytearray()
+    async for chunk in limit_body(chunks, max_bytes, content_length):
+        body += chunk
+    return bytes(body)
@@ -0,0 +1,69 @@
+from typing import Any
+from datetime import datetime
+import json
+import re
+
+from fastapi.responses import JSONResponse
+
+# orjson is optional: it is much faster, but the standard library produces the same JSON
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the installed packages
+    orjson = None
+
+# orjson parses integers outside the 64-bit range as floats, losing digits; they are
+# at least 19 digits long, so documents with such a run are parsed by the standard library
+_WIDE_NUMBER = re.compile(rb"\d{19}")
+_WIDE_NUMBER_TEXT = re.compile(r"\d{19}")
+
+def _default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def dumps(value: Any) -> bytes:
+    """
+    Serialize a value to compact UTF-8 JSON.
+    
+    Integers wider than 64 bits, which orjson rejects, are written by the
+    standard library instead.
+    
+    Args:
+        value: The value to serialize; datetimes are written in ISO 8601 format
+        
+    Returns:
+        The JSON bytes
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(value)
+        except TypeError:
+            pass
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False, default=_default).encode("utf-8")
+
+def loads(data: Any) -> Any:
+    """
+    Parse JSON bytes or text.
+    
+    Documents containing a run of 19 or more digits are parsed by the
+    standard library, so integers wider than 64 bits keep every digit.
+    
+    Args:
+        data: The JSON document
+        
+    Returns:
+        The parsed value
+    """
+    if orjson is not None:
+        wide = _WIDE_NUMBER_TEXT if isinstance(data, str) else _WIDE_NUMBER
+        if wide.search(data) is None:
+            return orjson.loads(data)
+    return json.loads(data)
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON response rendered with the fastest available encoder.
+    """
+    
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -34,6 +34,10 @@ logging.basicConfig(
 
 logger = logging.getLogger("fastapi_template")
 
+# The outbound HTTP client logs every request (httpx) and every connection step (httpcore)
+logging.getLogger("httpx").setLevel(logging.WARNING)
+logging.getLogger("httpcore").setLevel(logging.WARNING)
+
 # Example usage:
 # logger.info("Info message")
 # logger.warning("Warning message")
@@ -0,0 +1,48 @@
+from typing import AsyncIterable, AsyncIterator, Tuple
+
+class LineTooLongError(ValueError):
+    """Raised when an NDJSON line exceeds the allowed size."""
+
+    def __init__(self, line_number: int, max_line_bytes: int):
+        self.line_number = line_number
+        super().__init__(f"Line {line_number} is longer than {max_line_bytes} bytes")
+
+async def iter_lines(chunks: AsyncIterable[bytes], max_line_bytes: int) -> AsyncIterator[Tuple[int, bytes]]:
+    """
+    Split a stream of byte chunks into NDJSON lines as the chunks arrive.
+
+    Only the current partial line is buffered, so memory stays bounded by
+    `max_line_bytes` whatever the size of the stream. Blank lines are skipped.
+
+    Args:
+        chunks: The byte chunks, e.g. `request.stream()`
+        max_line_bytes: Maximum size of a single line
+
+    Yields:
+        (line number, line) tuples, numbered from 1
+
+    Raises:
+        LineTooLongError: If a line exceeds max_line_bytes
+    """
+    buffer = bytearray()
+    line_number = 0
+    async for chunk in chunks:
+        buffer += chunk
+        if b"\n" not in chunk:
+            # Still inside a line: only check its size
+            if len(buffer) > max_line_bytes:
+                raise LineTooLongError(line_number + 1, max_line_bytes)
+            continue
+        lines = bytes(buffer).split(b"\n")
+        buffer = bytearray(lines.pop())
+        for line in lines:
+            line_number += 1
+            if len(line) > max_line_bytes:
+                raise LineTooLongError(line_number, max_line_bytes)
+            if line.strip():
+                yield line_number, line
+        if len(buffer) > max_line_bytes:
+            raise LineTooLongError(line_number + 1, max_line_bytes)
+
+    if buffer.strip():
+        yield line_number + 1, bytes(buffer)
@@ -0,0 +1,79 @@
+from typing import Any, Dict
+import time
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from utils.logger import logger
+
+class TimingMiddleware:
+    """
+    ASGI middleware adding the processing time of each request to its response.
+
+    The time until the response starts is sent as `X-Process-Time` (seconds)
+    and `Server-Timing` (milliseconds, shown by browser dev tools). Unlike
+    `@app.middleware("http")`, requests and responses are passed through
+    without an extra task or a re-streamed response body.
+
+    With `log_requests`, each request is logged with the first
+    `max_body_log_bytes` of its body, copied from the body chunks as the
+    application receives them instead of reading the body up front.
+    """
+
+    def __init__(self, app: ASGIApp, log_requests: bool = False, max_body_log_bytes: int = 1000):
+        """
+        Args:
+            app: The wrapped ASGI application
+            log_requests: Whether to log every request, its body and its processing time
+            max_body_log_bytes: Bytes of the request body to log at most
+        """
+        self.app = app
+        self.log_requests = log_requests
+        self.max_body_log_bytes = max_body_log_bytes
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter_ns()
+
+        async def send_with_timing(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                elapsed = time.perf_counter_ns() - start
+                headers = MutableHeaders(scope=message)
+                headers.append("X-Process-Time", f"{elapsed / 1e9:.6f}")
+                headers.append("Server-Timing", f"app;dur={elapsed / 1e6:.3f}")
+            await send(message)
+
+        if not self.log_requests:
+            await self.app(scope, receive, send_with_timing)
+            return
+
+        method = scope["method"]
+        path = scope["path"]
+        query_string = scope["query_string"].decode("latin-1")
+        logger.info(f"Request: {method} {path} | Params: {query_string or 'None'}")
+
+        tee: Dict[str, Any] = {"body": bytearray(), "logged": False}
+
+        def log_body(truncated: bool) -> None:
+            tee["logged"] = True
+            if tee["body"]:
+                body = tee["body"][:self.max_body_log_bytes].decode("utf-8", errors="replace")
+                logger.info(f"Request Body: {body}{'... [truncated]' if truncated else ''}")
+
+        async def receive_with_tee() -> Message:
+            message = await receive()
+            if message["type"] == "http.request" and not tee["logged"]:
+                tee["body"] += message.get("body", b"")[:self.max_body_log_bytes + 1 - len(tee["body"])]
+                if len(tee["body"]) > self.max_body_log_bytes:
+                    log_body(truncated=True)
+                elif not message.get("more_body", False):
+                    log_body(truncated=False)
+            return message
+
+        try:
+            await self.app(scope, receive_with_tee, send_with_timing)
+        finally:
+            logger.info(f"Request to {path} processed in {(time.perf_counter_ns() - start) / 1e9:.4f} seconds")
@@ -0,0 +1,7 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+os.environ.setdefault("WEBHOOK_VERIFICATION_TOKEN", "test")
+os.environ.setdefault("MODE", "PROD")
+os.environ.setdefault("TEMPLATE_STORE", "memory")
@@ -0,0 +1,51 @@
+import json
+
+from fastapi.testclient import TestClient
+
+from main import app
+from utils.json_codec import FastJSONResponse, dumps, loads
+
+BIG = 123456789012345678901234567890
+
+def test_dumps_integers_wider_than_64_bits():
+    assert json.loads(dumps({"n": BIG})) == {"n": BIG}
+    assert json.loads(FastJSONResponse({"n": BIG}).body) == {"n": BIG}
+
+def test_template_with_wide_integer_is_served():
+    with TestClient(app) as client:
+        response = client.post("/api/template/", json={"name": "Wide", "content": {"n": BIG}})
+        assert response.status_code == 201
+        template_id = response.json()["id"]
+        assert response.json()["content"] == {"n": BIG}
+
+        assert client.get(f"/api/template/{template_id}").json()["content"] == {"n": BIG}
+        listed = client.get("/api/template/", params={"limit": 100})
+        assert listed.status_code == 200
+        assert any(template["id"] == template_id for template in listed.json())
+
+def test_loads_integers_wider_than_64_bits():
+    assert loads(b'{"n": 123456789012345678901234567890}') == {"n": BIG}
+    assert loads('[-9223372036854775809, 18446744073709551616]') == [-9223372036854775809, 18446744073709551616]
+    assert loads(b'{"n": 1.5, "s": "x"}') == {"n": 1.5, "s": "x"}
+
+def test_merge_patch_keeps_wide_integer():
+    with TestClient(app) as client:
+        template_id = client.post("/api/template/", json={"name": "Patched", "content": {"n": 1}}).json()["id"]
+        response = client.patch(
+            f"/api/template/{template_id}",
+            content=b'{"content": {"n": 123456789012345678901234567890}}',
+            headers={"Content-Type": "application/merge-patch+json"},
+        )
+        assert response.status_code == 200
+        assert response.json()["content"] == {"n": BIG}
+        assert client.get(f"/api/template/{template_id}").json()["content"] == {"n": BIG}
+
+def test_webhook_with_wide_integer_message_id_is_accepted():
+    with TestClient(app) as client:
+        body = b'{"event_type": "message.received", "data": {"message_id": 12345678901234567890123, "content": "hi"}}'
+        response = client.post("/api/webhook/receive", content=body, headers={"Content-Type": "application/json"})
+        assert response.status_code == 202
+
+        batch = client.post("/api/webhook/receive/batch", content=b"[" + body + b"]", headers={"Content-Type": "application/json"})
+        assert batch.status_code == 200
+        assert batch.json()["failed"] == 0
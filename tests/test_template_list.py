@@ -0,0 +1,48 @@
+import asyncio
+from types import SimpleNamespace
+
+from fastapi.testclient import TestClient
+
+from main import app
+from routes import template_routes
+from services import template_service
+from services.template_store import SqliteTemplateStore
+
+def template_data(name):
+    return SimpleNamespace(name=name, description=None, content={"body": name}, tags=[], parameters=None)
+
+def test_only_bounded_pages_are_cached():
+    with TestClient(app) as client:
+        client.post("/api/template/", json={"name": "Listed", "content": {"body": "x"}})
+        assert client.get("/api/template/", params={"limit": 100}).status_code == 200
+        assert client.get("/api/template/", params={"limit": 100000, "skip": 1}).status_code == 200
+        assert [key[:2] for key in template_routes._page_cache] == [(0, 100)]
+
+def test_list_version_is_shared_by_processes_of_a_sqlite_store(tmp_path, monkeypatch):
+    path = str(tmp_path / "templates.db")
+    worker = SqliteTemplateStore(path)
+    other = SqliteTemplateStore(path)
+    monkeypatch.setattr(template_service, "_store", worker)
+    monkeypatch.setattr(template_service, "_synced", None)
+
+    async def scenario():
+        template_service._replace_all(await worker.load())
+        template_service._mark_synced()
+        await other.load()
+        try:
+            assert await template_service.get_collection_version() == "store-0"
+
+            # A write of another process is versioned by its change position once polled
+            await other.save(template_service._new_template(template_data("Other"), 1))
+            assert await template_service.get_collection_version() == "store-1"
+
+            # A local write is versioned by this process until it is polled back
+            await template_service.create_template(template_data("Local"))
+            assert not template_service.current_collection_version().startswith("store-")
+            assert await template_service.get_collection_version() == "store-2"
+        finally:
+            await other.close()
+            await worker.close()
+            template_service._replace_all([])
+
+    asyncio.run(scenario())
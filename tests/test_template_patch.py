@@ -0,0 +1,108 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from main import app
+
+JSON_PATCH = {"Content-Type": "application/json-patch+json"}
+
+@pytest.fixture
+def client():
+    with TestClient(app) as client:
+        yield client
+
+def create(client, content):
+    response = client.post("/api/template/", json={"name": "Patched", "content": content, "tags": ["a"]})
+    assert response.status_code == 201
+    return response.json()["id"]
+
+def patch(client, template_id, operations, **headers):
+    return client.patch(f"/api/template/{template_id}", json=operations, headers={**JSON_PATCH, **headers})
+
+def test_add_remove_and_replace(client):
+    template_id = create(client, {"items": [1, 2], "old": True})
+    response = patch(client, template_id, [
+        {"op": "add", "path": "/content/items/-", "value": 3},
+        {"op": "add", "path": "/content/items/0", "value": 0},
+        {"op": "add", "path": "/content/new", "value": {"x": 1}},
+        {"op": "remove", "path": "/content/old"},
+        {"op": "replace", "path": "/name", "value": "Renamed"},
+        {"op": "add", "path": "/tags/-", "value": "b"},
+    ])
+    assert response.status_code == 200
+    assert response.json()["content"] == {"items": [0, 1, 2, 3], "new": {"x": 1}}
+    assert response.json()["name"] == "Renamed"
+    assert response.json()["tags"] == ["a", "b"]
+
+def test_move_and_copy(client):
+    template_id = create(client, {"from": {"v": [1]}, "keep": "k"})
+    response = patch(client, template_id, [
+        {"op": "copy", "from": "/content/keep", "path": "/content/copied"},
+        {"op": "move", "from": "/content/from/v", "path": "/content/moved"},
+    ])
+    assert response.status_code == 200
+    assert response.json()["content"] == {"from": {}, "keep": "k", "copied": "k", "moved": [1]}
+
+def test_escaped_pointers(client):
+    template_id = create(client, {"a/b": 1, "m~n": 2})
+    response = patch(client, template_id, [
+        {"op": "test", "path": "/content/a~1b", "value": 1},
+        {"op": "replace", "path": "/content/m~0n", "value": 3},
+        {"op": "add", "path": "/content/~01~10", "value": 4},
+    ])
+    assert response.status_code == 200
+    assert response.json()["content"] == {"a/b": 1, "m~n": 3, "~1/0": 4}
+
+def test_test_operation(client):
+    template_id = create(client, {"n": 1, "flag": True})
+    assert patch(client, template_id, [{"op": "test", "path": "/content/n", "value": 1}]).status_code == 200
+
+    # A boolean never equals a number, and a failed test applies none of the operations
+    response = patch(client, template_id, [
+        {"op": "replace", "path": "/content/n", "value": 2},
+        {"op": "test", "path": "/content/flag", "value": 1},
+    ])
+    assert response.status_code == 409
+    assert client.get(f"/api/template/{template_id}").json()["content"] == {"n": 1, "flag": True}
+
+@pytest.mark.parametrize("operations", [
+    [{"op": "remove", "path": "/content/missing"}],
+    [{"op": "add", "path": "/content/items/5", "value": 1}],
+    [{"op": "replace", "path": "/content/items/01", "value": 1}],
+    [{"op": "move", "from": "/content", "path": "/content/inner"}],
+    [{"op": "add", "path": "content", "value": 1}],
+    [{"op": "unknown", "path": "/content/items"}],
+    [{"op": "replace", "path": "/content", "value": "not an object"}],
+    {"op": "add", "path": "/content/x", "value": 1},
+])
+def test_invalid_patches_are_rejected(client, operations):
+    template_id = create(client, {"items": [1]})
+    response = patch(client, template_id, operations)
+    assert response.status_code == 422
+    assert client.get(f"/api/template/{template_id}").json()["content"] == {"items": [1]}
+
+def test_if_match(client):
+    template_id = create(client, {"n": 1})
+    etag = client.get(f"/api/template/{template_id}").headers["etag"]
+
+    response = patch(client, template_id, [{"op": "replace", "path": "/content/n", "value": 2}], **{"If-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+
+    # The template changed since that ETag
+    response = patch(client, template_id, [{"op": "replace", "path": "/content/n", "value": 3}], **{"If-Match": etag})
+    assert response.status_code == 412
+    assert client.get(f"/api/template/{template_id}").json()["content"] == {"n": 2}
+
+def test_merge_patch(client):
+    template_id = create(client, {"keep": 1, "drop": 2, "nested": {"a": 1}})
+    response = client.patch(
+        f"/api/template/{template_id}",
+        json={"content": {"drop": None, "nested": {"b": 2}}},
+        headers={"Content-Type": "application/merge-patch+json"},
+    )
+    assert response.status_code == 200
+    assert response.json()["content"] == {"keep": 1, "nested": {"a": 1, "b": 2}}
+
+def test_unknown_template(client):
+    response = patch(client, "00000000000000000000000000000000", [{"op": "remove", "path": "/content/x"}])
+    assert response.status_code == 404
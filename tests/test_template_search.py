@@ -0,0 +1,36 @@
+from types import SimpleNamespace
+
+import pytest
+
+from services import template_search
+
+@pytest.fixture(autouse=True)
+def empty_index(monkeypatch):
+    # Search the templates of each test only, leaving the app's index alone
+    monkeypatch.setattr(template_search, "_postings", {})
+    monkeypatch.setattr(template_search, "_template_terms", {})
+    monkeypatch.setattr(template_search, "_vocabulary", [])
+
+def make_template(number, content):
+    return SimpleNamespace(id=f"t{number}".encode(), name=f"Template {number}", description=None, content={"body": content})
+
+def test_prefix_matches_every_term():
+    for number in range(1000):
+        template_search.index_template(make_template(number, f"alpha{number:03d}"))
+
+    found = {template_id for template_id, _ in template_search.search("alpha", limit=1000)}
+    assert len(found) == 1000
+    assert b"t999" in found
+    assert [template_id for template_id, _ in template_search.search("alpha999")] == [b"t999"]
+
+def test_exact_match_ranks_above_prefix_match():
+    template_search.index_template(make_template(1, "alphabet"))
+    template_search.index_template(make_template(2, "alpha"))
+    assert [template_id for template_id, _ in template_search.search("alpha")] == [b"t2", b"t1"]
+    assert template_search.search("beta") == []
+
+def test_removed_template_is_not_found():
+    template_search.index_template(make_template(1, "alpha"))
+    template_search.remove_template(b"t1")
+    assert template_search.search("alpha") == []
+    assert template_search._vocabulary == []
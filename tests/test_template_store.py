@@ -0,0 +1,113 @@
+import asyncio
+import glob
+import os
+from types import SimpleNamespace
+
+import pytest
+
+from services import template_service
+from services.template_store import LogTemplateStore, SqliteTemplateStore, WriteConflictError
+
+def new_template(name, now=1):
+    data = SimpleNamespace(name=name, description=None, content={"body": name}, tags=["t"], parameters=None)
+    return template_service._new_template(data, now)
+
+def open_store(path, templates, **options):
+    """A log store whose in-memory state is the templates dict, as the service keeps it."""
+    return LogTemplateStore(str(path), lambda: list(templates.values()), fsync=False, **options)
+
+async def restart(path, **options):
+    templates = {}
+    store = open_store(path, templates, **options)
+    for template in await store.load():
+        templates[template.template_id] = template
+    return store, templates
+
+def test_log_store_restart_replays_writes(tmp_path):
+    async def scenario():
+        store, templates = await restart(tmp_path)
+        first, second, third = new_template("First"), new_template("Second"), new_template("Third")
+        await store.write_batch([first, second, third], [])
+        first.name = "Renamed"
+        await store.save(first)
+        await store.delete(second.template_id)
+        await store.close()
+
+        store, templates = await restart(tmp_path)
+        await store.close()
+        return first, third, templates
+
+    first, third, templates = asyncio.run(scenario())
+    assert sorted(templates) == sorted([first.template_id, third.template_id])
+    assert templates[first.template_id].name == "Renamed"
+    assert templates[third.template_id].content == {"body": "Third"}
+    assert templates[third.template_id].tags == ("t",)
+
+def test_log_store_ignores_a_torn_tail_and_keeps_writing_after_it(tmp_path):
+    async def scenario():
+        store, _ = await restart(tmp_path)
+        kept = new_template("Kept")
+        await store.save(kept)
+        await store.close()
+
+        # A crash in the middle of a write leaves a partial record behind
+        with open(glob.glob(str(tmp_path / "log-*.jsonl"))[-1], "ab") as f:
+            f.write(b'{"op": "put", "seq": 2, "templ')
+
+        store, templates = await restart(tmp_path)
+        assert list(templates) == [kept.template_id]
+        later = new_template("Later")
+        await store.save(later)
+        await store.close()
+
+        store, templates = await restart(tmp_path)
+        await store.close()
+        return sorted(templates), sorted([kept.template_id, later.template_id])
+
+    loaded, expected = asyncio.run(scenario())
+    assert loaded == expected
+
+def test_log_store_restarts_from_a_snapshot(tmp_path):
+    async def scenario():
+        store, templates = await restart(tmp_path, snapshot_every=3)
+        created = [new_template(f"Template {n}") for n in range(5)]
+        for template in created:
+            templates[template.template_id] = template
+            await store.save(template)
+        del templates[created[0].template_id]
+        await store.delete(created[0].template_id)
+        await store.close()
+
+        assert os.path.exists(tmp_path / LogTemplateStore.SNAPSHOT_FILE)
+        store, templates = await restart(tmp_path, snapshot_every=3)
+        await store.close()
+        return sorted(templates), sorted(template.template_id for template in created[1:])
+
+    loaded, expected = asyncio.run(scenario())
+    assert loaded == expected
+
+def test_sqlite_store_rejects_a_write_based_on_a_stale_version(tmp_path):
+    path = str(tmp_path / "templates.db")
+
+    async def scenario():
+        worker, other = SqliteTemplateStore(path), SqliteTemplateStore(path)
+        try:
+            await worker.load()
+            await other.load()
+            template = new_template("Shared", now=1)
+            await worker.save(template)
+
+            changed = new_template("Shared", now=2)
+            changed.id = template.id
+            await other.save(changed, expected_updated_at=1)
+
+            # The worker still expects the first version
+            template.name = "Stale"
+            with pytest.raises(WriteConflictError):
+                await worker.save(template, expected_updated_at=1)
+            return [stored.updated_at for stored in await worker.load()]
+        finally:
+            await other.close()
+            await worker.close()
+
+    assert asyncio.run(scenario()) == [2]
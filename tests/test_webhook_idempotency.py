@@ -0,0 +1,22 @@
+from fastapi.testclient import TestClient
+
+from main import app
+from schemas.webhook_schemas import MessageReceivedPayload, StatusUpdatePayload
+from services.webhook_idempotency import webhook_key
+
+def status_update(status):
+    return {"event_type": "status.update", "data": {"entity_id": "e1", "status": status}}
+
+def test_auto_key_ignores_entity_status():
+    online = StatusUpdatePayload.model_validate(status_update("online"))
+    message = MessageReceivedPayload.model_validate({"event_type": "message.received", "data": {"message_id": 7}})
+    assert webhook_key(online) is None
+    assert webhook_key(message) == "message:message.received:7"
+    assert webhook_key(online, {"X-Delivery-Id": "d1"}) == "delivery:d1"
+
+def test_status_returning_to_an_earlier_value_is_processed():
+    with TestClient(app) as client:
+        for status in ("online", "offline", "online"):
+            response = client.post("/api/webhook/receive", json=status_update(status))
+            assert response.status_code == 202
+            assert "duplicate" not in response.json()
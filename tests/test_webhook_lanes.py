@@ -0,0 +1,62 @@
+import asyncio
+
+from schemas.webhook_schemas import WebhookPayload
+from services import webhook_queue
+from services.webhook_service import process_webhook_batch, register_handler
+
+log = []
+
+@register_handler("test.ordered")
+async def process_ordered(webhook_data):
+    data = webhook_data.data
+    log.append(("start", data["entity_id"], data["n"]))
+    await asyncio.sleep(0.01)
+    log.append(("end", data["entity_id"], data["n"]))
+    return {"status": "success"}
+
+def event(entity_id, n):
+    return WebhookPayload(event_type="test.ordered", data={"entity_id": entity_id, "n": n})
+
+def runs_of(entity_id):
+    """The start and end of each event of an entity, in the order they happened."""
+    return [(step, n) for step, entity, n in log if entity == entity_id]
+
+def test_batch_events_with_the_same_key_run_in_order_after_queued_ones():
+    log.clear()
+
+    async def scenario():
+        await webhook_queue.start_webhook_workers()
+        try:
+            webhook_queue.enqueue(event("e1", 0))
+            await asyncio.sleep(0)
+            results = await process_webhook_batch(
+                [event("e1", 1), event("e2", 1), event("e1", 2)], 8, webhook_queue.hold_lanes
+            )
+            assert [result["status"] for result in results] == ["success"] * 3
+        finally:
+            await webhook_queue.stop_webhook_workers()
+
+    asyncio.run(scenario())
+    assert runs_of("e1") == [("start", 0), ("end", 0), ("start", 1), ("end", 1), ("start", 2), ("end", 2)]
+    # Other keys are not held back
+    assert log.index(("start", "e2", 1)) < log.index(("end", "e1", 1))
+    assert webhook_queue._lanes == {}
+
+def test_cancelled_lane_wait_frees_the_lane():
+    log.clear()
+
+    async def scenario():
+        await webhook_queue.start_webhook_workers()
+        try:
+            batch = asyncio.create_task(process_webhook_batch([event("e1", 1), event("e1", 2)], 8, webhook_queue.hold_lanes))
+            await asyncio.sleep(0.005)
+            batch.cancel()
+            await asyncio.gather(batch, return_exceptions=True)
+            assert webhook_queue._lanes == {}
+
+            results = await process_webhook_batch([event("e1", 3)], 8, webhook_queue.hold_lanes)
+            assert results[0]["status"] == "success"
+        finally:
+            await webhook_queue.stop_webhook_workers()
+
+    asyncio.run(scenario())